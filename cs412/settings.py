@@ -131,6 +131,13 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
 
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    # plotly.js for the voter graphs page, from the installed plotly package
+    'voter_analytics.finders.PlotlyFinder',
+]
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 MEDIA_URL= "/media/"  # note: no leading slash!
 
@@ -4,10 +4,54 @@
 # Register your models here.
 from django.contrib import admin
 
+from . import counters
 from .models import *
 admin.site.register(Profile)
 admin.site.register(Post)
 admin.site.register(Photo)
-admin.site.register(Follow)
 admin.site.register(Comment)
-admin.site.register(Like)
+
+
+class CountedAdmin(admin.ModelAdmin):
+    """
+    Like / Follow admin: recount the denormalized counts (counters.py) the
+    rows feed. Subclasses name the foreign key columns whose Post and
+    Profile counts a row contributes to.
+    """
+    counted_posts = ()      # e.g. ('post_id',)
+    counted_profiles = ()   # e.g. ('profile_id', 'follower_profile_id')
+
+    def affected(self, obj):
+        ''' (post ids, profile ids) whose counts obj contributes to '''
+        return ([getattr(obj, field) for field in self.counted_posts],
+                [getattr(obj, field) for field in self.counted_profiles])
+
+    def save_model(self, request, obj, form, change):
+        before = self.affected(obj.__class__.objects.get(pk=obj.pk)) if change else ((), ())
+        super().save_model(request, obj, form, change)
+        after = self.affected(obj)
+        counters.recount(posts=[*before[0], *after[0]], profiles=[*before[1], *after[1]])
+
+    def delete_model(self, request, obj):
+        affected = self.affected(obj)
+        super().delete_model(request, obj)
+        counters.recount(*affected)
+
+    def delete_queryset(self, request, queryset):
+        posts, profiles = [], []
+        n = len(self.counted_posts)
+        for row in queryset.values_list(*self.counted_posts, *self.counted_profiles):
+            posts += row[:n]
+            profiles += row[n:]
+        super().delete_queryset(request, queryset)
+        counters.recount(posts, profiles)
+
+
+@admin.register(Like)
+class LikeAdmin(CountedAdmin):
+    counted_posts = ('post_id',)
+
+
+@admin.register(Follow)
+class FollowAdmin(CountedAdmin):
+    counted_profiles = ('profile_id', 'follower_profile_id')
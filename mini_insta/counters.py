@@ -0,0 +1,124 @@
+# File: counters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Keep the denormalized like / follower / following counts current
+"""
+Post.like_count, Profile.follower_count and Profile.following_count are
+read on every card and profile page, so they are stored instead of
+counted. The Like and Follow views call these functions, which change
+the counts in the same transaction as the row with an F() expression
+(UPDATE ... SET n = n + 1), so concurrent requests cannot lose updates.
+
+Likes and follows are insert-or-ignore: the row is simply inserted and
+the unique constraint on Like (post, profile) / Follow (profile,
+follower_profile) turns a second, racing insert into an IntegrityError,
+which rolls back that request's savepoint (counter included). Unlike
+get_or_create's SELECT-then-INSERT, two double-clicks can never both
+insert.
+
+The admin's Like and Follow pages recount the affected rows after each
+save or delete (recount). Anything else that bypasses these functions
+(the shell, cascades from deleting a Profile or Post) leaves counts
+that `manage.py reconcile_counters` must repair; decrements clamp at 0
+so a low count never turns an unlike into an error.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, Like, Post, Profile
+
+BATCH_SIZE = 500
+
+
+def _minus(counter, n):
+    ''' counter - n, but never below 0: a counter that drifted low must not break the unsigned column '''
+    return Greatest(counter - n, 0)
+
+
+def add_like(post, profile):
+    ''' profile likes post; returns True if that is new '''
+    try:
+        with transaction.atomic():
+            Like.objects.create(post=post, profile=profile)
+            Post.objects.filter(pk=post.pk).update(like_count=F("like_count") + 1)
+    except IntegrityError:   # already liked
+        return False
+    return True
+
+
+def remove_like(post, profile):
+    ''' profile no longer likes post; returns how many Like rows went away '''
+    with transaction.atomic():
+        removed, _ = Like.objects.filter(post=post, profile=profile).delete()
+        if removed:
+            Post.objects.filter(pk=post.pk).update(like_count=_minus(F("like_count"), removed))
+    return removed
+
+
+def add_follow(follower, followed):
+    ''' follower follows followed; returns True if that is new '''
+    try:
+        with transaction.atomic():
+            Follow.objects.create(profile=followed, follower_profile=follower)
+            Profile.objects.filter(pk=followed.pk).update(follower_count=F("follower_count") + 1)
+            Profile.objects.filter(pk=follower.pk).update(following_count=F("following_count") + 1)
+    except IntegrityError:   # already following
+        return False
+    return True
+
+
+def remove_follow(follower, followed):
+    ''' follower unfollows followed; returns how many Follow rows went away '''
+    with transaction.atomic():
+        removed, _ = Follow.objects.filter(profile=followed, follower_profile=follower).delete()
+        if removed:
+            Profile.objects.filter(pk=followed.pk).update(follower_count=_minus(F("follower_count"), removed))
+            Profile.objects.filter(pk=follower.pk).update(following_count=_minus(F("following_count"), removed))
+    return removed
+
+
+def _count(model, field):
+    ''' correlated subquery: rows of model whose field points at the outer row '''
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef("pk")}).order_by()
+        .values(field).annotate(n=Count("*")).values("n")
+    ), 0)
+
+
+# (model, counter column, related model, its foreign key to model)
+COUNTERS = [
+    (Post, "like_count", Like, "post"),
+    (Profile, "follower_count", Follow, "profile"),
+    (Profile, "following_count", Follow, "follower_profile"),
+]
+
+
+def recount(posts=(), profiles=()):
+    ''' recount the like_count of the given post ids and both follow counts of the given profile ids '''
+    posts, profiles = set(posts), set(profiles)
+    if posts:
+        Post.objects.filter(pk__in=posts).update(like_count=_count(Like, "post"))
+    if profiles:
+        Profile.objects.filter(pk__in=profiles).update(
+            follower_count=_count(Follow, "profile"),
+            following_count=_count(Follow, "follower_profile"),
+        )
+
+
+def reconcile():
+    """
+    Recount every counter column from the rows it counts and fix the ones
+    that drifted. Returns {"Model.column": rows repaired}.
+    """
+    repaired = {}
+    for model, column, related, field in COUNTERS:
+        wrong = list(model.objects
+            .annotate(actual=_count(related, field))
+            .exclude(**{column: F("actual")})
+            .values_list("pk", flat=True))
+        # recounted in the UPDATE itself, so a like or follow made meanwhile is not lost
+        for start in range(0, len(wrong), BATCH_SIZE):
+            model.objects.filter(pk__in=wrong[start:start + BATCH_SIZE]).update(
+                **{column: _count(related, field)})
+        repaired[f"{model.__name__}.{column}"] = len(wrong)
+    return repaired
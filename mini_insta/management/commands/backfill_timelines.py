@@ -0,0 +1,37 @@
+# File: backfill_timelines.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to rebuild mini_insta's TimelineEntry feeds from Follow and Post
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mini_insta.models import Profile
+from mini_insta.timeline import backfill_pulled_authors, mark_pulled_authors, rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = ('Mark and backfill pulled (high-follower) authors, then rewrite every (or the given) '
+            'profile\'s feed timeline; the views keep it current afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('profiles', nargs='*', type=int, help='profile ids (default: all)')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.order_by('pk')
+        if options['profiles']:
+            profiles = profiles.filter(pk__in=options['profiles'])
+
+        # decide which authors are pulled from the follower counts as they are now
+        start = time.perf_counter()
+        marked = mark_pulled_authors()
+        backfilled = backfill_pulled_authors()
+        owners = rows = 0
+        for owner in profiles.iterator():
+            with transaction.atomic():
+                rows += rebuild_timeline(owner)
+            owners += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Pulled {marked:,} authors, backfilled {backfilled:,}; '
+            f'rebuilt {owners:,} timelines ({rows:,} entries) in {time.perf_counter() - start:.2f}s'
+        ))
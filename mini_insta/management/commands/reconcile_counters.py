@@ -0,0 +1,21 @@
+# File: reconcile_counters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to recount mini_insta's like / follower / following columns
+import time
+
+from django.core.management.base import BaseCommand
+
+from mini_insta.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount Post.like_count and Profile.follower_count / following_count and repair any drift.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        repaired = reconcile()
+        for counter, rows in repaired.items():
+            self.stdout.write(f'{counter:<26} {rows:,} repaired')
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled counters in {time.perf_counter() - start:.2f}s'
+        ))
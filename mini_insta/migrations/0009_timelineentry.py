@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_timelines(apps, schema_editor):
+    ''' one TimelineEntry per (follower, post of a followed profile) '''
+    Follow = apps.get_model('mini_insta', 'Follow')
+    Post = apps.get_model('mini_insta', 'Post')
+    TimelineEntry = apps.get_model('mini_insta', 'TimelineEntry')
+    posts_by_author = {}
+    for post_id, author_id, timestamp in Post.objects.values_list('pk', 'profile_id', 'timestamp'):
+        posts_by_author.setdefault(author_id, []).append((post_id, timestamp))
+    follows = set(Follow.objects.values_list('follower_profile_id', 'profile_id'))
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id, post_id=post_id, timestamp=timestamp)
+         for owner_id, author_id in follows
+         for post_id, timestamp in posts_by_author.get(author_id, [])],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0008_profile_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='mini_insta.profile')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mini_insta.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-timestamp'], name='timeline_owner_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'post'), name='timeline_owner_post_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
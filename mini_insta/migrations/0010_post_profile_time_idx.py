@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['profile', '-timestamp'], name='post_profile_time_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    ''' fill the new counter columns from the Like and Follow rows '''
+    Post = apps.get_model('mini_insta', 'Post')
+    Profile = apps.get_model('mini_insta', 'Profile')
+    Like = apps.get_model('mini_insta', 'Like')
+    Follow = apps.get_model('mini_insta', 'Follow')
+
+    def count(model, field):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(n=Count('*')).values('n')
+        ), 0)
+
+    Post.objects.update(like_count=count(Like, 'post'))
+    Profile.objects.update(
+        follower_count=count(Follow, 'profile'),
+        following_count=count(Follow, 'follower_profile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0010_post_profile_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keep the oldest of any duplicate Follow / Like rows (left by racing
+    get_or_create calls) so 0013 can add unique constraints, then recount
+    the counter columns the duplicates inflated.
+    """
+    Post = apps.get_model('mini_insta', 'Post')
+    Profile = apps.get_model('mini_insta', 'Profile')
+    Follow = apps.get_model('mini_insta', 'Follow')
+    Like = apps.get_model('mini_insta', 'Like')
+
+    for model, fields in ((Follow, ('profile_id', 'follower_profile_id')), (Like, ('post_id', 'profile_id'))):
+        duplicates = (model.objects.order_by().values(*fields)
+                      .annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1))
+        for row in duplicates:
+            keep = row.pop('keep')
+            row.pop('n')
+            model.objects.filter(**row).exclude(id=keep).delete()
+
+    def count(model, field):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(n=Count('*')).values('n')
+        ), 0)
+
+    Post.objects.update(like_count=count(Like, 'post'))
+    Profile.objects.update(
+        follower_count=count(Follow, 'profile'),
+        following_count=count(Follow, 'follower_profile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0011_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
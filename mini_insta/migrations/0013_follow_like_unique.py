@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0012_dedupe_follow_like'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower_profile', 'profile'], name='follow_follower_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['profile', 'post'], name='like_profile_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('profile', 'follower_profile'), name='follow_profile_follower_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('post', 'profile'), name='like_post_profile_uniq'),
+        ),
+    ]
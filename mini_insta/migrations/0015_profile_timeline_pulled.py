@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0014_counters_not_editable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
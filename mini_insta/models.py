@@ -2,6 +2,7 @@
 # Author: Run Liu (lr0826@bu.edu), 9/23/2025
 # Description: The models python file for the mini_insta application
 from django.db import models
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.contrib.auth.models import User
 # Create your models here.
@@ -13,13 +14,22 @@ class Profile(models.Model):
     bio_text = models.TextField(blank=True)
     join_date = models.TextField(blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # denormalized counts, kept current by counters.py
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    # posts pulled into feeds at read time until backfilled, see timeline.py
+    timeline_pulled = models.BooleanField(default=False, editable=False)
     def __str__(self):
         ''' return the string representation of this model instance '''
         return f'{self.display_name}'
-    def get_all_posts(self):
-        ''' find and return all Posts for a given Profile. '''
-        posts = Post.objects.filter(profile=self).order_by('-timestamp')
-        return posts
+    def get_all_posts(self, before=None):
+        ''' find and return all Posts for a given Profile, newest first
+        (after a (timestamp, id) cursor if given, see pagination.py). '''
+        from .pagination import before_q
+        posts = Post.objects.filter(profile=self)
+        if before:
+            posts = posts.filter(before_q(before))
+        return posts.order_by('-timestamp', '-pk')
     def get_absolute_url(self):
         ''' return to the profile url to display '''
         return reverse("show_profile", kwargs={'pk':self.pk})
@@ -32,8 +42,8 @@ class Profile(models.Model):
         return [f.follower_profile for f in follows]            # list of Profiles
 
     def get_num_followers(self):
-        """Return the count of followers."""
-        return Follow.objects.filter(profile=self).count()
+        """Return the count of followers (the follower_count column, no query)."""
+        return self.follower_count
 
     def get_following(self):
         """
@@ -44,39 +54,59 @@ class Profile(models.Model):
         return [f.profile for f in follows]                     # list of Profiles
 
     def get_num_following(self):
-        """Return how many profiles this profile follows."""
-        return Follow.objects.filter(follower_profile=self).count()
-    def get_post_feed(self):
+        """Return how many profiles this profile follows (the following_count column, no query)."""
+        return self.following_count
+    def get_post_feed(self, before=None):
         """
-        Posts from the profiles THIS profile follows, newest first.
-        Reuses get_following() to get the followed Profile objects.
+        Posts from the profiles THIS profile follows, newest first,
+        read from the TimelineEntry table (see timeline.py).
         """
+        from .timeline import get_feed
+        return get_feed(self, before)
 
-        followed_profiles = self.get_following()          # list of profiles
-        if not followed_profiles:
-            return Post.objects.none()                    # empty QuerySet (nice for ListView)
+class PostQuerySet(models.QuerySet):
+    ''' Post queries with the helpers the list pages (feed, search) need '''
+    def with_details(self):
+        """
+        Load everything a post card shows in a fixed number of queries,
+        however many posts there are:
+          - the author (joined)
+          - photos and comments with their authors (one prefetch query each)
+        The like count is the like_count column, so it needs no query at all.
+        """
+        return (self
+            .select_related("profile")
+            .prefetch_related(
+                "photo_set",
+                Prefetch("comment_set", queryset=Comment.objects.select_related("profile")),
+            ))
 
-        followed_ids = [p.pk for p in followed_profiles]
-        return Post.objects.filter(profile_id__in=followed_ids).order_by("-timestamp")
 class Post(models.Model):
     '''model the data attributes of an Instagram post'''
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     caption = models.TextField(blank=False)
     timestamp = models.DateTimeField(auto_now=True)
+    # denormalized count, kept current by counters.py
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # a profile's posts, newest first, one cursor page at a time
+            models.Index(fields=["profile", "-timestamp"], name="post_profile_time_idx"),
+        ]
     def __str__(self):
         ''' return the string representation of this Post instance '''
         return f'{self.caption}'
     def get_all_photos(self):
-        ''' find and return all Photos for a given Post. '''
-        photos = Photo.objects.filter(post=self)
-        return photos
+        ''' find and return all Photos for a given Post (prefetched ones if loaded). '''
+        return self.photo_set.all()
     def get_absolute_url(self):
         ''' return to the post url to display '''
         return reverse("show_post", kwargs={'pk':self.pk})
     def get_all_comments(self):
         ''' retrive all comments on a Post '''
-        comments = Comment.objects.filter(post=self)           # comments that is related to this post
-        return comments
+        return self.comment_set.all()       # prefetched by with_details(), else one query
     def get_likes(self):
         """
         Return a list of Like objects for this Post.
@@ -85,10 +115,9 @@ class Post(models.Model):
         likes = Like.objects.filter(post=self)
         return likes
     def get_num_likes(self):
-        '''  Return the number of likes on this Post (int).
+        '''  Return the number of likes on this Post (int): the like_count column, no query.
         '''
-        count = Like.objects.filter(post=self).count()
-        return count
+        return self.like_count
     
 class Photo(models.Model):
     ''' model the data attributes of an image associated with a Post '''
@@ -123,6 +152,15 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="follower_profile"    # reverse accessor: who I follow
     )
+    class Meta:
+        constraints = [
+            # one row per edge: a double-click cannot follow twice
+            models.UniqueConstraint(fields=["profile", "follower_profile"], name="follow_profile_follower_uniq"),
+        ]
+        indexes = [
+            # the constraint covers "who follows me"; this covers "who do I follow"
+            models.Index(fields=["follower_profile", "profile"], name="follow_follower_profile_idx"),
+        ]
     def __str__(self):
         # Show readable names in admin/list pages
         who = self.follower_profile.display_name
@@ -143,7 +181,38 @@ class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now=True)
+    class Meta:
+        constraints = [
+            # one like per profile per post
+            models.UniqueConstraint(fields=["post", "profile"], name="like_post_profile_uniq"),
+        ]
+        indexes = [
+            # the constraint covers a post's likes; this covers a profile's likes
+            models.Index(fields=["profile", "post"], name="like_profile_post_idx"),
+        ]
     def __str__(self):
         # view this like as a string representation
         return f"{self.post.caption} liked by {self.profile.username}"
 
+
+class TimelineEntry(models.Model):
+    """
+    One Post in one Profile's feed, written when the post is created or
+    its author is followed (fan-out on write, see timeline.py), so a feed
+    is a range scan of (owner, -timestamp) instead of an IN over everyone
+    the owner follows. timestamp mirrors Post.timestamp.
+    """
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "post"], name="timeline_owner_post_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-timestamp"], name="timeline_owner_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in feed of {self.owner_id}"
@@ -0,0 +1,67 @@
+# File: pagination.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Cursor pagination on (timestamp, id) for mini_insta's post lists
+"""
+Post lists (feed, profile, search) are ordered newest first by
+(timestamp, id). A page is the next PAGE_SIZE posts strictly before a
+cursor, the (timestamp, id) of the last post already shown, so every
+page costs the same however far down the list it is. Unlike an OFFSET,
+it does not skip or repeat posts when new ones arrive.
+
+A cursor travels in the URL as "<microseconds since epoch>.<id>".
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+PAGE_SIZE = 12
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(post):
+    ''' the cursor that continues a list after post '''
+    micros = (post.timestamp - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{post.pk}"
+
+
+def decode_cursor(value):
+    ''' (timestamp, id) from an encoded cursor, or None if missing or malformed '''
+    try:
+        micros, pk = (int(part) for part in (value or "").split("."))
+        return EPOCH + timedelta(microseconds=micros), pk
+    except (ValueError, OverflowError):
+        return None
+
+
+def before_q(cursor, field="timestamp"):
+    ''' rows after cursor in (field, id) descending order; field may span a relation '''
+    timestamp, pk = cursor
+    # the redundant <= bound lets the database seek the (..., timestamp) index to the cursor
+    return Q(**{f"{field}__lte": timestamp}) & (
+        Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "pk__lt": pk})
+    )
+
+
+@dataclass
+class CursorPage:
+    ''' one page of posts and the cursor for the next one (None on the last page) '''
+    posts: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def cursor_page(queryset, page_size=PAGE_SIZE):
+    """
+    The first page_size posts of queryset, which must already be ordered
+    by (timestamp, id) descending and filtered with before_q. One extra
+    row is fetched to tell whether there is a next page.
+    """
+    posts = list(queryset[:page_size + 1])
+    if len(posts) <= page_size:
+        return CursorPage(posts)
+    posts = posts[:page_size]
+    return CursorPage(posts, encode_cursor(posts[-1]))
@@ -1,3 +1,298 @@
-from django.test import TestCase
+# File: tests.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Tests for the mini_insta application
+import io
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import counters, timeline
+from .pagination import PAGE_SIZE
+from .models import Comment, Follow, Like, Photo, Post, Profile, TimelineEntry
+
+
+class PostFeedQueryCountTests(TestCase):
+    ''' the feed page costs the same number of queries however many posts it shows '''
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = self.make_profile("viewer")
+        self.authors = [self.make_profile(f"author{i}") for i in range(3)]
+        for author in self.authors:
+            counters.add_follow(self.viewer, author)
+            timeline.add_follow(self.viewer, author)
+        self.client.force_login(self.viewer.user)
+
+    @staticmethod
+    def make_profile(username):
+        user = User.objects.create_user(username=username, password="pw")
+        return Profile.objects.create(user=user, username=username, display_name=username)
+
+    def add_posts(self, per_author):
+        ''' give every author posts with two photos, two comments and two likes each '''
+        for author in self.authors:
+            for i in range(per_author):
+                post = Post.objects.create(profile=author, caption=f"{author.username} post {i}")
+                timeline.fan_out_post(post)
+                for n in range(2):
+                    Photo.objects.create(post=post, image_url=f"https://example.com/{post.pk}/{n}.jpg")
+                for commenter in (self.viewer, self.authors[0]):
+                    Comment.objects.create(post=post, profile=commenter, text="nice")
+                    counters.add_like(post, commenter)
+
+    def feed_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("show_feed"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_is_flat(self):
+        self.add_posts(per_author=1)
+        response, small = self.feed_queries()
+        self.assertEqual(len(response.context["posts"]), 3)
+
+        self.add_posts(per_author=5)
+        with self.assertNumQueries(small):
+            response = self.client.get(reverse("show_feed"))
+        self.assertEqual(len(response.context["posts"]), PAGE_SIZE)
+
+    def test_feed_shows_likes_and_comments(self):
+        self.add_posts(per_author=1)
+        response, _ = self.feed_queries()
+        self.assertContains(response, "Likes: 2", count=3)
+        self.assertContains(response, "@viewer</strong> — nice", count=3)
+        self.assertEqual(sorted(response.context["liked_post_ids"]),
+                         sorted(Post.objects.values_list("pk", flat=True)))
+
+    def test_feed_only_has_followed_profiles(self):
+        self.add_posts(per_author=1)
+        stranger = self.make_profile("stranger")
+        Post.objects.create(profile=stranger, caption="not followed")
+        response, _ = self.feed_queries()
+        self.assertNotContains(response, "not followed")
+
+
+class TimelineTests(TestCase):
+    ''' the TimelineEntry table follows posts, follows and unfollows '''
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = PostFeedQueryCountTests.make_profile("viewer")
+        self.author = PostFeedQueryCountTests.make_profile("author")
+        self.client.force_login(self.viewer.user)
+
+    def post(self, caption):
+        post = Post.objects.create(profile=self.author, caption=caption)
+        timeline.fan_out_post(post)
+        return post
+
+    def test_follow_and_unfollow(self):
+        old = self.post("before following")
+        self.client.post(reverse("follow", kwargs={"pk": self.author.pk}))
+        new = self.post("after following")
+        self.assertEqual(list(self.viewer.get_post_feed()), [new, old])
+
+        self.client.post(reverse("delete_follow", kwargs={"pk": self.author.pk}))
+        self.assertEqual(list(self.viewer.get_post_feed()), [])
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.viewer).exists())
+
+    def test_deleted_post_leaves_the_feed(self):
+        self.client.post(reverse("follow", kwargs={"pk": self.author.pk}))
+        post = self.post("soon gone")
+        post.delete()
+        self.assertEqual(list(self.viewer.get_post_feed()), [])
+
+    def test_high_follower_author_is_pulled(self):
+        self.client.post(reverse("follow", kwargs={"pk": self.author.pk}))
+        with override_settings(MINI_INSTA_FANOUT_LIMIT=0):
+            post = self.post("read-time only")
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            self.assertEqual(list(self.viewer.get_post_feed()), [post])
+
+    def test_author_back_under_the_limit_is_backfilled(self):
+        self.client.post(reverse("follow", kwargs={"pk": self.author.pk}))
+        with override_settings(MINI_INSTA_FANOUT_LIMIT=0):
+            pulled = self.post("made while pulled")
+            self.assertTrue(Profile.objects.get(pk=self.author.pk).timeline_pulled)
+
+        # back under the limit: still pulled, and reading the feed writes nothing
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("show_feed"))
+        self.assertEqual(list(response.context["posts"]), [pulled])
+        self.assertEqual([q for q in queries if not q["sql"].startswith("SELECT")], [])
+
+        # until the backfill copies the pulled post in
+        call_command("backfill_timelines", stdout=io.StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.viewer, post=pulled).exists())
+        self.assertFalse(Profile.objects.get(pk=self.author.pk).timeline_pulled)
+        fanned = self.post("fanned out again")
+        self.assertEqual(list(self.viewer.get_post_feed()), [fanned, pulled])
+
+    def test_backfill_matches_follows(self):
+        Follow.objects.create(profile=self.author, follower_profile=self.viewer)
+        post = Post.objects.create(profile=self.author, caption="made in the shell")
+        call_command("backfill_timelines", stdout=io.StringIO())
+        self.assertEqual(list(self.viewer.get_post_feed()), [post])
+
+
+class CursorPaginationTests(TestCase):
+    ''' feed, profile and search pages walk every post once, newest first '''
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = PostFeedQueryCountTests.make_profile("viewer")
+        self.author = PostFeedQueryCountTests.make_profile("author")
+        Follow.objects.create(profile=self.author, follower_profile=self.viewer)
+        self.posts = []
+        for i in range(PAGE_SIZE * 2 + 3):
+            post = Post.objects.create(profile=self.author, caption=f"caption {i}")
+            timeline.fan_out_post(post)
+            self.posts.append(post)
+        self.posts.reverse()   # newest first
+        self.client.force_login(self.viewer.user)
+
+    def walk_cards(self, kind, **params):
+        ''' follow the post_cards endpoint's cursors to the end; returns the JSON pages '''
+        pages, before = [], None
+        while True:
+            query = dict(params, **({"before": before} if before else {}))
+            response = self.client.get(reverse("post_cards", kwargs={"kind": kind}), query)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            before = pages[-1]["next"]
+            if before is None:
+                return pages
+
+    def test_feed_pages(self):
+        response = self.client.get(reverse("show_feed"))
+        self.assertEqual(response.context["posts"], self.posts[:PAGE_SIZE])
+        response = self.client.get(reverse("show_feed"), {"before": response.context["next_cursor"]})
+        self.assertEqual(response.context["posts"], self.posts[PAGE_SIZE:PAGE_SIZE * 2])
+
+        pages = self.walk_cards("feed")
+        self.assertEqual(len(pages), 3)
+        html = "".join(page["html"] for page in pages)
+        for post in self.posts:
+            self.assertEqual(html.count(f">{post.caption}<"), 1)
+
+    def test_profile_and_search_pages(self):
+        response = self.client.get(reverse("show_profile", kwargs={"pk": self.author.pk}))
+        self.assertEqual(response.context["posts"], self.posts[:PAGE_SIZE])
+        self.assertContains(response, 'id="post-pager"')
+        pages = self.walk_cards("profile", profile=self.author.pk)
+        html = "".join(page["html"] for page in pages)
+        self.assertEqual(html.count("<a href="), len(self.posts))
+
+        response = self.client.get(reverse("search"), {"q": "caption"})
+        self.assertEqual(response.context["posts"], self.posts[:PAGE_SIZE])
+        self.assertEqual(len(self.walk_cards("search", q="caption")), 3)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse("post_cards", kwargs={"kind": "nope"})).status_code, 404)
+        self.assertEqual(self.client.get(reverse("post_cards", kwargs={"kind": "profile"})).status_code, 404)
+        # a malformed cursor starts from the top
+        response = self.client.get(reverse("show_feed"), {"before": "garbage"})
+        self.assertEqual(response.context["posts"], self.posts[:PAGE_SIZE])
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("post_cards", kwargs={"kind": "feed"})).status_code, 403)
+
+
+class CounterTests(TestCase):
+    ''' like / follower / following counts follow the views, and reconcile repairs drift '''
+
+    def setUp(self):
+        self.viewer = PostFeedQueryCountTests.make_profile("viewer")
+        self.author = PostFeedQueryCountTests.make_profile("author")
+        self.post = Post.objects.create(profile=self.author, caption="hello")
+        self.client.force_login(self.viewer.user)
+
+    def refresh(self):
+        for obj in (self.viewer, self.author, self.post):
+            obj.refresh_from_db()
+
+    def test_views_keep_counts(self):
+        for _ in range(2):   # a double click counts once
+            self.client.post(reverse("follow", kwargs={"pk": self.author.pk}))
+            self.client.post(reverse("like", kwargs={"pk": self.post.pk}))
+        self.refresh()
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (1, 1))
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse("delete_follow", kwargs={"pk": self.author.pk}))
+        self.client.post(reverse("delete_like", kwargs={"pk": self.post.pk}))
+        self.client.post(reverse("delete_like", kwargs={"pk": self.post.pk}))
+        self.refresh()
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (0, 0))
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_reads_cost_no_queries(self):
+        counters.add_like(self.post, self.viewer)
+        counters.add_follow(self.viewer, self.author)
+        self.refresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post.get_num_likes(), 1)
+            self.assertEqual(self.author.get_num_followers(), 1)
+            self.assertEqual(self.viewer.get_num_following(), 1)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(post=self.post, profile=self.viewer)            # bypasses the counters
+        counters.add_follow(self.viewer, self.author)
+        Profile.objects.filter(pk=self.author.pk).update(follower_count=7)
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.refresh()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (1, 1))
+        self.assertRegex(out.getvalue(), r"Post.like_count +1 repaired")
+
+    def test_unlike_and_unfollow_with_drifted_counts(self):
+        # rows made in the shell are never counted: the counters stay at 0
+        Like.objects.create(post=self.post, profile=self.viewer)
+        Follow.objects.create(profile=self.author, follower_profile=self.viewer)
+        response = self.client.post(reverse("delete_like", kwargs={"pk": self.post.pk}))
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse("delete_follow", kwargs={"pk": self.author.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.refresh()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (0, 0))
+
+    def test_admin_changes_are_counted(self):
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(admin_user)
+        self.client.post(reverse("admin:mini_insta_like_add"),
+                         {"post": self.post.pk, "profile": self.viewer.pk})
+        self.client.post(reverse("admin:mini_insta_follow_add"),
+                         {"profile": self.author.pk, "follower_profile": self.viewer.pk})
+        self.refresh()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (1, 1))
+
+        like = Like.objects.get()
+        self.client.post(reverse("admin:mini_insta_like_delete", args=[like.pk]), {"post": "yes"})
+        follow = Follow.objects.get()
+        self.client.post(reverse("admin:mini_insta_follow_changelist"),
+                         {"action": "delete_selected", "_selected_action": [follow.pk], "post": "yes"})
+        self.refresh()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertEqual((self.author.follower_count, self.viewer.following_count), (0, 0))
+        self.assertNotIn("like_count", self.client.get(
+            reverse("admin:mini_insta_post_change", args=[self.post.pk])).content.decode())
+
+    def test_duplicates_are_rejected(self):
+        self.assertTrue(counters.add_like(self.post, self.viewer))
+        self.assertFalse(counters.add_like(self.post, self.viewer))
+        self.assertTrue(counters.add_follow(self.viewer, self.author))
+        self.assertFalse(counters.add_follow(self.viewer, self.author))
+        # a request that lost the race cannot sneak a second row in either
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Like.objects.create(post=self.post, profile=self.viewer)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(profile=self.author, follower_profile=self.viewer)
+        self.refresh()
+        self.assertEqual((self.post.like_count, self.author.follower_count), (1, 1))
@@ -0,0 +1,172 @@
+# File: timeline.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Fan-out-on-write feeds for mini_insta (the TimelineEntry table)
+"""
+Every Profile's feed is materialized in TimelineEntry: one row per post
+the profile should see. The views keep it current with explicit calls:
+
+    CreatePostView    -> fan_out_post(post)     one row per follower
+    UpdatePostView    -> touch_post(post)       Post.timestamp is auto_now
+    FollowCreateView  -> add_follow(...)        copy the author's posts in
+    FollowDeleteView  -> remove_follow(...)     take them out again
+    (deleting a Post or Profile cascades to its rows)
+
+Hybrid mode: an author with more than fanout_limit() followers
+(settings.MINI_INSTA_FANOUT_LIMIT) is not fanned out, since one post
+would write that many rows. Their posts are pulled in when a follower
+reads the feed instead. Profile.timeline_pulled records that an author
+is pulled, so their followers' timelines are missing posts. It is set
+on the write path, by the first post or follow that is not fanned out,
+and only cleared by `manage.py backfill_timelines` once they are back
+under the limit and backfill_pulled_authors has copied all their posts
+in, so no post made while pulled is lost. Reading a feed never writes.
+
+Anything created elsewhere (admin, shell) is also picked up by
+`manage.py backfill_timelines`.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .pagination import before_q
+
+BATCH_SIZE = 1000
+
+
+def fanout_limit():
+    ''' followers above which an author's posts are pulled at read time (settings.MINI_INSTA_FANOUT_LIMIT) '''
+    return getattr(settings, "MINI_INSTA_FANOUT_LIMIT", 5000)
+
+
+def _is_pulled(profile_id):
+    """
+    True if the author's posts are pulled at read time rather than written
+    into timelines; marks an author who is now over fanout_limit(), so
+    every post or follow that is not fanned out leaves the flag behind
+    for the backfill.
+    """
+    marked = (Profile.objects
+        .filter(pk=profile_id, follower_count__gt=fanout_limit(), timeline_pulled=False)
+        .update(timeline_pulled=True))
+    return bool(marked) or Profile.objects.filter(pk=profile_id, timeline_pulled=True).exists()
+
+
+def pulled_profile_ids(owner):
+    """
+    ids of the profiles owner follows whose posts are pulled at read time.
+    Read from the database on every call (one indexed join), not cached,
+    so every worker sees an author flip the moment it is committed.
+    """
+    return list(Follow.objects
+        .filter(follower_profile=owner, profile__timeline_pulled=True)
+        .values_list("profile_id", flat=True)
+        .distinct())
+
+
+def mark_pulled_authors():
+    """
+    Mark every author over fanout_limit() as pulled, for follower counts
+    that changed outside the views (admin, reconcile_counters). Returns
+    the number of authors marked.
+    """
+    return (Profile.objects.filter(follower_count__gt=fanout_limit(), timeline_pulled=False)
+            .update(timeline_pulled=True))
+
+
+def _add(owner_ids, posts):
+    ''' insert (owner, post) rows, skipping the ones already there '''
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id, post_id=post.pk, timestamp=post.timestamp)
+         for owner_id in owner_ids for post in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    ''' put a new post in the timeline of everyone following its author '''
+    if _is_pulled(post.profile_id):
+        return
+    followers = (Follow.objects.filter(profile_id=post.profile_id)
+                 .values_list("follower_profile_id", flat=True).distinct())
+    _add(followers, [post])
+
+
+def touch_post(post):
+    ''' keep the timeline rows' timestamp in step with an edited post '''
+    TimelineEntry.objects.filter(post=post).update(timestamp=post.timestamp)
+
+
+def add_follow(follower, followed):
+    ''' follower now follows followed: copy followed's posts into follower's timeline '''
+    if _is_pulled(followed.pk):
+        return
+    _add([follower.pk], Post.objects.filter(profile=followed).only("pk", "timestamp"))
+
+
+def remove_follow(follower, followed):
+    ''' follower no longer follows followed: drop followed's posts from the timeline '''
+    TimelineEntry.objects.filter(owner=follower, post__profile=followed).delete()
+
+
+def backfill_pulled_authors():
+    """
+    Fan out every post of the pulled authors who are back under
+    fanout_limit() to all their followers, and stop pulling them. Returns
+    the number of authors backfilled.
+    """
+    limit = fanout_limit()
+    authors = list(Profile.objects
+        .filter(timeline_pulled=True, follower_count__lte=limit)
+        .values_list("pk", flat=True))
+    done = 0
+    for author_id in authors:
+        with transaction.atomic():
+            # cleared before the copy: a post skipped meanwhile sets it again
+            cleared = (Profile.objects
+                .filter(pk=author_id, timeline_pulled=True, follower_count__lte=limit)
+                .update(timeline_pulled=False))
+            if not cleared:
+                continue
+            followers = list(Follow.objects.filter(profile_id=author_id)
+                             .values_list("follower_profile_id", flat=True).distinct())
+            _add(followers, Post.objects.filter(profile_id=author_id).only("pk", "timestamp"))
+            done += 1
+    return done
+
+
+def rebuild_timeline(owner):
+    """
+    Rewrite owner's timeline from the Follow and Post tables; returns the
+    number of rows written. Pulled (high-follower) authors are skipped.
+    """
+    TimelineEntry.objects.filter(owner=owner).delete()
+    pulled = pulled_profile_ids(owner)
+    posts = list(Post.objects
+        .filter(profile_id__in=Follow.objects.filter(follower_profile=owner).values("profile_id"))
+        .exclude(profile_id__in=pulled)
+        .only("pk", "timestamp"))
+    _add([owner.pk], posts)
+    return len(posts)
+
+
+def get_feed(owner, before=None):
+    """
+    Posts in owner's feed, newest first: the owner's TimelineEntry rows,
+    plus, in hybrid mode, the posts of followed high-follower authors.
+    before: a (timestamp, id) cursor (see pagination.py) to start after.
+    """
+    pulled = pulled_profile_ids(owner)
+    if not pulled:
+        # filtered and ordered by the entry's copy of the timestamp, in one
+        # filter() so it is the same join: a seek into the (owner, -timestamp) index
+        condition = Q(timelineentry__owner=owner)
+        if before:
+            condition &= before_q(before, "timelineentry__timestamp")
+        return Post.objects.filter(condition).order_by("-timelineentry__timestamp", "-pk")
+    fanned = TimelineEntry.objects.filter(owner=owner).values("post_id")
+    posts = Post.objects.filter(Q(pk__in=fanned) | Q(profile_id__in=pulled))
+    if before:
+        posts = posts.filter(before_q(before))
+    return posts.order_by("-timestamp", "-pk")
@@ -18,6 +18,8 @@ urlpatterns = [
     path("profile/<int:pk>/following", ShowFollowingDetailView.as_view(), name="show_following"),
     path("profile/feed", PostFeedListView.as_view(), name="show_feed"),
     path("profile/search", SearchView.as_view(), name="search"),
+    # next page of post cards for infinite scroll (feed / search / profile)
+    path("cards/<str:kind>", PostCardsView.as_view(), name="post_cards"),
     # authorization-related URLs
     path('login/', auth_views.LoginView.as_view(template_name='mini_insta/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='logout_confirmation'), name='logout'),
@@ -5,6 +5,8 @@ from django.shortcuts import render
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from .models import *
 from .forms import *
+from . import counters, timeline
+from .pagination import before_q, cursor_page, decode_cursor
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.forms import UserCreationForm
@@ -12,8 +14,44 @@ from django.contrib.auth.models import User
 from django.contrib.auth import login
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views import View
 # Create your views here.
 
+# ---- cursor-paginated post lists (see pagination.py) ----
+def feed_page(viewer, before=None):
+    ''' one page of viewer's feed, with everything a feed card shows '''
+    return cursor_page(viewer.get_post_feed(before).with_details())
+
+def profile_page(profile, before=None):
+    ''' one page of a profile's posts for the thumbnail grid '''
+    return cursor_page(profile.get_all_posts(before).prefetch_related("photo_set"))
+
+def search_page(query, before=None):
+    ''' one page of the posts whose caption contains query '''
+    posts = Post.objects.filter(caption__icontains=query)
+    if before:
+        posts = posts.filter(before_q(before))
+    return cursor_page(posts.order_by("-timestamp", "-pk").with_details())
+
+def liked_post_ids(viewer, posts):
+    ''' ids of the posts (a page) that viewer has liked '''
+    return list(Like.objects.filter(
+        profile=viewer,
+        post_id__in=[post.pk for post in posts]
+    ).values_list("post_id", flat=True))
+
+def pager_context(page, kind, **params):
+    ''' template context for post_pager.html: the next cursor and where to fetch it '''
+    query = urlencode(params)
+    return {
+        "next_cursor": page.next_cursor,
+        "more_url": reverse("post_cards", kwargs={"kind": kind}) + (f"?{query}" if query else ""),
+        "pager_query": urlencode({k: v for k, v in params.items() if k != "profile"}),
+    }
+
 class ProfileListView(ListView): 
     ''' a class-based view called ProfileListView, which inherits from the generic
     ListView. Use this view to obtain data for all Profile records, 
@@ -80,7 +118,16 @@ class LoginProfileMixin(LoginRequiredMixin):
         ctx["viewer_profile"] = self.viewer_profile
         return ctx
 
-class ProfileDetailView(DetailView):
+class ProfilePostsMixin:
+    ''' add the first (or ?before=) page of the profile's posts to a profile page '''
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        page = profile_page(self.object, decode_cursor(self.request.GET.get("before")))
+        ctx["posts"] = page.posts
+        ctx.update(pager_context(page, "profile", profile=self.object.pk))
+        return ctx
+
+class ProfileDetailView(ProfilePostsMixin, DetailView):
     ''' obtain data for one Profile record, and to delegate work to 
     a template called show_profile.html to display that Profile.'''
     model = Profile
@@ -135,6 +182,7 @@ class CreatePostView(LoginProfileMixin, CreateView):
         for f in files:
             Photo.objects.create(post=self.object, image_file=f)
 
+        timeline.fan_out_post(self.object)
         return response
 
 
@@ -171,6 +219,11 @@ class UpdatePostView(LoginProfileMixin, UpdateView):
     def get_queryset(self):
         ''' filter the queryset by profile '''
         return Post.objects.filter(profile__user=self.request.user)
+    def form_valid(self, form):
+        ''' saving bumps Post.timestamp (auto_now); move the post in every feed too '''
+        response = super().form_valid(form)
+        timeline.touch_post(self.object)
+        return response
     def get_success_url(self):
         ''' updated get success url function that does not rely on pk '''
         return reverse("show_profile", kwargs={"pk": self.object.profile_id})
@@ -204,18 +257,16 @@ class PostFeedListView(LoginProfileMixin, ListView):
     context_object_name = "posts"
 
     def get_queryset(self):
-        # Show posts from profiles the viewer follows, newest first
-        return self.viewer_profile.get_post_feed()
+        # One page of posts from profiles the viewer follows, newest first,
+        # with authors, photos, comments and like counts loaded up front
+        self.page = feed_page(self.viewer_profile, decode_cursor(self.request.GET.get("before")))
+        return self.page.posts
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        posts = ctx["posts"]
-        liked_ids = Like.objects.filter(
-            profile=self.viewer_profile,
-            post__in=posts
-        ).values_list("post_id", flat=True)
-        # Use list so Django template “in” works reliably
-        ctx["liked_post_ids"] = list(liked_ids)
+        ctx["liked_post_ids"] = liked_post_ids(self.viewer_profile, ctx["posts"])
+        ctx["next_url"] = reverse("show_feed")
+        ctx.update(pager_context(self.page, "feed"))
         ctx["profile"] = self.viewer_profile
         ctx["viewer_profile"] = self.viewer_profile
         return ctx
@@ -232,11 +283,13 @@ class SearchView(LoginProfileMixin, ListView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Post.objects.filter(caption__icontains=self.query).order_by("-timestamp")
+        self.page = search_page(self.query, decode_cursor(self.request.GET.get("before")))
+        return self.page.posts
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["query"] = self.query
+        ctx.update(pager_context(self.page, "search", q=self.query))
         p1 = Profile.objects.filter(username__icontains=self.query)
         p2 = Profile.objects.filter(display_name__icontains=self.query)
         p3 = Profile.objects.filter(bio_text__icontains=self.query)
@@ -301,10 +354,8 @@ class FollowCreateView(LoginProfileMixin, TemplateView):
 
         target = Profile.objects.get(pk=kwargs["pk"])
         if target.pk != self.viewer_profile.pk:  # block self-follow
-            Follow.objects.get_or_create(
-                profile=target,
-                follower_profile=self.viewer_profile
-            )
+            if counters.add_follow(self.viewer_profile, target):
+                timeline.add_follow(self.viewer_profile, target)
         nxt = request.POST.get("next") or request.GET.get("next")
         return redirect(nxt or reverse("show_profile", kwargs={"pk": target.pk}))
 
@@ -321,7 +372,8 @@ class FollowDeleteView(LoginProfileMixin, TemplateView):
             return redirect(reverse("create_profile"))
 
         target = Profile.objects.get(pk=kwargs["pk"])
-        Follow.objects.filter(profile=target, follower_profile=self.viewer_profile).delete()
+        if counters.remove_follow(self.viewer_profile, target):
+            timeline.remove_follow(self.viewer_profile, target)
         nxt = request.POST.get("next") or request.GET.get("next")
         return redirect(nxt or reverse("show_profile", kwargs={"pk": target.pk}))
 
@@ -339,7 +391,7 @@ class LikeCreateView(LoginProfileMixin, TemplateView):
 
         post = Post.objects.get(pk=kwargs["pk"])
         if post.profile_id != self.viewer_profile.pk:  # block self-like
-            Like.objects.get_or_create(post=post, profile=self.viewer_profile)
+            counters.add_like(post, self.viewer_profile)
 
         nxt = request.POST.get("next") or request.GET.get("next")
         return redirect(nxt or reverse("show_post", kwargs={"pk": post.pk}))
@@ -357,12 +409,12 @@ class LikeDeleteView(LoginProfileMixin, TemplateView):
             return redirect(reverse("create_profile"))
 
         post = Post.objects.get(pk=kwargs["pk"])
-        Like.objects.filter(post=post, profile=self.viewer_profile).delete()
+        counters.remove_like(post, self.viewer_profile)
 
         nxt = request.POST.get("next") or request.GET.get("next")
         return redirect(nxt or reverse("show_post", kwargs={"pk": post.pk}))
 # new view
-class MyProfileDetailView(LoginProfileMixin, DetailView):
+class MyProfileDetailView(LoginProfileMixin, ProfilePostsMixin, DetailView):
     """Show the logged-in user's own Profile at /mini_insta/profile/"""
     model = Profile
     template_name = "mini_insta/show_profile.html"
@@ -371,3 +423,43 @@ class MyProfileDetailView(LoginProfileMixin, DetailView):
     def get_object(self, queryset=None):
         # LoginProfileMixin already set self.viewer_profile
         return self.viewer_profile
+
+class PostCardsView(View):
+    """
+    JSON for infinite scroll: {"html": the next page of rendered post
+    cards, "next": cursor for the page after it, or null}. kind is
+    "feed", "search" (?q=) or "profile" (?profile=<pk>); ?before= is the
+    cursor from the previous page.
+    """
+    def get(self, request, kind):
+        before = decode_cursor(request.GET.get("before"))
+        ctx = {}
+        if kind == "profile":
+            try:
+                profile = Profile.objects.get(pk=int(request.GET.get("profile", "")))
+            except (ValueError, Profile.DoesNotExist):
+                raise Http404("No such profile")
+            page = profile_page(profile, before)
+            template = "mini_insta/profile_cards.html"
+        elif kind in ("feed", "search"):
+            viewer = None
+            if request.user.is_authenticated:
+                viewer = Profile.objects.filter(user=request.user).order_by("id").first()
+            if viewer is None:
+                return JsonResponse({"error": "login required"}, status=403)
+            if kind == "feed":
+                page = feed_page(viewer, before)
+                ctx["liked_post_ids"] = liked_post_ids(viewer, page.posts)
+                ctx["profile"] = viewer
+                ctx["next_url"] = reverse("show_feed")
+                template = "mini_insta/feed_cards.html"
+            else:
+                page = search_page((request.GET.get("q") or "").strip(), before)
+                template = "mini_insta/search_cards.html"
+        else:
+            raise Http404("No such post list")
+        ctx["posts"] = page.posts
+        return JsonResponse({
+            "html": render_to_string(template, ctx, request=request),
+            "next": page.next_cursor,
+        })
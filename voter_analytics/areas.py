@@ -0,0 +1,69 @@
+# File: areas.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Per-precinct / per-zipcode summaries for the precinct dashboard
+import re
+from dataclasses import dataclass
+
+from .filters import ELECTIONS
+from .models import AreaRollup
+from .snapshot import get_snapshot_engine
+
+
+@dataclass
+class AreaSummary:
+    """
+    One precinct or zipcode on the dashboard:
+    - voters: registered voters
+    - parties: [(party, share of voters)] largest first ('' for no party)
+    - avg_score: mean voter_score
+    - turnout: [(election field, label, share of voters who voted)]
+    """
+    area: str
+    voters: int
+    parties: list
+    avg_score: float
+    turnout: list
+
+
+def _natural_key(area):
+    ''' sort '2' before '10' and '10A' after '10' '''
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in re.findall(r'\d+|\D+', area)]
+
+
+def area_summaries(level):
+    """
+    AreaSummary for every area of a level (AreaRollup.PRECINCT or
+    ZIPCODE), in natural order: from the memory-mapped snapshot when it
+    is current, else from one query over the AreaRollup rows.
+    """
+    engine = get_snapshot_engine()
+    if engine is not None:
+        rows = engine.area_rows(level)
+    else:
+        rows = AreaRollup.objects.filter(level=level).order_by().values()
+
+    totals = {}
+    for row in rows:
+        t = totals.setdefault(row['area'], {'voters': 0, 'score': 0, 'parties': {},
+                                            **{name: 0 for name, _ in ELECTIONS}})
+        t['voters'] += row['voters']
+        t['score'] += row['score_total']
+        t['parties'][row['party']] = t['parties'].get(row['party'], 0) + row['voters']
+        for name, _ in ELECTIONS:
+            t[name] += row[name]
+
+    summaries = []
+    for area in sorted(totals, key=_natural_key):
+        t = totals[area]
+        n = t['voters']
+        if not n:
+            continue
+        summaries.append(AreaSummary(
+            area=area,
+            voters=n,
+            parties=sorted(((p, c / n) for p, c in t['parties'].items()), key=lambda pc: -pc[1]),
+            avg_score=t['score'] / n,
+            turnout=[(name, label, t[name] / n) for name, label in ELECTIONS],
+        ))
+    return summaries
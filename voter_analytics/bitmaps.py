@@ -0,0 +1,268 @@
+# File: bitmaps.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Bitset index over voter ids for election-participation queries
+"""
+One bitset per election (bit n set = the n-th stored voter, in pk order,
+voted), plus one for every stored voter. Bits are dense row positions rather
+than raw pks, so the bitsets stay as long as the table however far the
+AUTOINCREMENT counter has moved; the sorted pk array saved beside them maps
+positions back to pks. Bitsets are plain Python ints, so AND / OR / popcount
+run in C over the whole registry at once:
+
+    index = get_bitmaps()
+    both = index.voted_all(['v20state', 'v22general'])
+    index.count(both), index.ids(both)
+    index.turnout(within=both)
+
+The importer rebuilds the index after every full load, patches the
+previous one with the rows an incremental sync touched, and saves it
+under storage.data_dir(), stamped with the data version it was built from.
+"""
+import struct
+from array import array
+from bisect import bisect_left
+import threading
+import time
+
+from .filters import ELECTION_FIELDS
+from .models import Voter, VoterImport
+from .storage import MISSING_RETRY_SECONDS, atomic_write_bytes, data_dir
+
+FILENAME = 'election_bitmaps.bin'
+_MAGIC = b'VOTERBM2'
+
+# bit positions set in each byte value, for turning a bitset back into positions
+_BYTE_BITS = [[i for i in range(8) if b >> i & 1] for b in range(256)]
+
+
+def bitset_from_ids(ids):
+    ''' bitset (int) with the bits of the given non-negative positions set '''
+    ids = list(ids)
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _set_bit(bits, pos, value):
+    return bits | (1 << pos) if value else bits & ~(1 << pos)
+
+
+def _remove_bit(bits, pos):
+    ''' bits with position pos taken out and the higher bits moved down one '''
+    return bits & ((1 << pos) - 1) | bits >> (pos + 1) << pos
+
+
+def _insert_bit(bits, pos, value):
+    ''' bits with value put in at position pos and the higher bits moved up one '''
+    return bits & ((1 << pos) - 1) | bits >> pos << (pos + 1) | int(bool(value)) << pos
+
+
+def ids_from_bitset(bits):
+    ''' sorted list of the positions set in bits '''
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for offset, byte in enumerate(data):
+        if byte:
+            base = offset * 8
+            ids.extend(base + i for i in _BYTE_BITS[byte])
+    return ids
+
+
+class ElectionBitmaps:
+    ''' the per-election bitsets for one data version '''
+
+    def __init__(self, version, pks, elections):
+        self.version = version
+        self.pks = pks                # array('q') of stored pks, ascending; bit n = pks[n]
+        self.voters = (1 << len(pks)) - 1   # every stored voter
+        self.elections = elections    # election field -> bitset
+
+    @classmethod
+    def build(cls, version):
+        ''' one pass over the Voter table's pk and election columns, in pk order '''
+        pks = array('q')
+        voted = {name: [] for name in ELECTION_FIELDS}
+        rows = Voter.objects.order_by('pk').values_list('pk', *ELECTION_FIELDS).iterator(chunk_size=20000)
+        for row, (pk, *flags) in enumerate(rows):
+            pks.append(pk)
+            for name, flag in zip(ELECTION_FIELDS, flags):
+                if flag:
+                    voted[name].append(row)
+        return cls(version, pks, {name: bitset_from_ids(positions) for name, positions in voted.items()})
+
+    def patched(self, version, changes):
+        """
+        A copy for data version version with the rows in changes (an
+        importer.VoterChanges against this index's version) updated, taken
+        out or added, or None when so many rows changed that build() is
+        the cheaper way (every deleted or added row shifts the bitsets).
+        """
+        if len(changes.pks) > len(self.pks) * PATCH_MAX_SHARE:
+            return None
+        current = {row['pk']: row for row in changes.after()}
+        pks = array('q', self.pks)
+        elections = dict(self.elections)
+        # rows already in the index, from the highest position down so
+        # removals do not move the positions still to visit
+        for pk in sorted(changes.pks, reverse=True):
+            pos = bisect_left(pks, pk)
+            if pos == len(pks) or pks[pos] != pk:
+                continue
+            row = current.pop(pk, None)
+            if row is None:
+                del pks[pos]
+                for name, bits in elections.items():
+                    elections[name] = _remove_bit(bits, pos)
+            else:
+                for name, bits in elections.items():
+                    elections[name] = _set_bit(bits, pos, row[name])
+        # then the new rows
+        for pk in sorted(current):
+            pos = bisect_left(pks, pk)
+            pks.insert(pos, pk)
+            for name, bits in elections.items():
+                elections[name] = _insert_bit(bits, pos, current[pk][name])
+        return ElectionBitmaps(version, pks, elections)
+
+    def voted_all(self, names):
+        ''' bitset of voters who voted in every one of the named elections '''
+        bits = self.voters
+        for name in names:
+            bits &= self.elections[name]
+        return bits
+
+    def count(self, bits):
+        return bits.bit_count()
+
+    def ids(self, bits):
+        ''' sorted pks of the voters set in bits '''
+        pks = self.pks
+        return [pks[row] for row in ids_from_bitset(bits)]
+
+    def turnout(self, within=None):
+        ''' {election: number of voters in within (default: all) who voted} '''
+        within = self.voters if within is None else within
+        return {name: (bits & within).bit_count() for name, bits in self.elections.items()}
+
+    # ---- persistence ----
+    def to_bytes(self):
+        parts = [_MAGIC, struct.pack('<qIQ', self.version, len(self.elections), len(self.pks)),
+                 self.pks.tobytes()]
+        for name, bits in self.elections.items():
+            raw = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+            label = name.encode('ascii')
+            parts.append(struct.pack('<HQ', len(label), len(raw)))
+            parts.append(label)
+            parts.append(raw)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError('not an election bitmap file')
+        pos = len(_MAGIC)
+        version, n, count = struct.unpack_from('<qIQ', data, pos)
+        pos += struct.calcsize('<qIQ')
+        pks = array('q')
+        pks.frombytes(data[pos:pos + count * 8])
+        pos += count * 8
+        sets = {}
+        for _ in range(n):
+            name_len, raw_len = struct.unpack_from('<HQ', data, pos)
+            pos += struct.calcsize('<HQ')
+            name = data[pos:pos + name_len].decode('ascii')
+            pos += name_len
+            sets[name] = int.from_bytes(data[pos:pos + raw_len], 'little')
+            pos += raw_len
+        return cls(version, pks, sets)
+
+    def save(self):
+        atomic_write_bytes(data_dir() / FILENAME, self.to_bytes())
+
+
+# above this share of the stored rows changed, an incremental sync
+# rebuilds the index instead of patching it
+PATCH_MAX_SHARE = 0.1
+
+
+def _read_bitmaps():
+    ''' the saved ElectionBitmaps, whatever their version, or None '''
+    try:
+        return ElectionBitmaps.from_bytes((data_dir() / FILENAME).read_bytes())
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def rebuild_bitmaps(voter_import, changes=None):
+    """
+    Post-commit import step: save the index for a new data version,
+    patched from the previous version's index with changes (an
+    importer.VoterChanges) when there is one to patch, else built from
+    the Voter table.
+    """
+    global _bitmaps_missing
+    index = None
+    if changes is not None:
+        previous = _read_bitmaps()
+        if previous is not None and previous.version == voter_import.previous_version():
+            index = previous.patched(voter_import.pk, changes)
+    if index is None:
+        index = ElectionBitmaps.build(voter_import.pk)
+    index.save()
+    _bitmaps_missing = None
+
+
+# above this many matching ids an IN (...) list costs more than letting
+# the database test the election columns while it walks an index
+MAX_PREFILTER_IDS = 5000
+
+
+def election_prefilter(filters):
+    """
+    Primary keys of the voters who voted in every election filters
+    requires, or None when the index cannot help (no election filter,
+    index missing or stale, or too many matches).
+    """
+    if not filters.elections:
+        return None
+    index = get_bitmaps()
+    if index is None:
+        return None
+    bits = index.voted_all(filters.elections)
+    if index.count(bits) > MAX_PREFILTER_IDS:
+        return None
+    return index.ids(bits)
+
+
+_bitmaps = None
+_bitmaps_lock = threading.Lock()
+# (data version, time.monotonic()) of the last failed load
+_bitmaps_missing = None
+
+
+def get_bitmaps():
+    """
+    The saved ElectionBitmaps if they match the current data version,
+    else None (callers fall back to the ORM). Cached per process and
+    reloaded after an import; a missing or stale file is not looked for
+    again for MISSING_RETRY_SECONDS, unless the data version changes.
+    """
+    global _bitmaps, _bitmaps_missing
+    version = VoterImport.current_version()
+    if _bitmaps is not None and _bitmaps.version == version:
+        return _bitmaps
+    missing = _bitmaps_missing
+    if missing is not None and missing[0] == version and time.monotonic() - missing[1] < MISSING_RETRY_SECONDS:
+        return None
+    with _bitmaps_lock:
+        if _bitmaps is None or _bitmaps.version != version:
+            loaded = _read_bitmaps()
+            if loaded is None or loaded.version != version:
+                _bitmaps_missing = (version, time.monotonic())
+                return None
+            _bitmaps = loaded
+            _bitmaps_missing = None
+        return _bitmaps
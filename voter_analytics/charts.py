@@ -0,0 +1,135 @@
+# File: charts.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Chart rendering for the voter graphs page, with an in-process cache
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# dotted path of the default renderer; plotly is only imported when a
+# chart is first drawn, not when the URLconf loads this module
+DEFAULT_CHART_BACKEND = 'voter_analytics.plotly_charts.render_graphs'
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)
+
+
+def get_chart_backend():
+    """
+    The renderer named by the VOTER_CHART_BACKEND setting (a dotted path
+    to a callable taking a stats.VoterStats and returning a dict of HTML
+    fragments keyed graph_births, graph_party, graph_elections).
+    """
+    return _load_backend(getattr(settings, 'VOTER_CHART_BACKEND', DEFAULT_CHART_BACKEND))
+
+
+def render_graphs(stats):
+    ''' render the graphs page's three charts for a VoterStats with the configured backend '''
+    return get_chart_backend()(stats)
+
+
+class ChartCache:
+    """
+    Thread-safe LRU cache of rendered chart fragments (dicts of strings),
+    capped at max_entries and max_bytes of fragment text.
+
+    get_or_render() is stampede-protected: while one thread renders a key,
+    other threads asking for the same key wait for its result instead of
+    rendering it again.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, wait_timeout=30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._rendering = {}            # key -> threading.Event
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value):
+        return sum(len(fragment) for fragment in value.values())
+
+    def _lookup(self, key):
+        ''' cached value or None; caller holds the lock '''
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key, value):
+        ''' add value and evict least recently used entries; caller holds the lock '''
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def get_or_render(self, key, render):
+        ''' the cached value for key, calling render() (once) on a miss '''
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                event = self._rendering.get(key)
+                if event is None:
+                    # this thread renders; later arrivals wait on the event
+                    event = self._rendering[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            # someone else is rendering this key: wait, then look again
+            # (if that render failed, this thread renders it)
+            event.wait(self.wait_timeout)
+
+        try:
+            value = render()
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._rendering.pop(key, None)
+            event.set()
+
+    def stats(self):
+        ''' counters for monitoring '''
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+# one cache per worker process
+chart_cache = ChartCache()
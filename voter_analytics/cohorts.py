@@ -0,0 +1,224 @@
+# File: cohorts.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Side-by-side statistics for two voter cohorts, computed in one pass
+"""
+compare_cohorts(a, b) takes two VoterFilters and returns a
+CohortComparison: turnout per election, voter score distribution and
+birth year distribution for each cohort, plus the differences.
+
+Both cohorts come out of a single pass. Every backend produces cells
+(birth_year, voter_score, elections bitmask, voters in A, voters in B)
+and one fold turns them into both cohorts' series:
+- the memory-mapped snapshot / NumPy engine: two boolean masks, then a
+  bincount over the union weighted by each mask
+- the VoterRollup cube: one GROUP BY with Sum(filter=...) per cohort
+- the Voter table (searches): one GROUP BY with Count(filter=...) per
+  cohort over the rows in either cohort
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .filters import ELECTION_BITS, ELECTION_FIELDS, ELECTIONS, VoterFilters
+from .models import Voter, VoterRollup
+
+# GET parameter prefixes of the two cohorts' filters
+PREFIXES = ('a_', 'b_')
+# what is compared before any cohort is chosen
+DEFAULT_PARTIES = ('D', 'U')
+
+
+def cohorts_from_querydict(params):
+    ''' the (a, b) VoterFilters of a request's a_ / b_ parameters, DEFAULT_PARTIES if it has none '''
+    if not any(key.startswith(PREFIXES) for key in params):
+        return tuple(VoterFilters(party=party) for party in DEFAULT_PARTIES)
+    return tuple(VoterFilters.from_querydict(params, prefix=prefix) for prefix in PREFIXES)
+
+
+@dataclass
+class CohortStats:
+    """
+    One cohort's series:
+    - total: number of voters
+    - turnout: [(election field, label, voters who voted, rate)]
+    - scores: {voter_score: voters}
+    - birth_years: {birth year: voters}, voters with no birth year left out
+    """
+    total: int
+    turnout: list
+    scores: dict
+    birth_years: dict
+
+    def share(self, n):
+        return n / self.total if self.total else 0.0
+
+
+@dataclass
+class CohortComparison:
+    ''' two cohorts' stats, with helpers that line their series up side by side '''
+    a: CohortStats
+    b: CohortStats
+
+    def turnout_rows(self):
+        ''' [(label, rate A, rate B, B - A)] per election '''
+        return [(label, ra, rb, rb - ra)
+                for (_, label, _, ra), (_, _, _, rb) in zip(self.a.turnout, self.b.turnout)]
+
+    def score_rows(self):
+        ''' [(score, share of A, share of B)] for every score either cohort has '''
+        scores = sorted(set(self.a.scores) | set(self.b.scores))
+        return [(s, self.a.share(self.a.scores.get(s, 0)), self.b.share(self.b.scores.get(s, 0)))
+                for s in scores]
+
+    def decade_rows(self):
+        ''' [(decade, share of A, share of B)] of birth years, by decade '''
+        decades = {}
+        for cohort, i in ((self.a, 0), (self.b, 1)):
+            for year, n in cohort.birth_years.items():
+                decades.setdefault(year // 10 * 10, [0, 0])[i] += n
+        return [(d, self.a.share(na), self.b.share(nb)) for d, (na, nb) in sorted(decades.items())]
+
+    def as_dict(self):
+        ''' JSON-ready version: both cohorts' series on shared axes '''
+        years = sorted(set(self.a.birth_years) | set(self.b.birth_years))
+        scores = sorted(set(self.a.scores) | set(self.b.scores))
+        return {
+            'totals': [self.a.total, self.b.total],
+            'elections': [label for _, label, _, _ in self.a.turnout],
+            'turnout_rates': [[rate for *_, rate in c.turnout] for c in (self.a, self.b)],
+            'scores': scores,
+            'score_counts': [[c.scores.get(s, 0) for s in scores] for c in (self.a, self.b)],
+            'years': years,
+            'year_counts': [[c.birth_years.get(y, 0) for y in years] for c in (self.a, self.b)],
+        }
+
+
+def comparison_from_cells(cells):
+    ''' fold (birth_year, voter_score, elections mask, n_a, n_b) cells into a CohortComparison '''
+    totals = [0, 0]
+    voted = [{name: 0 for name in ELECTION_FIELDS} for _ in range(2)]
+    scores = [{}, {}]
+    years = [{}, {}]
+    for year, score, mask, *counts in cells:
+        for i, n in enumerate(counts):
+            if not n:
+                continue
+            totals[i] += n
+            scores[i][score] = scores[i].get(score, 0) + n
+            if year is not None:
+                years[i][year] = years[i].get(year, 0) + n
+            for name, bit in ELECTION_BITS.items():
+                if mask & bit:
+                    voted[i][name] += n
+
+    cohorts = []
+    for i in range(2):
+        cohorts.append(CohortStats(
+            total=totals[i],
+            turnout=[(name, label, voted[i][name], voted[i][name] / totals[i] if totals[i] else 0.0)
+                     for name, label in ELECTIONS],
+            scores=scores[i],
+            birth_years=years[i],
+        ))
+    return CohortComparison(*cohorts)
+
+
+def engine_cells(engine, a, b):
+    ''' cells from a VoterEngine: one bincount per cohort over the voters in either '''
+    import numpy as np
+    from .engine import NO_BIRTH_YEAR
+
+    in_a, in_b = engine.mask(a), engine.mask(b)
+    either = in_a | in_b
+    if not either.any():
+        return []
+    years = engine.birth_year[either].astype(np.int64)
+    scores = engine.voter_score[either].astype(np.int64)
+    masks = engine.elections[either].astype(np.int64)
+
+    low = int(years.min())
+    n_scores = int(scores.max()) + 1
+    n_masks = 1 << len(ELECTION_BITS)
+    key = ((years - low) * n_scores + scores) * n_masks + masks
+    counts_a = np.bincount(key, weights=in_a[either], minlength=int(key.max()) + 1)
+    counts_b = np.bincount(key, weights=in_b[either], minlength=int(key.max()) + 1)
+
+    cells = []
+    for cell in np.flatnonzero(counts_a + counts_b):
+        rest, mask = divmod(int(cell), n_masks)
+        year, score = divmod(rest, n_scores)
+        year += low
+        cells.append((None if year == NO_BIRTH_YEAR else year, score, mask,
+                      int(counts_a[cell]), int(counts_b[cell])))
+    return cells
+
+
+def _rollup_q(filters):
+    ''' filters (cube_answerable) as a Q object over VoterRollup cells '''
+    condition = Q()
+    if filters.party:
+        condition &= Q(party=filters.party)
+    if filters.min_dob_year is not None:
+        condition &= Q(birth_year__gte=filters.min_dob_year)
+    if filters.max_dob_year is not None:
+        condition &= Q(birth_year__lte=filters.max_dob_year)
+    if filters.voter_score is not None:
+        condition &= Q(voter_score=filters.voter_score)
+    required = filters.elections_mask
+    if required:
+        # every bitmask with all the required bits set
+        condition &= Q(elections__in=[m for m in range(1 << len(ELECTION_BITS)) if m & required == required])
+    return condition
+
+
+def _either(qa, qb):
+    ''' rows matching qa or qb; Q() | qb would be just qb, so an empty Q (everyone) wins '''
+    return qa | qb if qa and qb else Q()
+
+
+def rollup_cells(a, b):
+    ''' cells from the VoterRollup cube: one GROUP BY with a conditional sum per cohort '''
+    qa, qb = _rollup_q(a), _rollup_q(b)
+    rows = (
+        VoterRollup.objects.filter(_either(qa, qb)).order_by()
+        .values_list('birth_year', 'voter_score', 'elections')
+        .annotate(n_a=Sum('count', filter=qa), n_b=Sum('count', filter=qb))
+    )
+    return [(year, score, mask, n_a or 0, n_b or 0) for year, score, mask, n_a, n_b in rows]
+
+
+def sql_cells(a, b):
+    ''' cells from the Voter table: one GROUP BY with a conditional count per cohort '''
+    qa, qb = a.as_q(), b.as_q()
+    rows = (
+        Voter.objects.filter(_either(qa, qb)).order_by()
+        .values_list('birth_year', 'voter_score', *ELECTION_FIELDS)
+        .annotate(n_a=Count('id', filter=qa), n_b=Count('id', filter=qb))
+    )
+    bits = list(ELECTION_BITS.values())
+    return [(year, score, sum(bit for bit, v in zip(bits, voted) if v), n_a, n_b)
+            for year, score, *voted, n_a, n_b in rows]
+
+
+def compare_cohorts(a, b):
+    """
+    CohortComparison of the voters matching VoterFilters a and b, from
+    the same backend get_voter_stats would use (VOTER_STATS_BACKEND):
+    the snapshot or engine, else the cube when both cohorts are
+    cube_answerable, else the Voter table.
+    """
+    backend = getattr(settings, 'VOTER_STATS_BACKEND', 'auto')
+    if a.cube_answerable and b.cube_answerable:
+        if backend == 'auto':
+            from .snapshot import get_snapshot_engine
+            engine = get_snapshot_engine()
+            if engine is not None:
+                return comparison_from_cells(engine_cells(engine, a, b))
+            return comparison_from_cells(rollup_cells(a, b))
+        if backend == 'engine':
+            from .engine import get_engine
+            return comparison_from_cells(engine_cells(get_engine(), a, b))
+        if backend == 'rollup':
+            return comparison_from_cells(rollup_cells(a, b))
+    return comparison_from_cells(sql_cells(a, b))
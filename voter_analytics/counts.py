@@ -0,0 +1,153 @@
+# File: counts.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Exact, bounded and estimated row counts for filtered voter lists
+"""
+count_voters() answers "how many voters match?" as cheaply as the
+caller's latency budget allows, trying in order:
+
+1. the memory-mapped snapshot, or else the VoterRollup cube (exact,
+   when every filter is a cube dimension)
+2. a count cached for the current data version (exact)
+3. a bounded COUNT that stops at BOUNDED_COUNT_LIMIT matches (exact if
+   fewer match)
+4. the full COUNT(*), if the bounded count suggests it fits the budget
+5. an estimate from counting a few sampled primary key windows, or
+   "10,000+" when no estimate can be made
+
+Exact counts found in steps 3 and 4 are cached, so a filter combination
+is only counted the hard way once per import.
+"""
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from .filters import VoterFilters
+from .models import Voter, VoterImport
+from .snapshot import get_snapshot_engine
+from .stats import rollup_queryset
+
+BOUNDED_COUNT_LIMIT = 10000
+
+# sampled estimates count SAMPLE_WINDOWS primary key ranges holding
+# about SAMPLE_ROWS voters between them
+SAMPLE_ROWS = 20000
+SAMPLE_WINDOWS = 4
+
+EXACT, AT_LEAST, ESTIMATE = 'exact', 'at_least', 'estimate'
+
+
+@dataclass(frozen=True)
+class CountResult:
+    """
+    A row count and how much to trust it:
+    - exact: value is the count
+    - at_least: more than value rows match
+    - estimate: value is a sampled estimate
+    """
+    value: int
+    kind: str = EXACT
+
+    @property
+    def exact(self):
+        return self.kind == EXACT
+
+    def __str__(self):
+        if self.kind == AT_LEAST:
+            return f'{self.value:,}+'
+        if self.kind == ESTIMATE:
+            return f'about {self.value:,}'
+        return f'{self.value:,}'
+
+
+def _cache_key(filters):
+    return f'voter_analytics:count:{VoterImport.current_version()}:{filters.cache_key}'
+
+
+def rollup_count(filters):
+    ''' exact count from the VoterRollup cube (filters must be cube_answerable) '''
+    return rollup_queryset(filters).aggregate(n=Sum('count'))['n'] or 0
+
+
+def bounded_count(qs, limit=BOUNDED_COUNT_LIMIT):
+    ''' count of qs, reading at most limit + 1 rows: a result above limit means "more than limit" '''
+    return qs.order_by().values('pk')[:limit + 1].count()
+
+
+def sampled_estimate(qs, filters, total):
+    """
+    Estimate the size of qs from the share of voters that match in a few
+    primary key windows. The windows are chosen from the filters, so a
+    page reload shows the same estimate. Returns None if nothing was
+    sampled.
+    """
+    # two index lookups; SQLite scans the table for MIN() and MAX() together
+    ids = Voter.objects.values_list('pk', flat=True)
+    low, high = ids.order_by('pk').first(), ids.order_by('-pk').first()
+    if low is None or not total:
+        return None
+    span = high - low + 1
+    width = max(1, span * SAMPLE_ROWS // (total * SAMPLE_WINDOWS))
+
+    seed = int.from_bytes(hashlib.blake2b(filters.cache_key.encode('utf-8'), digest_size=8).digest(), 'little')
+    rng = random.Random(seed)
+    windows = Q()
+    for _ in range(SAMPLE_WINDOWS):
+        start = rng.randrange(low, max(low, high - width) + 1)
+        windows |= Q(pk__gte=start, pk__lt=start + width)
+    sampled = Voter.objects.filter(windows).count()
+    matched = qs.filter(windows).order_by().count()
+    if not sampled:
+        return None
+    return round(total * matched / sampled)
+
+
+def count_voters(filters, qs, budget_ms=None, estimate=True):
+    """
+    CountResult for qs, the Voter queryset filters selects. With no
+    budget_ms the count is always exact; otherwise it stops at a bounded
+    count or a sampled estimate (estimate=False: "10,000+" instead) when
+    the full COUNT(*) does not look like it fits in budget_ms.
+    """
+    if filters.cube_answerable:
+        engine = get_snapshot_engine()
+        if engine is not None:
+            return CountResult(engine.count(filters))
+        return CountResult(rollup_count(filters))
+
+    key = _cache_key(filters)
+    cached = cache.get(key)
+    if cached is not None:
+        return CountResult(cached)
+
+    if budget_ms is None:
+        n = qs.order_by().count()
+        cache.set(key, n, timeout=None)
+        return CountResult(n)
+
+    start = time.perf_counter()
+    n = bounded_count(qs)
+    if n <= BOUNDED_COUNT_LIMIT:
+        cache.set(key, n, timeout=None)
+        return CountResult(n)
+    bounded_ms = (time.perf_counter() - start) * 1000
+
+    guess = None
+    if estimate:
+        guess = sampled_estimate(qs, filters, rollup_count(VoterFilters()))
+
+    # the bounded count found BOUNDED_COUNT_LIMIT matches in bounded_ms;
+    # assume the full count costs the same per match
+    spent_ms = (time.perf_counter() - start) * 1000
+    predicted_ms = bounded_ms * (guess or 0) / BOUNDED_COUNT_LIMIT
+    if guess is not None and spent_ms + predicted_ms <= budget_ms:
+        n = qs.order_by().count()
+        cache.set(key, n, timeout=None)
+        return CountResult(n)
+
+    if guess is not None and guess > BOUNDED_COUNT_LIMIT:
+        return CountResult(guess, ESTIMATE)
+    return CountResult(BOUNDED_COUNT_LIMIT, AT_LEAST)
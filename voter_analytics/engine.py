@@ -0,0 +1,281 @@
+# File: engine.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: In-memory NumPy columnar copy of the Voter table for fast analytics
+"""
+VoterEngine keeps the columns the voter filters and charts need in NumPy
+arrays, evaluates VoterFilters as vectorized boolean masks and computes
+counts and histograms without touching SQL. Requires numpy.
+
+    engine = get_engine()                 # loads / reloads as needed
+    engine.count(filters)
+    engine.stats(filters)                 # -> stats.VoterStats
+
+An engine can be saved as a directory of .npy columns plus a JSON string
+dictionary (save / from_directory); loaded with mmap_mode='r', every
+worker process shares the same page-cache pages (see snapshot.py).
+"""
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .filters import ELECTION_BITS, ELECTIONS
+from .models import AreaRollup, Voter, VoterImport
+from .stats import VoterStats
+
+# birth_year value stored for voters with no date of birth
+NO_BIRTH_YEAR = -1
+
+LOAD_CHUNK_SIZE = 20000
+
+# array attributes saved as <name>.npy, and the JSON dictionary file
+COLUMNS = ['ids', 'birth_year', 'voter_score', 'party', 'elections', 'precinct', 'zipcode']
+DICTIONARY = 'strings.json'
+
+
+class VoterEngine:
+    """
+    Column arrays for every Voter, all in the same (primary key) order:
+    - ids: int64 primary keys
+    - birth_year: int16, NO_BIRTH_YEAR if unknown
+    - voter_score: uint8
+    - party: uint8 code into party_labels (sorted party strings)
+    - elections: uint8 bitmask of elections voted in (filters.ELECTION_BITS)
+    - precinct: uint16 code into precinct_labels (sorted, stripped)
+    - zipcode: int32 residential zipcode
+    """
+
+    def __init__(self, version, ids, birth_year, voter_score, party, party_labels, elections,
+                 precinct, precinct_labels, zipcode):
+        self.version = version
+        self.ids = ids
+        self.birth_year = birth_year
+        self.voter_score = voter_score
+        self.party = party
+        self.party_labels = list(party_labels)
+        self.party_codes = {label: code for code, label in enumerate(self.party_labels)}
+        self.elections = elections
+        self.precinct = precinct
+        self.precinct_labels = list(precinct_labels)
+        self.zipcode = zipcode
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_database(cls, version):
+        ''' read the Voter table once into column arrays '''
+        rows = (
+            Voter.objects.order_by('pk')
+            .values_list('pk', 'birth_year', 'voter_score', 'party', 'precinct_number',
+                         'residential_zipcode', *ELECTION_BITS)
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        ids, years, scores, parties, precincts, zipcodes, masks = [], [], [], [], [], [], []
+        bits = list(ELECTION_BITS.values())
+        for pk, year, score, party, precinct, zipcode, *voted in rows:
+            ids.append(pk)
+            years.append(NO_BIRTH_YEAR if year is None else year)
+            scores.append(score)
+            parties.append(party)
+            precincts.append(str(precinct).strip())
+            zipcodes.append(zipcode)
+            masks.append(sum(bit for bit, v in zip(bits, voted) if v))
+
+        party_labels, party_codes = np.unique(np.array(parties, dtype=object), return_inverse=True)
+        precinct_labels, precinct_codes = np.unique(np.array(precincts, dtype=object), return_inverse=True)
+        return cls(
+            version=version,
+            ids=np.array(ids, dtype=np.int64),
+            birth_year=np.array(years, dtype=np.int16),
+            voter_score=np.array(scores, dtype=np.uint8),
+            party=party_codes.astype(np.uint8),
+            party_labels=[str(p) for p in party_labels],
+            elections=np.array(masks, dtype=np.uint8),
+            precinct=precinct_codes.astype(np.uint16),
+            precinct_labels=[str(p) for p in precinct_labels],
+            zipcode=np.array(zipcodes, dtype=np.int32),
+        )
+
+    def patched(self, version, changes):
+        """
+        A copy for data version version with the rows in changes (an
+        importer.VoterChanges against this engine's version) replaced,
+        taken out or added. The new columns are in memory, not mapped.
+        """
+        rows = list(changes.after())
+        touched = np.array(sorted(changes.pks), dtype=np.int64)
+        pos = np.searchsorted(self.ids, touched)
+        stored = pos < len(self)
+        stored[stored] = self.ids[pos[stored]] == touched[stored]
+        keep = np.ones(len(self), dtype=bool)
+        keep[pos[stored]] = False   # touched rows come back from rows, if they still exist
+
+        party_labels = sorted(set(self.party_labels) | {row['party'] for row in rows})
+        precinct_labels = sorted(set(self.precinct_labels) | {str(row['precinct_number']).strip() for row in rows})
+        party_codes = {label: code for code, label in enumerate(party_labels)}
+        precinct_codes = {label: code for code, label in enumerate(precinct_labels)}
+        # old codes -> codes into the (possibly longer) new label lists
+        party_remap = np.array([party_codes[label] for label in self.party_labels], dtype=np.uint8)
+        precinct_remap = np.array([precinct_codes[label] for label in self.precinct_labels], dtype=np.uint16)
+
+        def column(old, new, dtype):
+            return np.concatenate([np.asarray(old)[keep], np.array(new, dtype=dtype)])
+
+        columns = {
+            'ids': column(self.ids, [row['pk'] for row in rows], np.int64),
+            'birth_year': column(self.birth_year, [NO_BIRTH_YEAR if row['birth_year'] is None else row['birth_year']
+                                                   for row in rows], np.int16),
+            'voter_score': column(self.voter_score, [row['voter_score'] for row in rows], np.uint8),
+            'party': column(party_remap[self.party], [party_codes[row['party']] for row in rows], np.uint8),
+            'elections': column(self.elections, [sum(bit for name, bit in ELECTION_BITS.items() if row[name])
+                                                 for row in rows], np.uint8),
+            'precinct': column(precinct_remap[self.precinct],
+                               [precinct_codes[str(row['precinct_number']).strip()] for row in rows], np.uint16),
+            'zipcode': column(self.zipcode, [row['residential_zipcode'] for row in rows], np.int32),
+        }
+        order = np.argsort(columns['ids'], kind='stable')
+        return VoterEngine(
+            version=version,
+            party_labels=party_labels,
+            precinct_labels=precinct_labels,
+            **{name: values[order] for name, values in columns.items()},
+        )
+
+    def save(self, directory):
+        ''' write every column as <name>.npy and the labels to strings.json in directory '''
+        directory = Path(directory)
+        for name in COLUMNS:
+            np.save(directory / f'{name}.npy', np.ascontiguousarray(getattr(self, name)))
+        strings = {
+            'version': self.version,
+            'rows': len(self),
+            'party_labels': self.party_labels,
+            'precinct_labels': self.precinct_labels,
+        }
+        (directory / DICTIONARY).write_text(json.dumps(strings), encoding='utf-8')
+
+    @classmethod
+    def from_directory(cls, directory, mmap_mode='r'):
+        ''' an engine over the columns save() wrote, memory-mapped read-only by default '''
+        directory = Path(directory)
+        strings = json.loads((directory / DICTIONARY).read_text(encoding='utf-8'))
+        columns = {name: np.load(directory / f'{name}.npy', mmap_mode=mmap_mode) for name in COLUMNS}
+        return cls(
+            version=strings['version'],
+            party_labels=strings['party_labels'],
+            precinct_labels=strings['precinct_labels'],
+            **columns,
+        )
+
+    def mask(self, filters):
+        ''' boolean array selecting the voters that match a VoterFilters '''
+        m = np.ones(len(self), dtype=bool)
+        if filters.party:
+            code = self.party_codes.get(filters.party)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            m &= self.party == code
+
+        # like SQL, voters with no birth year fail any year bound
+        if filters.min_dob_year is not None or filters.max_dob_year is not None:
+            m &= self.birth_year != NO_BIRTH_YEAR
+        if filters.min_dob_year is not None:
+            m &= self.birth_year >= filters.min_dob_year
+        if filters.max_dob_year is not None:
+            m &= self.birth_year <= filters.max_dob_year
+
+        if filters.voter_score is not None:
+            m &= self.voter_score == filters.voter_score
+
+        required = filters.elections_mask
+        if required:
+            m &= (self.elections & required) == required
+        return m
+
+    def count(self, filters):
+        ''' number of voters matching filters '''
+        return int(np.count_nonzero(self.mask(filters)))
+
+    def ids_for(self, filters):
+        ''' primary keys of the voters matching filters '''
+        return self.ids[self.mask(filters)]
+
+    def stats(self, filters):
+        ''' VoterStats for filters, same result as stats.compute_voter_stats '''
+        m = self.mask(filters)
+
+        years = self.birth_year[m]
+        years = years[years != NO_BIRTH_YEAR]
+        birth_years = []
+        if len(years):
+            low = int(years.min())
+            counts = np.bincount(years.astype(np.int64) - low)
+            birth_years = [(low + i, int(n)) for i, n in enumerate(counts) if n]
+
+        party_counts = np.bincount(self.party[m], minlength=len(self.party_labels))
+        parties = [(label, int(n)) for label, n in zip(self.party_labels, party_counts) if n]
+
+        elections = self.elections[m]
+        turnout = [(name, label, int(np.count_nonzero(elections & ELECTION_BITS[name])))
+                   for name, label in ELECTIONS]
+
+        return VoterStats(
+            total=int(np.count_nonzero(m)),
+            birth_years=birth_years,
+            parties=parties,
+            turnout=turnout,
+        )
+
+
+    def area_rows(self, level):
+        """
+        Per (area, party) totals for AreaRollup.PRECINCT or ZIPCODE, as
+        dicts shaped like AreaRollup rows (area, party, voters,
+        score_total and one count per election).
+        """
+        if level == AreaRollup.PRECINCT:
+            codes, labels = self.precinct, self.precinct_labels
+        else:
+            zipcodes, codes = np.unique(self.zipcode, return_inverse=True)
+            labels = [str(z) for z in zipcodes]
+        parties = len(self.party_labels)
+        key = codes.astype(np.int64) * parties + self.party
+        size = len(labels) * parties
+
+        voters = np.bincount(key, minlength=size)
+        scores = np.bincount(key, weights=self.voter_score, minlength=size)
+        voted = {name: np.bincount(key[(self.elections & bit) != 0], minlength=size)
+                 for name, bit in ELECTION_BITS.items()}
+        rows = []
+        for cell in np.flatnonzero(voters):
+            area, party = divmod(int(cell), parties)
+            row = {'area': labels[area], 'party': self.party_labels[party],
+                   'voters': int(voters[cell]), 'score_total': int(scores[cell])}
+            row.update({name: int(counts[cell]) for name, counts in voted.items()})
+            rows.append(row)
+        return rows
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    The process-wide VoterEngine, (re)loaded the first time and whenever
+    the data version (VoterImport.current_version) has moved on since it
+    was loaded: from the current snapshot if there is one (memory-mapped,
+    nearly free), else from the database.
+    """
+    global _engine
+    version = VoterImport.current_version()
+    engine = _engine
+    if engine is not None and engine.version == version:
+        return engine
+    with _engine_lock:
+        if _engine is None or _engine.version != version:
+            from .snapshot import get_snapshot_engine
+            _engine = get_snapshot_engine() or VoterEngine.from_database(version)
+        return _engine
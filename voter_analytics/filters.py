@@ -0,0 +1,139 @@
+# File: filters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: The GET-parameter filters shared by the voter list and graph views
+from dataclasses import dataclass
+from urllib.parse import quote
+
+from django.db.models import Q
+
+from .search import search_q
+
+# election columns in chart order, with their display labels
+ELECTIONS = [
+    ('v20state', '2020 State'),
+    ('v21town', '2021 Town'),
+    ('v21primary', '2021 Primary'),
+    ('v22general', '2022 General'),
+    ('v23town', '2023 Town'),
+]
+ELECTION_FIELDS = [name for name, _ in ELECTIONS]
+
+# bit for each election in VoterRollup.elections
+ELECTION_BITS = {name: 1 << i for i, name in enumerate(ELECTION_FIELDS)}
+
+
+def election_mask(names):
+    ''' bitmask with the bits of the given election fields set '''
+    mask = 0
+    for name in names:
+        mask |= ELECTION_BITS[name]
+    return mask
+
+
+def _parse_int(value):
+    ''' int(value), or None for blank / garbage input '''
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class VoterFilters:
+    """
+    One combination of the voter filter form's inputs:
+    - party (normalized like Voter.party)
+    - min_dob_year / max_dob_year (inclusive birth year range)
+    - voter_score
+    - elections: election fields the voter must have voted in
+    - q: name search (every word starts a first or last name), fuzzy
+      to match misspelled names instead
+    - street: street name search (see search.py)
+    """
+    party: str = ''
+    min_dob_year: int = None
+    max_dob_year: int = None
+    voter_score: int = None
+    elections: tuple = ()
+    q: str = ''
+    street: str = ''
+    fuzzy: bool = False
+
+    # filters the VoterRollup cube has dimensions for; any other filter
+    # added here must be answered from the Voter table itself
+    CUBE_FIELDS = ('party', 'min_dob_year', 'max_dob_year', 'voter_score', 'elections')
+
+    @property
+    def cube_answerable(self):
+        ''' True if every active filter is a VoterRollup dimension '''
+        defaults = VoterFilters()
+        return all(
+            name in self.CUBE_FIELDS or getattr(self, name) == getattr(defaults, name)
+            for name in self.__dataclass_fields__
+        )
+
+    @property
+    def elections_mask(self):
+        ''' the required elections as a VoterRollup.elections bitmask '''
+        return election_mask(self.elections)
+
+    @property
+    def cache_key(self):
+        ''' stable string identifying this filter combination (safe in cache keys) '''
+        return quote('|'.join([
+            self.party,
+            '' if self.min_dob_year is None else str(self.min_dob_year),
+            '' if self.max_dob_year is None else str(self.max_dob_year),
+            '' if self.voter_score is None else str(self.voter_score),
+            ','.join(self.elections),
+            self.q,
+            self.street,
+            'fuzzy' if self.fuzzy else '',
+        ]), safe='|,')
+
+    @classmethod
+    def from_querydict(cls, params, prefix=''):
+        ''' build the filters from request.GET (parameter names prefixed with prefix) '''
+        def get(name):
+            return params.get(prefix + name, '')
+
+        q = ' '.join(get('q').split())
+        return cls(
+            party=get('party').strip().upper(),
+            min_dob_year=_parse_int(get('min_dob_year').strip()),
+            max_dob_year=_parse_int(get('max_dob_year').strip()),
+            voter_score=_parse_int(get('voter_score').strip()),
+            # If a box is checked, the GET param exists. If not checked, it's missing.
+            elections=tuple(name for name in ELECTION_FIELDS if get(name)),
+            q=q,
+            street=' '.join(get('street').split()),
+            # fuzzy only changes how q matches
+            fuzzy=bool(q and get('fuzzy')),
+        )
+
+    def as_q(self):
+        ''' these filters as one Q object over the Voter table '''
+        condition = Q()
+        if self.party:
+            condition &= Q(party=self.party)
+
+        # birth_year is NULL for voters without a date of birth, so any
+        # year bound leaves them out
+        if self.min_dob_year is not None:
+            condition &= Q(birth_year__gte=self.min_dob_year)
+        if self.max_dob_year is not None:
+            condition &= Q(birth_year__lte=self.max_dob_year)
+
+        if self.voter_score is not None:
+            condition &= Q(voter_score=self.voter_score)
+
+        if self.elections:
+            condition &= Q(**{name: True for name in self.elections})
+
+        if self.q or self.street:
+            condition &= search_q(q=self.q, street=self.street, fuzzy=self.fuzzy, within=condition)
+        return condition
+
+    def apply(self, qs):
+        ''' narrow a Voter queryset to the voters matching these filters '''
+        return qs.filter(self.as_q())
@@ -0,0 +1,54 @@
+# File: finders.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Static files finder serving plotly.js from the installed plotly package
+"""
+The graphs page loads plotly.js as a static file, but the bundle is not
+kept in this repository: PlotlyFinder serves the copy that ships inside
+the installed plotly package (plotly/package_data/plotly.min.js), so the
+browser always gets the plotly.js that the Python package was built for.
+Listed in STATICFILES_FINDERS, so runserver and collectstatic see it
+like any other static file.
+"""
+import importlib.util
+import os
+
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.files.storage import FileSystemStorage
+
+# URL path of the bundle, under STATIC_URL
+PLOTLY_JS = 'voter_analytics/plotly.min.js'
+
+
+def plotly_package_data():
+    ''' plotly's package_data directory, or None if plotly is not installed (found without importing it) '''
+    spec = importlib.util.find_spec('plotly')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(spec.submodule_search_locations[0], 'package_data')
+
+
+class PlotlyFinder(BaseFinder):
+    ''' finds PLOTLY_JS, and nothing else, in the installed plotly package '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.location = plotly_package_data()
+        self.prefix, self.name = PLOTLY_JS.rsplit('/', 1)
+
+    def _path(self):
+        if self.location is None:
+            return None
+        path = os.path.join(self.location, self.name)
+        return path if os.path.isfile(path) else None
+
+    def find(self, path, find_all=False, **kwargs):
+        match = self._path() if path == PLOTLY_JS else None
+        if match is None:
+            return []
+        return [match] if find_all else match
+
+    def list(self, ignore_patterns):
+        if self._path() is not None:
+            storage = FileSystemStorage(location=self.location)
+            storage.prefix = self.prefix
+            yield self.name, storage
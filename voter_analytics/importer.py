@@ -0,0 +1,503 @@
+# File: importer.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: CSV import pipeline for the voter analytics application
+import csv
+import hashlib
+import io
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+
+import django
+from django.db import transaction
+from django.utils import timezone
+
+from .bitmaps import rebuild_bitmaps
+from .filters import ELECTION_FIELDS
+from .models import AreaRollup, Voter, VoterImport, VoterRollup, derive_birth_year, derive_party
+from .search import rebuild_search_index
+from .snapshot import write_snapshot
+
+# columns we assume in the CSV (after one header row):
+# 0 voter_id
+# 1 last_name
+# 2 first_name
+# 3 Residential Address - Street Number
+# 4 Residential Address - Street Name
+# 5 Residential Address - Apartment Number
+# 6 Residential Address - Zip Code
+# 7 Date of Birth                 e.g. 1980-01-03
+# 8 Date of Registration          e.g. 2022-11-26
+# 9 Party Affiliation             e.g. "U", "D"
+# 10 Precinct Number              e.g. 1
+# 11 v20state                     e.g. TRUE / FALSE
+# 12 v21town
+# 13 v21primary
+# 14 v22general
+# 15 v23town
+# 16 voter_score
+NUM_COLUMNS = 17
+
+# Voter field names, in the order parse_row() returns them
+VOTER_FIELDS = (
+    'voter_id',
+    'last_name',
+    'first_name',
+    'residential_street_number',
+    'residential_street_name',
+    'residential_apartment_number',
+    'residential_zipcode',
+    'date_of_birth',
+    'date_of_registration',
+    'party_affiliation',
+    'precinct_number',
+    'v20state',
+    'v21town',
+    'v21primary',
+    'v22general',
+    'v23town',
+    'voter_score',
+    'birth_year',
+    'party',
+    'row_hash',
+)
+
+# fields rewritten when an incremental import sees a changed row
+UPDATE_FIELDS = [name for name in VOTER_FIELDS if name != 'voter_id']
+
+DEFAULT_BATCH_SIZE = 2000
+
+# upper bound on the bytes one parse worker handles per task, which keeps
+# the parsed rows waiting for the writer to a few chunks' worth
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+# helpers ---------------------------------
+# same dates datetime.strptime(s, "%Y-%m-%d") accepts, several times faster
+_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+
+def _strip_quotes(s):
+    ''' strip whitespace and one pair of surrounding quotes '''
+    s = (s or "").strip()
+    if len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'")):
+        return s[1:-1].strip()
+    return s
+
+
+def parse_datetime_yyyy_mm_dd(s):
+    """
+    Return timezone-aware datetime if s is a valid 'YYYY-MM-DD'.
+    Return None if s is empty or invalid.
+    """
+    match = _DATE_RE.fullmatch(_strip_quotes(s))
+    if not match:
+        return None
+    try:
+        # make timezone-aware to avoid Django warning
+        return datetime(int(match[1]), int(match[2]), int(match[3]), tzinfo=timezone.get_default_timezone())
+    except ValueError:
+        # bad date -> store NULL rather than a fake date
+        return None
+
+
+def parse_bool(s):
+    ''' "TRUE" (any case) -> True, anything else -> False '''
+    return s.strip().upper() == "TRUE"
+
+
+def parse_int(s):
+    ''' blank -> 0, otherwise int(s); raises ValueError on garbage '''
+    s = s.strip()
+    if s == "":
+        return 0
+    return int(s)
+
+
+def row_digest(fields):
+    ''' stable 32-char hex digest of one raw CSV record '''
+    raw = '\x1f'.join(field.strip() for field in fields[:NUM_COLUMNS])
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def parse_row(fields):
+    """
+    Turn one CSV record (list of strings) into a tuple of Voter field
+    values ordered like VOTER_FIELDS.
+    Raises ValueError if the record is malformed.
+    """
+    if len(fields) < NUM_COLUMNS:
+        raise ValueError(f'expected {NUM_COLUMNS} columns, got {len(fields)}')
+    date_of_birth = parse_datetime_yyyy_mm_dd(fields[7])
+    party_affiliation = fields[9].strip()
+    return (
+        fields[0].strip(),
+        fields[1].strip(),
+        fields[2].strip(),
+        fields[3].strip(),
+        fields[4].strip(),
+        fields[5].strip(),
+        parse_int(fields[6]),
+        date_of_birth,
+        parse_datetime_yyyy_mm_dd(fields[8]),
+        party_affiliation,
+        fields[10].strip(),
+        parse_bool(fields[11]),
+        parse_bool(fields[12]),
+        parse_bool(fields[13]),
+        parse_bool(fields[14]),
+        parse_bool(fields[15]),
+        parse_int(fields[16]),
+        derive_birth_year(date_of_birth),
+        derive_party(party_affiliation),
+        row_digest(fields),
+    )
+
+
+def voter_from_row(row, pk=None):
+    ''' build an (unsaved) Voter from a parse_row() tuple '''
+    return Voter(pk=pk, **dict(zip(VOTER_FIELDS, row)))
+
+
+@dataclass
+class ImportStats:
+    ''' counters reported at the end of an import '''
+    rows: int = 0
+    rejected: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def changed(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+
+# Voter fields the derived tables are computed from: sync_voters keeps
+# their old values for the rows it updates or deletes, so the tables can
+# take away what those rows used to contribute
+CHANGE_FIELDS = ['pk', 'party', 'birth_year', 'voter_score', *ELECTION_FIELDS,
+                 'precinct_number', 'residential_zipcode']
+
+# pks per query when reading touched rows
+CHANGE_BATCH_SIZE = 500
+
+
+@dataclass
+class VoterChanges:
+    ''' the Voter rows an incremental import touched '''
+    pks: set    # inserted, updated and deleted
+    before: list = field(default_factory=list)  # CHANGE_FIELDS dicts of the updated and deleted rows, as they were
+
+    def after(self):
+        ''' CHANGE_FIELDS dicts of the inserted and updated rows, as they are now '''
+        pks = sorted(self.pks)
+        for batch in batched(pks, CHANGE_BATCH_SIZE):
+            yield from Voter.objects.filter(pk__in=batch).values(*CHANGE_FIELDS)
+
+
+def read_changing_rows(pks):
+    ''' CHANGE_FIELDS dicts of the stored rows with the given pks '''
+    rows = []
+    for batch in batched(pks, CHANGE_BATCH_SIZE):
+        rows.extend(Voter.objects.filter(pk__in=batch).values(*CHANGE_FIELDS))
+    return rows
+
+
+# refreshes of the tables derived from Voter, run after every import
+# that changed it (inside the import's transaction); each step gets the
+# import's VoterChanges, or None after a full load (rebuild everything)
+POST_IMPORT_STEPS = [
+    VoterRollup.rebuild,
+    AreaRollup.rebuild,
+    rebuild_search_index,
+]
+
+# index files rebuilt once the import has committed; each step gets the
+# new VoterImport (whose pk is the data version) and the VoterChanges
+# (None after a full load)
+POST_COMMIT_STEPS = [
+    rebuild_bitmaps,
+    write_snapshot,
+]
+
+
+def finish_import(mode, path, stats, changes=None):
+    """
+    Wrap up an import that changed the Voter table: refresh the derived
+    tables (only the rows in changes, a VoterChanges, if given), log a
+    VoterImport and schedule the index files to be rebuilt after commit.
+    Creating the VoterImport row bumps the data version, which invalidates
+    every cache keyed on it (filter options, ...).
+    Must run inside the import's transaction.
+    """
+    if not stats.changed:
+        return None
+    for step in POST_IMPORT_STEPS:
+        step(changes)
+    voter_import = VoterImport.objects.create(
+        mode=mode,
+        path=str(path),
+        rows=stats.rows,
+        inserted=stats.inserted,
+        updated=stats.updated,
+        deleted=stats.deleted,
+        rejected=stats.rejected,
+    )
+    for step in POST_COMMIT_STEPS:
+        transaction.on_commit(lambda step=step: step(voter_import, changes))
+    return voter_import
+
+
+def iter_parsed_rows(reader, stats):
+    ''' yield parsed row tuples from a csv reader, counting rejects in stats '''
+    for fields in reader:
+        if not fields:
+            continue  # blank line
+        try:
+            yield parse_row(fields)
+        except ValueError:
+            stats.rejected += 1
+
+
+def unique_voter_rows(rows, stats):
+    """
+    Drop parsed rows without a voter_id or whose voter_id was already
+    seen, counting them as rejected: the same rule sync_voters applies,
+    so a full load and an incremental sync of one file give one table.
+    """
+    seen = set()
+    for row in rows:
+        voter_id = row[0]
+        if not voter_id or voter_id in seen:
+            stats.rejected += 1
+            continue
+        seen.add(voter_id)
+        yield row
+
+
+def batched(iterable, size):
+    ''' yield lists of at most size items from iterable '''
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def split_byte_ranges(path, chunks):
+    """
+    Split the data part of the CSV at path (everything after the header
+    line) into about chunks (start, end) byte ranges, each beginning and
+    ending on a line boundary.
+
+    This assumes one record per line, which holds for the registry export;
+    a quoted field containing a newline would be cut in two.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()  # header row
+        start = f.tell()
+        step = max(1, (size - start) // max(1, chunks))
+        ranges = []
+        while start < size:
+            f.seek(min(size, start + step))
+            f.readline()  # run on to the end of the current line
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_byte_range(path, start, end):
+    ''' worker task: parse one byte range, returning (row tuples, rejected count) '''
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    stats = ImportStats()
+    rows = list(iter_parsed_rows(csv.reader(io.StringIO(text, newline='')), stats))
+    return rows, stats.rejected
+
+
+def iter_voter_rows(path, stats, workers=1):
+    """
+    Yield parsed row tuples from the CSV at path in file order, counting
+    rejects in stats.
+
+    With workers > 1 the file is cut into line-aligned byte ranges that a
+    process pool parses concurrently; results are consumed in range order
+    so the rows come out exactly as a serial run would produce them.
+    """
+    if workers <= 1:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # throw away header row
+            yield from iter_parsed_rows(reader, stats)
+        return
+
+    chunks = max(workers * 4, os.path.getsize(path) // MAX_CHUNK_BYTES)
+    ranges = split_byte_ranges(path, chunks)
+
+    # workers started with the "spawn" method need their own django.setup()
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(parse_byte_range, path, start, end))
+            # keep only a bounded number of parsed chunks in flight
+            if len(pending) >= workers * 2:
+                rows, rejected = pending.popleft().result()
+                stats.rejected += rejected
+                yield from rows
+        while pending:
+            rows, rejected = pending.popleft().result()
+            stats.rejected += rejected
+            yield from rows
+
+
+def load_voters(path, batch_size=DEFAULT_BATCH_SIZE, progress=None, workers=1):
+    """
+    Replace every Voter with the rows in the CSV file at path.
+
+    The file is streamed through csv.reader (split across workers parse
+    processes when workers > 1) and written by this process with
+    bulk_create in batches of batch_size, all inside one transaction so
+    readers never see a half-loaded table. Like sync_voters, records
+    without a voter_id and repeats of an earlier voter_id are rejected.
+    progress, if given, is called with the running ImportStats after
+    every batch.
+    """
+    stats = ImportStats()
+    start = time.perf_counter()
+
+    with transaction.atomic():
+        deleted, _ = Voter.objects.all().delete()
+
+        rows = unique_voter_rows(iter_voter_rows(path, stats, workers=workers), stats)
+        for batch in batched(rows, batch_size):
+            Voter.objects.bulk_create([voter_from_row(row) for row in batch], batch_size=batch_size)
+            stats.rows += len(batch)
+            stats.inserted += len(batch)
+            if progress:
+                stats.elapsed = time.perf_counter() - start
+                progress(stats)
+
+        stats.deleted = deleted
+        finish_import('full', path, stats)
+
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def sync_voters(path, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Incrementally bring the Voter table in line with the CSV file at path,
+    matching rows on voter_id.
+
+    Each record's raw digest is compared with the stored row_hash, so
+    unchanged rows are never parsed or written. New voters are inserted
+    with bulk_create, changed ones rewritten with bulk_update, and voters
+    missing from the file (or duplicate voter_ids in the table) deleted.
+    Records without a voter_id, malformed records and repeated voter_ids
+    in the file count as rejected.
+    """
+    stats = ImportStats()
+    start = time.perf_counter()
+
+    with open(path, newline='', encoding='utf-8') as f, transaction.atomic():
+        # voter_id -> (pk, row_hash) for everything currently stored
+        existing = {}
+        stale_pks = []
+        for pk, voter_id, digest in Voter.objects.values_list('pk', 'voter_id', 'row_hash').iterator(chunk_size=batch_size):
+            if voter_id in existing:
+                stale_pks.append(pk)
+            else:
+                existing[voter_id] = (pk, digest)
+
+        seen = set()
+        to_create = []
+        to_update = []
+        # pks of every row inserted, updated or deleted, for the derived
+        # tables; None once an insert comes back without its pk (databases
+        # that cannot return them from a bulk insert): rebuild those fully
+        touched = set()
+        before = []
+
+        def flush(final=False):
+            nonlocal touched
+            if to_create and (final or len(to_create) >= batch_size):
+                Voter.objects.bulk_create(to_create, batch_size=batch_size)
+                stats.inserted += len(to_create)
+                if touched is not None:
+                    touched.update(voter.pk for voter in to_create)
+                    if None in touched:
+                        touched = None
+                to_create.clear()
+            if to_update and (final or len(to_update) >= batch_size):
+                if touched is not None:
+                    touched.update(voter.pk for voter in to_update)
+                    before.extend(read_changing_rows([voter.pk for voter in to_update]))
+                Voter.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=batch_size)
+                stats.updated += len(to_update)
+                to_update.clear()
+            if progress:
+                stats.elapsed = time.perf_counter() - start
+                progress(stats)
+
+        reader = csv.reader(f)
+        next(reader, None)  # throw away header row
+
+        for fields in reader:
+            if not fields:
+                continue  # blank line
+            voter_id = fields[0].strip()
+            if not voter_id or voter_id in seen:
+                stats.rejected += 1
+                continue
+
+            current = existing.get(voter_id)
+            if current is not None and current[1] == row_digest(fields):
+                seen.add(voter_id)
+                stats.rows += 1
+                stats.unchanged += 1
+                continue
+
+            try:
+                row = parse_row(fields)
+            except ValueError:
+                stats.rejected += 1
+                continue
+            seen.add(voter_id)
+            stats.rows += 1
+
+            if current is None:
+                to_create.append(voter_from_row(row))
+            else:
+                to_update.append(voter_from_row(row, pk=current[0]))
+            if len(to_create) >= batch_size or len(to_update) >= batch_size:
+                flush()
+
+        flush(final=True)
+
+        stale_pks.extend(pk for voter_id, (pk, _) in existing.items() if voter_id not in seen)
+        if touched is not None:
+            before.extend(read_changing_rows(stale_pks))
+        for batch in batched(stale_pks, batch_size):
+            Voter.objects.filter(pk__in=batch).delete()
+        stats.deleted = len(stale_pks)
+        changes = None if touched is None else VoterChanges(pks=touched | set(stale_pks), before=before)
+        finish_import('incremental', path, stats, changes)
+
+    stats.elapsed = time.perf_counter() - start
+    return stats
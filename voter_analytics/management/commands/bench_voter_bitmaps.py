@@ -0,0 +1,61 @@
+# File: bench_voter_bitmaps.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to compare the election bitmap index with the ORM
+import time
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from voter_analytics.bitmaps import ElectionBitmaps
+from voter_analytics.filters import ELECTION_FIELDS
+from voter_analytics.models import Voter, VoterImport
+
+
+def _best_of(repeat, fn):
+    ''' (fastest wall time in ms, last result) over repeat calls of fn '''
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Time "voted in all of X, Y, ..." and per-election turnout: bitmap index vs ORM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        if not Voter.objects.exists():
+            raise CommandError('no voters loaded; run load_voters first')
+        repeat = options['repeat']
+
+        build_ms, index = _best_of(1, lambda: ElectionBitmaps.build(VoterImport.current_version()))
+        self.stdout.write(f'index build: {build_ms:.0f} ms, {len(index.to_bytes()):,} bytes on disk')
+
+        self.stdout.write(f"{'elections':<48} {'voters':>8} {'orm count':>10} {'bm count':>9} "
+                          f"{'orm ids':>9} {'bm ids':>8}")
+        for size in (1, 2, 3, 5):
+            for names in list(combinations(ELECTION_FIELDS, size))[:2]:
+                qs = Voter.objects.filter(**{name: True for name in names})
+                orm_count_ms, orm_count = _best_of(repeat, qs.count)
+                orm_ids_ms, orm_ids = _best_of(repeat, lambda: sorted(qs.values_list('pk', flat=True)))
+                bm_count_ms, bm_count = _best_of(repeat, lambda: index.count(index.voted_all(names)))
+                bm_ids_ms, bm_ids = _best_of(repeat, lambda: index.ids(index.voted_all(names)))
+                if orm_count != bm_count or orm_ids != bm_ids:
+                    raise CommandError(f'bitmap index disagrees with the ORM for {names}')
+                self.stdout.write(f"{'+'.join(names):<48} {bm_count:>8,} {orm_count_ms:>8.2f}ms "
+                                  f"{bm_count_ms:>7.2f}ms {orm_ids_ms:>7.2f}ms {bm_ids_ms:>6.2f}ms")
+
+        # turnout per election within "voted in 2020 State"
+        within = ['v20state']
+        orm_ms, orm_turnout = _best_of(repeat, lambda: Voter.objects.filter(v20state=True).aggregate(
+            **{name: Count('id', filter=Q(**{name: True})) for name in ELECTION_FIELDS}))
+        bm_ms, bm_turnout = _best_of(repeat, lambda: index.turnout(index.voted_all(within)))
+        if orm_turnout != bm_turnout:
+            raise CommandError('bitmap turnout disagrees with the ORM')
+        self.stdout.write(f'turnout within v20state: orm {orm_ms:.2f} ms, bitmap {bm_ms:.2f} ms')
@@ -0,0 +1,66 @@
+# File: bench_voter_parse.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to benchmark parallel voter CSV parsing
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.importer import ImportStats, iter_voter_rows
+from voter_analytics.synthetic import write_voter_csv
+
+
+class Command(BaseCommand):
+    help = 'Time voter CSV parsing with 1, 2, 4 and 8 worker processes on a synthetic file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='rows in the synthetic file (default 1,000,000)')
+        parser.add_argument('--workers', default='1,2,4,8',
+                            help='comma separated worker counts to try (default 1,2,4,8)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--path', help='use this CSV instead of generating one')
+
+    def handle(self, *args, **options):
+        try:
+            worker_counts = [int(w) for w in options['workers'].split(',')]
+        except ValueError:
+            raise CommandError('--workers must be a comma separated list of integers')
+
+        path = options['path']
+        tmp = None
+        if not path:
+            tmp = tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False)
+            self.stdout.write(f"Writing {options['rows']:,} synthetic rows to {tmp.name} ...")
+            with tmp:
+                write_voter_csv(tmp, options['rows'], seed=options['seed'])
+            path = tmp.name
+
+        try:
+            baseline = None
+            self.stdout.write(f"{'workers':>7}  {'rows':>10}  {'seconds':>8}  {'rows/sec':>10}  {'speedup':>7}")
+            for workers in worker_counts:
+                stats = ImportStats()
+                digest = hashlib.blake2b(digest_size=16)
+                start = time.perf_counter()
+                rows = 0
+                for row in iter_voter_rows(path, stats, workers=workers):
+                    digest.update(repr(row).encode('utf-8'))
+                    rows += 1
+                elapsed = time.perf_counter() - start
+
+                if baseline is None:
+                    baseline = (elapsed, digest.hexdigest())
+                elif digest.hexdigest() != baseline[1]:
+                    raise CommandError(f'{workers} workers produced different rows than {worker_counts[0]}')
+
+                self.stdout.write(
+                    f'{workers:>7}  {rows:>10,}  {elapsed:>8.2f}  '
+                    f'{rows / elapsed:>10,.0f}  {baseline[0] / elapsed:>6.2f}x'
+                )
+            self.stdout.write(self.style.SUCCESS('All worker counts produced identical rows.'))
+        finally:
+            if tmp is not None:
+                os.unlink(tmp.name)
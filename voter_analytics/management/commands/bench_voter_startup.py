@@ -0,0 +1,107 @@
+# File: bench_voter_startup.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to measure worker boot time and memory with and without plotly
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# run in a fresh interpreter: boot Django, load the URLconf (which imports
+# every app's views) and import any extra modules (RENDER: draw one set
+# of charts), then report peak RSS
+CHILD = '''
+import importlib, os, resource, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+for name in sys.argv[1:]:
+    if name == 'RENDER':
+        from voter_analytics.charts import render_graphs
+        from voter_analytics.stats import VoterStats
+        render_graphs(VoterStats(total=1, birth_years=[(1980, 1)], parties=[('D', 1)], turnout=[]))
+    else:
+        importlib.import_module(name)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+# what voter_analytics.views used to import at module load
+EAGER_PLOTLY = ['plotly.graph_objs', 'plotly.offline']
+
+SCENARIOS = [
+    ('lazy (current)', []),
+    ('eager plotly', EAGER_PLOTLY),
+    # what the first graphs request costs a worker, whichever way it booted
+    ('first chart', ['RENDER']),
+]
+
+
+def parse_importtime(stderr):
+    """
+    Sum the self times (microseconds) in python -X importtime output and
+    collect each top-level package's cumulative time.
+    """
+    total = 0
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        if not name.startswith(' ' * 2):   # top level: no nesting indent
+            cumulative[name.strip()] = int(cumulative_us)
+    return total, cumulative
+
+
+class Command(BaseCommand):
+    help = 'Time a cold worker boot (python -X importtime) and its peak RSS, lazy vs eager plotly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='boots per scenario (median is reported)')
+        parser.add_argument('--top', type=int, default=8, help='slowest top-level imports to list')
+
+    def boot(self, modules):
+        ''' (import time in ms, peak RSS in KiB, {package: cumulative us}) for one cold boot '''
+        code = CHILD.format(settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'cs412.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code, *modules],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        total_us, cumulative = parse_importtime(result.stderr)
+        return total_us / 1000, int(result.stdout.split()[-1]), cumulative
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.boot([])   # warm the OS file cache; not measured
+
+        results = {}
+        for label, modules in SCENARIOS:
+            runs = [self.boot(modules) for _ in range(repeat)]
+            results[label] = (
+                statistics.median(ms for ms, _, _ in runs),
+                statistics.median(rss for _, rss, _ in runs),
+                runs[-1][2],
+            )
+
+        self.stdout.write(f"{'scenario':<16} {'import ms':>10} {'peak RSS':>10}")
+        for label, (ms, rss, _) in results.items():
+            self.stdout.write(f'{label:<16} {ms:>10.0f} {rss / 1024:>8.1f}MB')
+
+        lazy_ms, lazy_rss, _ = results['lazy (current)']
+        eager_ms, eager_rss, _ = results['eager plotly']
+        chart_ms, chart_rss, chart_cumulative = results['first chart']
+        self.stdout.write(f'saved per worker at boot: {eager_ms - lazy_ms:.0f} ms, '
+                          f'{(eager_rss - lazy_rss) / 1024:.1f} MB')
+        self.stdout.write(f'deferred to the first graphs request: {chart_ms - lazy_ms:.0f} ms, '
+                          f'{(chart_rss - lazy_rss) / 1024:.1f} MB')
+
+        self.stdout.write('slowest top-level imports (first chart):')
+        slowest = sorted(chart_cumulative.items(), key=lambda item: -item[1])[:options['top']]
+        for name, us in slowest:
+            self.stdout.write(f'  {name:<40} {us / 1000:>8.1f} ms')
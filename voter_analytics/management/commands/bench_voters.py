@@ -0,0 +1,229 @@
+# File: bench_voters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to load-test the voter app and write comparable JSON results
+"""
+Runs every scenario below against a throwaway database filled with
+synthetic voters (or, with --current-db, against the configured one) and
+writes the wall times and SQL query counts to a JSON file:
+
+    manage.py bench_voters --rows 200000 --output before.json
+    ... change something ...
+    manage.py bench_voters --rows 200000 --output after.json --compare before.json
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from voter_analytics import bitmaps, snapshot
+from voter_analytics.charts import chart_cache
+from voter_analytics.importer import load_voters, sync_voters
+from voter_analytics.models import Voter
+from voter_analytics.synthetic import write_voter_csv
+
+# (scenario name, url name, query string)
+SCENARIOS = [
+    ('list: first page', 'voters', ''),
+    ('list: page 50', 'voters', 'page=50'),
+    ('list: last page', 'voters', 'page=last'),
+    ('list: keyset first page + count', 'voters', 'paging=keyset&count=1'),
+    ('list: party', 'voters', 'party=D'),
+    ('list: party + 2 elections, page 10', 'voters', 'party=R&v20state=1&v22general=1&page=10'),
+    ('list: birth years + score', 'voters', 'min_dob_year=1960&max_dob_year=1970&voter_score=5'),
+    ('list: name prefix', 'voters', 'q=SMI'),
+    ('list: fuzzy name', 'voters', 'q=SMYTH&fuzzy=1'),
+    ('list: street', 'voters', 'street=BEACON'),
+    ('graphs: all voters', 'graphs', ''),
+    ('graphs: party + election', 'graphs', 'party=D&v21town=1'),
+    ('graphs: name search', 'graphs', 'q=SMI'),
+    ('api/graphs', 'graphs_api', 'party=D'),
+    ('precinct dashboard', 'precincts', ''),
+    ('compare: two parties', 'compare', 'a_party=D&b_party=R'),
+    ('compare: election vs name search', 'compare', 'a_v22general=1&b_q=SMI'),
+    ('export: csv, one party', 'voter_export', 'party=R'),
+    ('export: ndjson, all voters', 'voter_export', 'format=ndjson'),
+]
+
+
+def reset_caches():
+    ''' forget every cached answer, so a scenario's first run is cold '''
+    cache.clear()
+    chart_cache.clear()
+    bitmaps._bitmaps = bitmaps._bitmaps_missing = None
+    snapshot._snapshot = snapshot._snapshot_missing = None
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def timed(fn):
+    ''' (wall ms, SQL queries, result) for one call of fn '''
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, len(queries), result
+
+
+class Command(BaseCommand):
+    help = 'Time imports, list pages, graphs and exports; write wall times and query counts as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='synthetic voters to import')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--csv', help='import this CSV instead of generating one')
+        parser.add_argument('--repeat', type=int, default=5, help='runs per scenario (after the cold one)')
+        parser.add_argument('--output', '-o', default='voter-bench.json', help='where to write the JSON results')
+        parser.add_argument('--compare', help='earlier JSON results to compare against')
+        parser.add_argument('--current-db', action='store_true',
+                            help='benchmark the configured database as is (no import scenarios)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # keep the index files of the benchmark data away from the real ones
+            with override_settings(VOTER_ANALYTICS_DATA_DIR=tmp):
+                if options['current_db']:
+                    results = self.run_scenarios(options)
+                else:
+                    results = self.run_in_scratch_db(tmp, options)
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'rows': Voter.objects.count() if options['current_db'] else results.pop('rows'),
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'scenarios': results['scenarios'],
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['scenarios'])} scenarios to {options['output']}"))
+
+        if baseline is not None:
+            self.write_comparison(baseline, report)
+
+    def run_in_scratch_db(self, tmp, options):
+        ''' create a test database, import voters into it and run every scenario there '''
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            # a file, not the default in-memory test database: closer to production
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            path = options['csv']
+            if not path:
+                path = os.path.join(tmp, 'voters.csv')
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    write_voter_csv(f, options['rows'], seed=options['seed'])
+
+            scenarios = []
+            for name, load in [('import: full', load_voters), ('import: incremental, no changes', sync_voters)]:
+                ms, queries, stats = timed(lambda: load(path))
+                scenarios.append({
+                    'name': name, 'status': None, 'queries': queries, 'bytes': None,
+                    'cold_ms': round(ms, 2), 'median_ms': round(ms, 2), 'min_ms': round(ms, 2),
+                    'rows_per_sec': round(stats.rows_per_sec),
+                })
+                self.report(scenarios[-1])
+
+            results = self.run_scenarios(options)
+            results['scenarios'] = scenarios + results['scenarios']
+            results['rows'] = Voter.objects.count()
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_scenarios(self, options):
+        ''' every SCENARIOS request: one cold run, then --repeat warm runs '''
+        setup_test_environment()
+        try:
+            client = Client()
+            scenarios = []
+            for name, url_name, query in SCENARIOS:
+                url = reverse(url_name) + (f'?{query}' if query else '')
+                reset_caches()
+                runs = [timed(lambda: self.fetch(client, url))]
+                cold_ms, queries, (status, size) = runs[0]
+                if status != 200:
+                    # e.g. a page number past the end of a small data set:
+                    # an error page's timings would only mislead
+                    scenarios.append({'name': name, 'url': url, 'status': status, 'skipped': True})
+                    self.stdout.write(f"{name:<38} skipped  [HTTP {status}]")
+                    continue
+                runs += [timed(lambda: self.fetch(client, url)) for _ in range(options['repeat'])]
+                warm = [ms for ms, _, _ in runs[1:]] or [cold_ms]
+                scenarios.append({
+                    'name': name, 'url': url, 'status': status, 'queries': queries, 'bytes': size,
+                    'cold_ms': round(cold_ms, 2),
+                    'median_ms': round(statistics.median(warm), 2),
+                    'min_ms': round(min(warm), 2),
+                    'warm_queries': runs[-1][1],
+                })
+                self.report(scenarios[-1])
+            return {'scenarios': scenarios}
+        finally:
+            teardown_test_environment()
+
+    @staticmethod
+    def fetch(client, url):
+        ''' (status, body bytes) for a GET, reading streamed bodies to the end '''
+        response = client.get(url)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def report(self, result):
+        status = '' if result['status'] in (None, 200) else f"  [HTTP {result['status']}]"
+        self.stdout.write(
+            f"{result['name']:<38} cold {result['cold_ms']:>9.1f} ms  median {result['median_ms']:>9.1f} ms  "
+            f"{result['queries']:>5} queries{status}"
+        )
+
+    def write_comparison(self, baseline, report):
+        ''' per-scenario median time and query count, baseline -> now '''
+        before = {s['name']: s for s in baseline['scenarios']}
+        self.stdout.write(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} "
+                          f"({baseline['meta'].get('rows', '?')} rows):")
+        for s in report['scenarios']:
+            old = before.get(s['name'])
+            if s.get('skipped') or (old is not None and old.get('skipped')):
+                self.stdout.write(f"{s['name']:<38} (skipped)")
+                continue
+            if old is None:
+                self.stdout.write(f"{s['name']:<38} (new)")
+                continue
+            ratio = s['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+            self.stdout.write(
+                f"{s['name']:<38} {old['median_ms']:>9.1f} -> {s['median_ms']:>9.1f} ms ({ratio:>5.2f}x)  "
+                f"queries {old['queries']} -> {s['queries']}"
+            )
@@ -0,0 +1,36 @@
+# File: gen_voters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to write a synthetic voter CSV for load_voters
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.synthetic import write_voter_csv
+
+
+class Command(BaseCommand):
+    help = 'Write a synthetic Newton-style voter CSV (the 17-column layout load_voters reads).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='number of voters to generate')
+        parser.add_argument('--seed', type=int, default=0, help='same seed, same file')
+        parser.add_argument('--output', '-o',
+                            help='CSV path (default voters-<rows>-<seed>.csv; "-" for stdout)')
+
+    def handle(self, *args, **options):
+        rows, seed = options['rows'], options['seed']
+        if rows < 0:
+            raise CommandError('--rows must not be negative')
+        path = options['output'] or f'voters-{rows}-{seed}.csv'
+
+        start = time.perf_counter()
+        if path == '-':
+            write_voter_csv(sys.stdout, rows, seed=seed)
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            write_voter_csv(f, rows, seed=seed)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows:,} voters (seed {seed}) to {path} in {elapsed:.1f}s'
+        ))
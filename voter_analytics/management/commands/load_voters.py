@@ -0,0 +1,64 @@
+# File: load_voters.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to bulk load a voter CSV file
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.importer import DEFAULT_BATCH_SIZE, load_voters, sync_voters
+
+
+class Command(BaseCommand):
+    help = 'Load a voter CSV file, replacing all Voter records or (--incremental) syncing them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='path to the voter CSV file')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'rows per bulk_create batch (default {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='parse the file in this many worker processes (default 1, full loads only)',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='only insert, update and delete voters that differ from the file (matched on voter_id)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+        if workers > 1 and options['incremental']:
+            # incremental syncs only parse the rows that changed
+            raise CommandError('--workers cannot be combined with --incremental')
+
+        progress = None
+        if options['verbosity'] >= 2:
+            def progress(stats):
+                self.stdout.write(f'  {stats.rows} rows ({stats.rows_per_sec:,.0f} rows/sec)')
+
+        try:
+            if options['incremental']:
+                stats = sync_voters(options['path'], batch_size=batch_size, progress=progress)
+            else:
+                stats = load_voters(options['path'], batch_size=batch_size, progress=progress, workers=workers)
+        except FileNotFoundError:
+            raise CommandError(f"file not found: {options['path']}")
+
+        if options['incremental']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Synced {stats.rows} voters in {stats.elapsed:.2f}s '
+                f'({stats.rows_per_sec:,.0f} rows/sec): '
+                f'{stats.inserted} inserted, {stats.updated} updated, '
+                f'{stats.deleted} deleted, {stats.unchanged} unchanged, '
+                f'rejected {stats.rejected} rows'
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {stats.rows} voters in {stats.elapsed:.2f}s '
+            f'({stats.rows_per_sec:,.0f} rows/sec), rejected {stats.rejected} rows'
+        ))
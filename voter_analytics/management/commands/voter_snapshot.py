@@ -0,0 +1,27 @@
+# File: voter_snapshot.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: manage.py command to (re)write the memory-mapped snapshot of the Voter table
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.models import VoterImport
+from voter_analytics.snapshot import current_snapshot_dir, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the columnar snapshot for the current data version (imports do this themselves).'
+
+    def handle(self, *args, **options):
+        voter_import = VoterImport.latest()
+        if voter_import is None:
+            raise CommandError('no import recorded yet; run load_voters first')
+        start = time.perf_counter()
+        write_snapshot(voter_import)
+        path = current_snapshot_dir()
+        if path is None:
+            raise CommandError('no snapshot written (is numpy installed?)')
+        size = sum(f.stat().st_size for f in path.iterdir())
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot {path.name}: {size:,} bytes in {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0005_alter_voter_precinct_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:02
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear, Trim, Upper
+
+
+def fill_derived_fields(apps, schema_editor):
+    ''' backfill birth_year and party for voters loaded before this migration '''
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    Voter.objects.update(
+        birth_year=ExtractYear('date_of_birth'),
+        party=Upper(Trim('party_affiliation')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0006_voter_row_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='birth_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='party',
+            field=models.CharField(blank=True, default='', max_length=2),
+        ),
+        migrations.RunPython(fill_derived_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['-voter_score', 'last_name', 'first_name', 'id'], name='voter_score_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['party', '-voter_score', 'last_name', 'first_name', 'id'], name='voter_party_score_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['party', 'birth_year'], name='voter_party_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['birth_year'], name='voter_birth_year_idx'),
+        ),
+    ]
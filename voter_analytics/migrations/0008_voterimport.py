@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0007_voter_birth_year_party'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoterImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(max_length=16)),
+                ('path', models.TextField(blank=True)),
+                ('rows', models.IntegerField(default=0)),
+                ('inserted', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('deleted', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
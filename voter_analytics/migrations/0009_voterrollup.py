@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+ELECTION_FIELDS = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+
+
+def build_rollup(apps, schema_editor):
+    ''' build the cube for voters loaded before this migration (see VoterRollup.rebuild) '''
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    VoterRollup = apps.get_model('voter_analytics', 'VoterRollup')
+    groups = (
+        Voter.objects.order_by()
+        .values('party', 'birth_year', 'voter_score', *ELECTION_FIELDS)
+        .annotate(n=Count('id'))
+    )
+    cells = {}
+    for row in groups:
+        mask = sum(1 << i for i, name in enumerate(ELECTION_FIELDS) if row[name])
+        key = (row['party'], row['birth_year'], row['voter_score'], mask)
+        cells[key] = cells.get(key, 0) + row['n']
+    VoterRollup.objects.bulk_create(
+        [VoterRollup(party=party, birth_year=year, voter_score=score, elections=mask, count=n)
+         for (party, year, score, mask), n in cells.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0008_voterimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoterRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party', models.CharField(blank=True, default='', max_length=2)),
+                ('birth_year', models.IntegerField(blank=True, null=True)),
+                ('voter_score', models.IntegerField()),
+                ('elections', models.SmallIntegerField()),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['party', 'birth_year'], name='rollup_party_year_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:06
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+TABLE = 'voter_analytics_votersearch'
+
+
+def create_search_table(apps, schema_editor):
+    ''' SQLite only: the FTS5 trigram table behind search.py, filled from the Voter table '''
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5(name, street, tokenize='trigram')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5 (or older than 3.34): search falls back to the ORM
+        return
+    schema_editor.execute(
+        f"INSERT INTO {TABLE} (rowid, name, street) "
+        f"SELECT id, '^' || last_name || '$ ^' || first_name || '$', '^' || residential_street_name "
+        f"FROM voter_analytics_voter"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0009_voterrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
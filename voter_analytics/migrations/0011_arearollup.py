@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:22
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+ELECTION_FIELDS = ['v20state', 'v21town', 'v21primary', 'v22general', 'v23town']
+LEVEL_FIELDS = {'precinct': 'precinct_number', 'zipcode': 'residential_zipcode'}
+
+
+def build_area_rollup(apps, schema_editor):
+    ''' fill the table for voters loaded before this migration (see AreaRollup.rebuild) '''
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    AreaRollup = apps.get_model('voter_analytics', 'AreaRollup')
+    rows = []
+    for level, field in LEVEL_FIELDS.items():
+        groups = (
+            Voter.objects.order_by()
+            .values(field, 'party')
+            .annotate(
+                n=Count('id'),
+                score=Sum('voter_score'),
+                **{'n_' + name: Count('id', filter=Q(**{name: True})) for name in ELECTION_FIELDS},
+            )
+        )
+        for row in groups:
+            rows.append(AreaRollup(
+                level=level,
+                area=str(row[field]).strip(),
+                party=row['party'],
+                voters=row['n'],
+                score_total=row['score'] or 0,
+                **{name: row['n_' + name] for name in ELECTION_FIELDS},
+            ))
+    AreaRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0010_votersearch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(max_length=8)),
+                ('area', models.TextField()),
+                ('party', models.CharField(blank=True, default='', max_length=2)),
+                ('voters', models.IntegerField()),
+                ('score_total', models.IntegerField()),
+                ('v20state', models.IntegerField()),
+                ('v21town', models.IntegerField()),
+                ('v21primary', models.IntegerField()),
+                ('v22general', models.IntegerField()),
+                ('v23town', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', 'area'], name='area_rollup_level_idx')],
+            },
+        ),
+        migrations.RunPython(build_area_rollup, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
-from datetime import datetime
+import contextvars
+from contextlib import contextmanager
 
-from django.utils import timezone
+from django.db import models
+from django.db.models import Count, Q, Sum
 # Create your models here.
 class Voter(models.Model):
     ''' data model that represents a registered voter '''
@@ -22,104 +23,314 @@ class Voter(models.Model):
     v21primary = models.BooleanField()
     v22general = models.BooleanField()
     v23town = models.BooleanField()
+    # digest of the raw CSV record, used by incremental imports
+    row_hash = models.CharField(max_length=32, blank=True, default='')
+    # denormalized filter columns, derived from date_of_birth and
+    # party_affiliation (see set_derived_fields) so filters can use indexes
+    birth_year = models.IntegerField(null=True, blank=True)
+    party = models.CharField(max_length=2, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # default list ordering, also the keyset for paging through it
+            models.Index(fields=['-voter_score', 'last_name', 'first_name', 'id'], name='voter_score_name_idx'),
+            # party filter (+ score), in list order
+            models.Index(fields=['party', '-voter_score', 'last_name', 'first_name', 'id'], name='voter_party_score_name_idx'),
+            # birth year ranges, with and without a party filter
+            models.Index(fields=['party', 'birth_year'], name='voter_party_year_idx'),
+            models.Index(fields=['birth_year'], name='voter_birth_year_idx'),
+        ]
+
     def __str__(self):
         ''' Return a string representation of this model instance '''
         return f'{self.first_name} {self.last_name}'
 
+    def set_derived_fields(self):
+        ''' fill in birth_year and party from the raw columns '''
+        self.birth_year = derive_birth_year(self.date_of_birth)
+        self.party = derive_party(self.party_affiliation)
+
+    def save(self, *args, **kwargs):
+        ''' keep the derived filter columns in sync on every save '''
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+
+def derive_birth_year(date_of_birth):
+    ''' birth year stored in Voter.birth_year (None if unknown) '''
+    return date_of_birth.year if date_of_birth else None
+
+
+def derive_party(party_affiliation):
+    ''' normalized party code stored in Voter.party: trimmed, upper-case '''
+    return (party_affiliation or '').strip().upper()
+
+
+class VoterRollup(models.Model):
+    """
+    Pre-aggregated voter counts (a small data cube) keyed by party, birth
+    year, voter score and the bitmask of elections voted in (bits from
+    filters.ELECTION_BITS). Any combination of the graph filters can be
+    answered by summing these rows. Rebuilt by every full load; an
+    incremental sync only adjusts the cells its changed rows move between.
+    """
+    party = models.CharField(max_length=2, blank=True, default='')
+    birth_year = models.IntegerField(null=True, blank=True)
+    voter_score = models.IntegerField()
+    elections = models.SmallIntegerField()
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['party', 'birth_year'], name='rollup_party_year_idx'),
+        ]
 
-def load_data():
-    ''' Function to load data records from csv file into the Django Database '''
-    Voter.objects.all().delete()
-    filename = '/Users/liurun0826/Desktop/newton_voters.csv'
-    f = open(filename, 'r')
-
-    # throw away header row
-    f.readline()
-
-    for line in f:
-
-        # split by comma
-        fields = line.strip().split(',')
-
-        # columns we assume:
-        # 0 voter_id
-        # 1 last_name
-        # 2 first_name
-        # 3 Residential Address - Street Number
-        # 4 Residential Address - Street Name
-        # 5 Residential Address - Apartment Number
-        # 6 Residential Address - Zip Code
-        # 7 Date of Birth                 e.g. 1980-01-03
-        # 8 Date of Registration          e.g. 2022-11-26
-        # 9 Party Affiliation             e.g. "U", "D"
-        # 10 Precinct Number              e.g. 1
-        # 11 v20state                     e.g. TRUE / FALSE
-        # 12 v21town
-        # 13 v21primary
-        # 14 v22general
-        # 15 v23town                      
-        # 16 voter_score
-
-        # helpers ---------------------------------
-        def _strip_quotes(s: str) -> str:
-            s = (s or "").strip()
-            if len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'")):
-                return s[1:-1].strip()
-            return s
-        def parse_datetime_yyyy_mm_dd(s):
-            """
-            Return timezone-aware datetime if s is a valid 'YYYY-MM-DD'.
-            Return None if s is empty or invalid.
-            """
-            s = _strip_quotes(s)
-            if not s:
-                return None
-            try:
-                dt = datetime.strptime(s, "%Y-%m-%d")
-                # make timezone-aware to avoid Django warning
-                return timezone.make_aware(dt)
-            except ValueError:
-                # bad date -> store NULL rather than a fake date
-                return None
-
-        def parse_bool(s):
-            s = s.strip().upper()
-            return s == "TRUE"
-
-        def parse_int(s):
-            s = s.strip()
-            if s == "":
-                return 0
-            return int(s)
-
-        # build and save model instance ------------
-        result = Voter(
-            voter_id = fields[0].strip(),
-
-            last_name = fields[1].strip(),
-            first_name = fields[2].strip(),
-
-            residential_street_number = fields[3].strip(),
-            residential_street_name = fields[4].strip(),
-            residential_apartment_number = fields[5].strip(),
-            residential_zipcode = parse_int(fields[6]),
-
-            date_of_birth = parse_datetime_yyyy_mm_dd(fields[7]),
-            date_of_registration = parse_datetime_yyyy_mm_dd(fields[8]),
-
-            party_affiliation = fields[9].strip(),
-            precinct_number = fields[10].strip(),
-
-            v20state = parse_bool(fields[11]),
-            v21town = parse_bool(fields[12]),
-            v21primary = parse_bool(fields[13]),
-            v22general = parse_bool(fields[14]),
-            v23town = parse_bool(fields[15]),
-
-            voter_score = parse_int(fields[16]),
+    def __str__(self):
+        ''' Return a string representation of this model instance '''
+        return f'{self.party or "(none)"} {self.birth_year} score={self.voter_score} elections={self.elections}: {self.count}'
+
+    @staticmethod
+    def cell(row):
+        ''' (party, birth_year, voter_score, elections mask) for a dict of Voter values '''
+        from .filters import ELECTION_BITS
+
+        mask = sum(bit for name, bit in ELECTION_BITS.items() if row[name])
+        return (row['party'], row['birth_year'], row['voter_score'], mask)
+
+    @classmethod
+    def rebuild(cls, changes=None):
+        """
+        Import step: recompute the whole cube from the Voter table (one
+        GROUP BY), or with changes (importer.VoterChanges) move just the
+        touched rows out of their old cells and into their new ones.
+        """
+        from .filters import ELECTION_BITS
+
+        if changes is not None:
+            return cls.apply_changes(changes)
+        groups = (
+            Voter.objects.order_by()
+            .values('party', 'birth_year', 'voter_score', *ELECTION_BITS)
+            .annotate(n=Count('id'))
         )
+        cells = {}
+        for row in groups:
+            key = cls.cell(row)
+            cells[key] = cells.get(key, 0) + row['n']
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(
+            [cls(party=party, birth_year=year, voter_score=score, elections=mask, count=n)
+             for (party, year, score, mask), n in cells.items()],
+            batch_size=1000,
+        )
+
+    @classmethod
+    def apply_changes(cls, changes):
+        ''' add the count deltas of changes to the cube; cells left empty are deleted '''
+        deltas = {}
+        for row in changes.before:
+            key = cls.cell(row)
+            deltas[key] = deltas.get(key, 0) - 1
+        for row in changes.after():
+            key = cls.cell(row)
+            deltas[key] = deltas.get(key, 0) + 1
+        deltas = {key: n for key, n in deltas.items() if n}
+        if not deltas:
+            return   # only fields the cube does not count were changed
+
+        parties = {party for party, _, _, _ in deltas}
+        existing = {}
+        for rollup in cls.objects.filter(party__in=parties):
+            key = (rollup.party, rollup.birth_year, rollup.voter_score, rollup.elections)
+            if key in deltas:
+                existing[key] = rollup
+        to_create, to_update, to_delete = [], [], []
+        for key, n in deltas.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                party, year, score, mask = key
+                to_create.append(cls(party=party, birth_year=year, voter_score=score, elections=mask, count=n))
+            elif rollup.count + n:
+                rollup.count += n
+                to_update.append(rollup)
+            else:
+                to_delete.append(rollup.pk)
+        cls.objects.bulk_create(to_create, batch_size=1000)
+        cls.objects.bulk_update(to_update, ['count'], batch_size=1000)
+        cls.objects.filter(pk__in=to_delete).delete()
+
+
+class AreaRollup(models.Model):
+    """
+    Voter totals per geographic area (a precinct or a zipcode) and party:
+    registered voters, the sum of their voter scores and how many voted
+    in each election. The precinct dashboard reads every area of a level
+    from this table in one query. Rebuilt by every full load; an
+    incremental sync only adjusts the areas its changed rows belong to.
+    """
+    PRECINCT = 'precinct'
+    ZIPCODE = 'zipcode'
+    # level -> the Voter field it groups by
+    LEVEL_FIELDS = {PRECINCT: 'precinct_number', ZIPCODE: 'residential_zipcode'}
+
+    level = models.CharField(max_length=8)
+    area = models.TextField()
+    party = models.CharField(max_length=2, blank=True, default='')
+    voters = models.IntegerField()
+    score_total = models.IntegerField()
+    v20state = models.IntegerField()
+    v21town = models.IntegerField()
+    v21primary = models.IntegerField()
+    v22general = models.IntegerField()
+    v23town = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['level', 'area'], name='area_rollup_level_idx'),
+        ]
+
+    def __str__(self):
+        ''' Return a string representation of this model instance '''
+        return f'{self.level} {self.area} {self.party or "(none)"}: {self.voters}'
+
+    @classmethod
+    def rebuild(cls, changes=None):
+        """
+        Import step: recompute every area from the Voter table (one GROUP
+        BY per level), or with changes (importer.VoterChanges) take the
+        touched rows out of their old areas and add them to their new ones.
+        """
+        from .filters import ELECTION_FIELDS
+
+        if changes is not None:
+            return cls.apply_changes(changes)
+        rows = []
+        for level, field in cls.LEVEL_FIELDS.items():
+            groups = (
+                Voter.objects.order_by()
+                .values(field, 'party')
+                .annotate(
+                    n=Count('id'),
+                    score=Sum('voter_score'),
+                    **{'n_' + name: Count('id', filter=Q(**{name: True})) for name in ELECTION_FIELDS},
+                )
+            )
+            for row in groups:
+                rows.append(cls(
+                    level=level,
+                    area=str(row[field]).strip(),
+                    party=row['party'],
+                    voters=row['n'],
+                    score_total=row['score'] or 0,
+                    **{name: row['n_' + name] for name in ELECTION_FIELDS},
+                ))
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(rows, batch_size=1000)
+
+    @classmethod
+    def apply_changes(cls, changes):
+        ''' add what the rows in changes now contribute, less what they used to; empty areas are deleted '''
+        from .filters import ELECTION_FIELDS
+
+        counters = ['voters', 'score_total', *ELECTION_FIELDS]
+        deltas = {}
+
+        def add(row, sign):
+            values = [1, row['voter_score'], *(int(row[name]) for name in ELECTION_FIELDS)]
+            for level, field in cls.LEVEL_FIELDS.items():
+                delta = deltas.setdefault((level, str(row[field]).strip(), row['party']), [0] * len(counters))
+                for i, value in enumerate(values):
+                    delta[i] += sign * value
+
+        for row in changes.before:
+            add(row, -1)
+        for row in changes.after():
+            add(row, 1)
+        deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return   # only fields the areas do not count were changed
+
+        existing = {}
+        for level in {level for level, _, _ in deltas}:
+            areas = {area for lv, area, _ in deltas if lv == level}
+            for rollup in cls.objects.filter(level=level, area__in=areas):
+                existing[(rollup.level, rollup.area, rollup.party)] = rollup
+        to_create, to_update, to_delete = [], [], []
+        for key, delta in deltas.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                level, area, party = key
+                to_create.append(cls(level=level, area=area, party=party, **dict(zip(counters, delta))))
+                continue
+            for name, value in zip(counters, delta):
+                setattr(rollup, name, getattr(rollup, name) + value)
+            if rollup.voters:
+                to_update.append(rollup)
+            else:
+                to_delete.append(rollup.pk)
+        cls.objects.bulk_create(to_create, batch_size=1000)
+        cls.objects.bulk_update(to_update, counters, batch_size=1000)
+        cls.objects.filter(pk__in=to_delete).delete()
+
+
+# set by VoterImport.pinned_version(): a dict the data version is memoized in
+_pinned_version = contextvars.ContextVar('voter_analytics_pinned_version', default=None)
+
+
+class VoterImport(models.Model):
+    ''' one import that changed the Voter table; the latest pk is the data version '''
+    mode = models.CharField(max_length=16)   # 'full' or 'incremental'
+    path = models.TextField(blank=True)
+    rows = models.IntegerField(default=0)
+    inserted = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    deleted = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        ''' Return a string representation of this model instance '''
+        return f'{self.mode} import #{self.pk} ({self.rows} rows)'
+
+    @classmethod
+    def current_version(cls):
+        """
+        Data version for cache keys: pk of the latest import (0 if none).
+        Inside pinned_version() it is looked up once and then reused.
+        """
+        pinned = _pinned_version.get()
+        if pinned is not None and 'version' in pinned:
+            return pinned['version']
+        version = cls.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        if pinned is not None:
+            pinned['version'] = version
+        return version
+
+    @classmethod
+    @contextmanager
+    def pinned_version(cls):
+        ''' context in which current_version() runs its query at most once (one request) '''
+        token = _pinned_version.set({})
+        try:
+            yield
+        finally:
+            _pinned_version.reset(token)
+
+    @classmethod
+    def latest(cls):
+        ''' the most recent import, or None if nothing was imported yet '''
+        return cls.objects.order_by('-pk').first()
+
+    def previous_version(self):
+        ''' data version just before this import (0 if it was the first) '''
+        return VoterImport.objects.filter(pk__lt=self.pk).order_by('-pk').values_list('pk', flat=True).first() or 0
+
 
-        result.save()
-    
-    f.close()
+def load_data(filename):
+    ''' Function to load data records from csv file into the Django Database.
+    Kept for shell use; see importer.load_voters / manage.py load_voters. '''
+    from .importer import load_voters
+    load_voters(filename)
     return "done"
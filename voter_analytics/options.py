@@ -0,0 +1,56 @@
+# File: options.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Cached dropdown options for the voter filter forms
+from django.core.cache import cache
+
+from .models import Voter, VoterImport
+
+
+def _compute_filter_options():
+    ''' run the DISTINCT queries behind the party / birth year / score dropdowns '''
+    # Party dropdown options (party is already trimmed and upper-cased)
+    party_options = sorted(
+        Voter.objects
+        .exclude(party='')
+        .values_list('party', flat=True)
+        .distinct()
+    )
+
+    # Birth year dropdown options
+    dob_year_options = sorted(
+        Voter.objects
+        .exclude(birth_year__isnull=True)
+        .values_list('birth_year', flat=True)
+        .distinct()
+    )
+
+    # Voter score options
+    score_options = sorted(
+        Voter.objects
+        .exclude(voter_score__isnull=True)
+        .values_list('voter_score', flat=True)
+        .distinct()
+    )
+
+    return {
+        'party_options': party_options,
+        'dob_year_options': dob_year_options,
+        'score_options': score_options,
+    }
+
+
+def get_filter_options():
+    """
+    Return the filter form's dropdown options as a dict with
+    party_options, dob_year_options and score_options lists.
+
+    The options only change when voters are imported, so they are cached
+    under the current data version (see VoterImport.current_version); a
+    new import moves every process on to a fresh key.
+    """
+    key = f'voter_analytics:filter_options:{VoterImport.current_version()}'
+    options = cache.get(key)
+    if options is None:
+        options = _compute_filter_options()
+        cache.set(key, options, timeout=None)
+    return options
@@ -0,0 +1,190 @@
+# File: pagination.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Keyset (seek) and count-aware offset pagination for the voter list
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.http import Http404
+
+# the voter list's ordering; id makes every key unique.
+# the voter_score_name_idx index covers it.
+KEYSET_ORDERING = ('-voter_score', 'last_name', 'first_name', 'id')
+_KEY_FIELDS = [name.lstrip('-') for name in KEYSET_ORDERING]
+
+
+def encode_cursor(voter):
+    ''' opaque, URL-safe cursor for the position of voter in the list '''
+    key = [getattr(voter, name) for name in _KEY_FIELDS]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    ''' inverse of encode_cursor; raises Http404 on a malformed cursor '''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        score, last_name, first_name, pk = key
+        return int(score), str(last_name), str(first_name), int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise Http404('Invalid page cursor')
+
+
+def _seek(queryset, key, forward, limit):
+    """
+    Up to limit rows strictly after key (forward=True) or strictly before
+    it (forward=False) in KEYSET_ORDERING; backwards rows come out in
+    reverse list order.
+
+    The expanded row-value comparison is split in two index range scans:
+    the rest of key's voter_score bucket (seeking on last_name), then the
+    following buckets (seeking on voter_score). A single OR'd query would
+    make the database scan the index from the start of the bucket.
+    """
+    score, last_name, first_name, pk = key
+    if forward:
+        ordering = KEYSET_ORDERING
+        same_bucket = queryset.filter(voter_score=score, last_name__gte=last_name).filter(
+            Q(last_name__gt=last_name)
+            | Q(last_name=last_name, first_name__gt=first_name)
+            | Q(last_name=last_name, first_name=first_name, id__gt=pk)
+        )
+        # voter_score sorts descending
+        next_buckets = queryset.filter(voter_score__lt=score)
+    else:
+        ordering = _reverse(KEYSET_ORDERING)
+        same_bucket = queryset.filter(voter_score=score, last_name__lte=last_name).filter(
+            Q(last_name__lt=last_name)
+            | Q(last_name=last_name, first_name__lt=first_name)
+            | Q(last_name=last_name, first_name=first_name, id__lt=pk)
+        )
+        next_buckets = queryset.filter(voter_score__gt=score)
+
+    rows = list(same_bucket.order_by(*ordering)[:limit])
+    if len(rows) < limit:
+        rows += list(next_buckets.order_by(*ordering)[:limit - len(rows)])
+    return rows
+
+
+@dataclass
+class KeysetPage:
+    ''' one page of a keyset-paginated voter list '''
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: str = ''
+    previous_cursor: str = ''
+    count: int = None  # total matching rows, only if requested
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+
+
+def keyset_paginate(queryset, per_page, after=None, before=None, with_count=False, last=False):
+    """
+    Return the KeysetPage of queryset (any filtered Voter queryset) that
+    follows the cursor after, or precedes the cursor before; with neither,
+    the first page, or the last one if last. Each page costs one indexed
+    range scan of per_page + 1 rows however deep it is; the total
+    COUNT(*) only runs if with_count.
+    """
+    count = queryset.count() if with_count else None
+
+    if before or last:
+        # walk backwards from the cursor (or the end of the list), then
+        # flip the rows into list order
+        if before:
+            rows = _seek(queryset, decode_cursor(before), False, per_page + 1)
+        else:
+            rows = list(queryset.order_by(*_reverse(KEYSET_ORDERING))[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(before)
+    else:
+        if after:
+            rows = _seek(queryset, decode_cursor(after), True, per_page + 1)
+        else:
+            rows = list(queryset.order_by(*KEYSET_ORDERING)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = bool(after)
+
+    return KeysetPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(rows[-1]) if rows else '',
+        previous_cursor=encode_cursor(rows[0]) if rows else '',
+        count=count,
+    )
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator whose total comes from count_func (returning a
+    counts.CountResult) instead of COUNT(*). With an exact count it
+    behaves like Django's Paginator; with a bounded or estimated one any
+    page number is allowed, and each page reads per_page + 1 rows to
+    know whether there is a next page.
+    """
+
+    def __init__(self, object_list, per_page, count_func, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_func = count_func
+
+    @cached_property
+    def count_result(self):
+        return self.count_func()
+
+    @cached_property
+    def count(self):
+        return self.count_result.value
+
+    def validate_number(self, number):
+        if self.count_result.exact:
+            return super().validate_number(number)
+        # the last page is unknown: only check for a positive integer
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if self.count_result.exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return OpenEndedPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+
+class OpenEndedPage(Page):
+    ''' a CountedPaginator page when the total is not known exactly '''
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
@@ -0,0 +1,64 @@
+# File: plotly_charts.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Default chart backend: server-side Plotly rendering of the voter graphs
+"""
+Imported on first use by charts.render_graphs, never at startup: plotly
+is a large import, and most requests (and every management command)
+never draw a chart.
+"""
+# import plotly library for graphing
+import plotly.graph_objs as go
+from plotly.offline import plot
+
+
+def render_graphs(stats):
+    """
+    Render the graphs page's three charts for a VoterStats; returns a dict
+    of HTML <div> fragments keyed graph_births, graph_party, graph_elections.
+    """
+    graphs = {}
+
+    # ------- Chart 1: Birth year histogram ------
+    # years as strings (categorical axis)
+    years  = [str(year) for year, _ in stats.birth_years]
+    counts = [count for _, count in stats.birth_years]
+
+    fig_births = go.Figure(data=[go.Bar(x=years, y=counts)])
+    fig_births.update_layout(
+        title="Voters Distributed by Birth Year",
+        xaxis_title="Birth Year",
+        yaxis_title="Count",
+        margin=dict(l=30, r=10, t=40, b=30),
+    )
+    # plotly.js itself is a static file loaded once by graphs.html
+    graphs['graph_births'] = plot(fig_births, output_type='div', include_plotlyjs=False)
+
+    # ------- Chart 2: Party distribution (pie) -------
+    party_labels = []
+    party_counts = []
+    for party, count in stats.parties:
+        label = party if party else '(none)'
+        party_labels.append(label)
+        party_counts.append(count)
+
+    fig_party = go.Figure(data=[go.Pie(labels=party_labels, values=party_counts, hole=0)])
+    fig_party.update_layout(
+        title="Voters by Party Affiliation",
+        margin=dict(l=30, r=10, t=40, b=30),
+    )
+    graphs['graph_party'] = plot(fig_party, output_type='div', include_plotlyjs=False)
+
+    # ------- Chart 3: Participation counts (bar) -------
+    labels = [label for _, label, _ in stats.turnout]
+    values = [count for _, _, count in stats.turnout]
+
+    fig_elections = go.Figure(data=[go.Bar(x=labels, y=values)])
+    fig_elections.update_layout(
+        title="Participation by Election",
+        xaxis_title="Election",
+        yaxis_title="Voter Count",
+        margin=dict(l=30, r=10, t=40, b=30),
+    )
+    graphs['graph_elections'] = plot(fig_elections, output_type='div', include_plotlyjs=False)
+
+    return graphs
@@ -0,0 +1,209 @@
+# File: search.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Name and street search for voters, backed by an SQLite FTS5 trigram index
+"""
+On SQLite the voter_analytics_votersearch FTS5 table (tokenize='trigram',
+created by migration 0010) holds one row per voter, rowid = Voter.pk:
+
+    name:   '^LAST$ ^FIRST$'
+    street: '^STREET NAME'
+
+'^' and '$' mark the start and end of each value, so the phrase "^SMI"
+is a prefix match on a name and "LINDEN" a substring match anywhere in a
+street; every lookup is a trigram index probe instead of a scan. Fuzzy
+name search matches any of each word's trigrams (markers included),
+takes the best ranked (bm25) candidates among the voters matching the
+other filters and keeps the names close enough to the query, so
+misspellings such as SMYTH still find SMITH.
+
+The index is rebuilt by every full load and patched, row by row, by
+incremental syncs (importer.POST_IMPORT_STEPS). Other
+databases, or SQLite builds without FTS5, fall back to startswith /
+icontains filters on the Voter table. search_q() returns the whole
+search as a Q object, so VoterFilters can combine it with other filters.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Voter, VoterImport
+
+TABLE = 'voter_analytics_votersearch'
+
+# a fuzzy name search compares the FUZZY_CANDIDATES best ranked index
+# rows with the query and keeps up to FUZZY_LIMIT names at least
+# FUZZY_MIN_SIMILARITY alike (difflib ratio, per word)
+FUZZY_CANDIDATES = 2000
+FUZZY_LIMIT = 500
+FUZZY_MIN_SIMILARITY = 0.75
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9']+")
+
+
+def tokens(text):
+    ''' upper-cased words of a search string '''
+    return [t.upper() for t in _TOKEN_RE.findall(text or '')]
+
+
+def _phrase(text):
+    ''' text as an FTS5 string literal '''
+    return '"' + text.replace('"', '""') + '"'
+
+
+_available = False
+_unavailable_version = None
+
+
+def _table_exists():
+    return connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+
+
+def search_available():
+    """
+    True if the FTS5 search table exists in this database. Once seen it
+    is remembered for good; its absence is remembered until the data
+    version (VoterImport.current_version) moves on.
+    """
+    global _available, _unavailable_version
+    if _available:
+        return True
+    version = VoterImport.current_version()
+    if version != _unavailable_version:
+        _available = _table_exists()
+        _unavailable_version = None if _available else version
+    return _available
+
+
+_INDEX_ROWS = (
+    f"INSERT INTO {TABLE} (rowid, name, street) "
+    f"SELECT id, '^' || last_name || '$ ^' || first_name || '$', '^' || residential_street_name "
+    f"FROM voter_analytics_voter"
+)
+
+# pks per DELETE / INSERT when patching the index (SQLite's default
+# limit on query parameters is 999)
+PATCH_BATCH_SIZE = 500
+
+
+def rebuild_search_index(changes=None):
+    """
+    Import step: refill the FTS5 table from the Voter table (one
+    INSERT ... SELECT), or with changes (importer.VoterChanges) delete
+    and re-add only the index rows of the voters it touched. Does
+    nothing where the table does not exist.
+    """
+    global _available
+    # checked afresh: the table may have been migrated in since the last look
+    _available = _table_exists()
+    if not _available:
+        return
+    with connection.cursor() as cursor:
+        if changes is None:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(_INDEX_ROWS)
+            return
+        pks = sorted(changes.pks)
+        for i in range(0, len(pks), PATCH_BATCH_SIZE):
+            batch = pks[i:i + PATCH_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', batch)
+            # deleted voters are simply not found here
+            cursor.execute(f'{_INDEX_ROWS} WHERE id IN ({placeholders})', batch)
+
+
+def _match(expression):
+    ''' subquery of the voter ids whose index row matches an FTS5 expression '''
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [expression])
+
+
+def _name_prefix(words):
+    ''' every word is the start of the voter's first or last name '''
+    condition = Q()
+    indexed = [w for w in words if len(w) >= 2]   # '^' + 2 chars: a full trigram
+    if indexed and search_available():
+        condition &= Q(pk__in=_match(' AND '.join(f'name : {_phrase("^" + w)}' for w in indexed)))
+        words = [w for w in words if len(w) < 2]
+    for w in words:
+        condition &= Q(last_name__istartswith=w) | Q(first_name__istartswith=w)
+    return condition
+
+
+def _similar(word, names):
+    ''' True if word is close to one of the words in names '''
+    return any(SequenceMatcher(None, word, name).ratio() >= FUZZY_MIN_SIMILARITY for name in names)
+
+
+def fuzzy_name_ids(words, within=None):
+    """
+    Ids of the voters whose first or last names are close to every one
+    of words, best ranked first: candidates share trigrams with each
+    word in the index, then each word is compared with difflib.
+    within: a Q object over the Voter table (the other filters) the
+    candidates must also match, applied before the FUZZY_CANDIDATES cut
+    so it cannot push matching voters out of the result.
+    """
+    # a candidate shares at least one trigram with every word
+    groups = []
+    for w in words:
+        marked = '^' + w + '$'
+        grams = sorted({marked[i:i + 3] for i in range(len(marked) - 2)})
+        groups.append('(' + ' OR '.join(_phrase(g) for g in grams) + ')')
+    expression = 'name : (' + ' AND '.join(groups) + ')'
+    sql = f'SELECT rowid, name FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [expression]
+    if within:
+        voters_sql, voters_params = Voter.objects.filter(within).order_by().values('pk').query.sql_with_params()
+        sql += f' AND rowid IN ({voters_sql})'
+        params += voters_params
+    with connection.cursor() as cursor:
+        cursor.execute(sql + ' ORDER BY rank LIMIT %s', params + [FUZZY_CANDIDATES])
+        rows = cursor.fetchall()
+    ids = []
+    for pk, name in rows:
+        names = name.replace('^', '').replace('$', '').split()
+        if all(_similar(w, names) for w in words):
+            ids.append(pk)
+            if len(ids) == FUZZY_LIMIT:
+                break
+    return ids
+
+
+def _name_fuzzy(words, within=None):
+    ''' voters whose names are close to every one of words (among those matching within) '''
+    if not search_available():
+        return _name_prefix(words)
+    return Q(pk__in=fuzzy_name_ids(words, within))
+
+
+def _street(text):
+    ''' streets containing text (or starting with it, for 1-2 characters) '''
+    text = ' '.join(tokens(text))
+    if len(text) >= 3 and search_available():
+        return Q(pk__in=_match(f'street : {_phrase(text)}'))
+    if len(text) == 2 and search_available():
+        return Q(pk__in=_match(f'street : {_phrase("^" + text)}'))
+    if len(text) < 3:
+        return Q(residential_street_name__istartswith=text)
+    return Q(residential_street_name__icontains=text)
+
+
+def search_q(q='', street='', fuzzy=False, within=None):
+    """
+    Q object for the Voter table matching a name query q (prefix match
+    on every word, or fuzzy) and a street name query. within, a Q object
+    for the rest of the filters, narrows the fuzzy candidates (see
+    fuzzy_name_ids); it is not part of the result.
+    """
+    condition = Q()
+    if street.strip():
+        condition &= _street(street)
+    words = tokens(q)
+    if words:
+        if fuzzy:
+            condition &= _name_fuzzy(words, (within or Q()) & condition)
+        else:
+            condition &= _name_prefix(words)
+    return condition
@@ -0,0 +1,147 @@
+# File: snapshot.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Versioned, memory-mapped columnar snapshots of the Voter table
+"""
+After every import the importer writes the analytics columns (see
+engine.VoterEngine) under storage.data_dir(), read from the Voter table
+after a full load or patched from the previous snapshot with the rows
+an incremental sync touched:
+
+    snapshots/v<version>/ids.npy, party.npy, ..., strings.json
+    snapshots/CURRENT          -> "v<version>"
+
+A snapshot directory is written under a temporary name and renamed into
+place, then CURRENT is replaced atomically, so a reader sees either the
+old snapshot or the new one, never a partial one. Workers open the
+columns with np.load(mmap_mode='r'): nothing is copied into the process,
+and every worker on the machine shares the same page-cache pages.
+
+Needs numpy; without it (or before the first snapshot) the analytics
+paths keep using the rollup tables and the database.
+"""
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .models import VoterImport
+from .storage import MISSING_RETRY_SECONDS, atomic_write_bytes, data_dir
+
+SNAPSHOT_DIR = 'snapshots'
+CURRENT = 'CURRENT'
+# snapshots kept besides the current one, for workers still reading them
+KEEP_PREVIOUS = 1
+
+
+def snapshot_root():
+    root = data_dir() / SNAPSHOT_DIR
+    root.mkdir(exist_ok=True)
+    return root
+
+
+def write_snapshot(voter_import, changes=None):
+    """
+    Post-commit import step: save the Voter table's analytics columns as
+    the snapshot for voter_import's data version and make it current.
+    With changes (an importer.VoterChanges) the previous version's
+    snapshot, if it is the current one, is patched instead of reading
+    the whole table.
+    """
+    global _snapshot_missing
+    try:
+        from .engine import VoterEngine
+    except ImportError:   # numpy not installed
+        return
+    root = snapshot_root()
+    name = f'v{voter_import.pk}'
+    final = root / name
+    if not final.exists():
+        tmp = tempfile.mkdtemp(dir=root, prefix=name + '.', suffix='.tmp')
+        try:
+            Path(tmp).chmod(0o755)   # mkdtemp makes it private to this user
+            engine = None
+            if changes is not None:
+                previous = _read_snapshot()
+                if previous is not None and previous.version == voter_import.previous_version():
+                    engine = previous.patched(voter_import.pk, changes)
+            if engine is None:
+                engine = VoterEngine.from_database(voter_import.pk)
+            engine.save(tmp)
+            Path(tmp).rename(final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    atomic_write_bytes(root / CURRENT, name.encode('ascii'))
+    prune_snapshots(keep=name)
+    _snapshot_missing = None
+
+
+def prune_snapshots(keep):
+    ''' delete old snapshot directories, leaving keep and the KEEP_PREVIOUS newest others '''
+    root = snapshot_root()
+    versions = sorted(
+        (int(path.name[1:]), path) for path in root.iterdir()
+        if path.is_dir() and path.name[1:].isdigit() and path.name != keep
+    )
+    stale = versions[:-KEEP_PREVIOUS] if KEEP_PREVIOUS else versions
+    for _, path in stale:
+        # mapped files stay readable by workers that still have them open
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def current_snapshot_dir():
+    ''' directory of the current snapshot, or None if none was written yet '''
+    root = data_dir() / SNAPSHOT_DIR
+    try:
+        name = (root / CURRENT).read_text(encoding='ascii').strip()
+    except OSError:
+        return None
+    path = root / name
+    return path if path.is_dir() else None
+
+
+def _read_snapshot():
+    ''' a VoterEngine over the current snapshot, whatever its version, or None '''
+    path = current_snapshot_dir()
+    if path is None:
+        return None
+    try:
+        from .engine import VoterEngine
+        return VoterEngine.from_directory(path)
+    except (ImportError, OSError, ValueError, KeyError):
+        return None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+# (data version, time.monotonic()) of the last failed load
+_snapshot_missing = None
+
+
+def get_snapshot_engine():
+    """
+    A VoterEngine over the memory-mapped current snapshot if it was built
+    from the current data version, else None (numpy missing, no snapshot
+    yet, or an import whose snapshot is still being written). Mapped
+    once per process and re-mapped after an import; a missing or stale
+    snapshot is not looked for again for MISSING_RETRY_SECONDS, unless
+    the data version changes.
+    """
+    global _snapshot, _snapshot_missing
+    version = VoterImport.current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    missing = _snapshot_missing
+    if missing is not None and missing[0] == version and time.monotonic() - missing[1] < MISSING_RETRY_SECONDS:
+        return None
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            loaded = _read_snapshot()
+            if loaded is None or loaded.version != version:
+                _snapshot_missing = (version, time.monotonic())
+                return None
+            _snapshot = loaded
+            _snapshot_missing = None
+        return _snapshot
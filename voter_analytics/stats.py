@@ -0,0 +1,160 @@
+# File: stats.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Aggregate chart series (birth years, parties, turnout) for a set of voters
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+
+from .filters import ELECTION_BITS, ELECTIONS
+from .models import Voter, VoterRollup
+
+
+@dataclass
+class VoterStats:
+    """
+    Every chart series for one filtered set of voters:
+    - total: number of voters
+    - birth_years: [(year, count)] by year, voters with no birth year left out
+    - parties: [(party, count)] by party code ('' for no party)
+    - turnout: [(election field, label, count of voters who voted)]
+    """
+    total: int
+    birth_years: list
+    parties: list
+    turnout: list
+
+    def as_series(self):
+        ''' compact parallel arrays for client-side charts (api/graphs) '''
+        return {
+            'total': self.total,
+            'years': [year for year, _ in self.birth_years],
+            'year_counts': [count for _, count in self.birth_years],
+            'party_labels': [party or '(none)' for party, _ in self.parties],
+            'party_counts': [count for _, count in self.parties],
+            'election_labels': [label for _, label, _ in self.turnout],
+            'turnout': [count for _, _, count in self.turnout],
+        }
+
+    def as_dict(self):
+        ''' JSON-ready version of these stats '''
+        return {
+            'total': self.total,
+            'birth_years': [{'year': year, 'count': count} for year, count in self.birth_years],
+            'parties': [{'party': party, 'count': count} for party, count in self.parties],
+            'turnout': [{'election': name, 'label': label, 'count': count}
+                        for name, label, count in self.turnout],
+        }
+
+
+def stats_from_groups(groups):
+    """
+    Fold (birth_year, party) groups into a VoterStats. Each group is a dict
+    with birth_year, party, total and one n_<election> count per election.
+    """
+    total = 0
+    by_year = {}
+    by_party = {}
+    turnout = {name: 0 for name, _ in ELECTIONS}
+    for row in groups:
+        n = row['total']
+        total += n
+        if row['birth_year'] is not None:
+            by_year[row['birth_year']] = by_year.get(row['birth_year'], 0) + n
+        party = row['party'] or ''
+        by_party[party] = by_party.get(party, 0) + n
+        for name in turnout:
+            turnout[name] += row['n_' + name]
+
+    return VoterStats(
+        total=total,
+        birth_years=sorted(by_year.items()),
+        parties=sorted(by_party.items()),
+        turnout=[(name, label, turnout[name]) for name, label in ELECTIONS],
+    )
+
+
+def compute_voter_stats(qs):
+    """
+    Compute every chart series for the Voter queryset qs in one query:
+    a GROUP BY (birth_year, party) with conditional Count(filter=Q(...))
+    aggregates for the elections, folded together in Python. The groups
+    are few (years x parties), so the fold is cheap.
+    """
+    groups = (
+        qs.order_by()
+        .values('birth_year', 'party')
+        .annotate(
+            total=Count('id'),
+            **{'n_' + name: Count('id', filter=Q(**{name: True})) for name, _ in ELECTIONS},
+        )
+    )
+    return stats_from_groups(groups)
+
+
+def rollup_queryset(filters):
+    ''' the VoterRollup cells matching filters (which must be cube_answerable) '''
+    qs = VoterRollup.objects.all()
+    if filters.party:
+        qs = qs.filter(party=filters.party)
+    if filters.min_dob_year is not None:
+        qs = qs.filter(birth_year__gte=filters.min_dob_year)
+    if filters.max_dob_year is not None:
+        qs = qs.filter(birth_year__lte=filters.max_dob_year)
+    if filters.voter_score is not None:
+        qs = qs.filter(voter_score=filters.voter_score)
+    mask = filters.elections_mask
+    if mask:
+        # voted in every required election: all of mask's bits set
+        qs = qs.annotate(required=F('elections').bitand(mask)).filter(required=mask)
+    return qs
+
+
+def rollup_voter_stats(filters):
+    """
+    Answer filters (which must be cube_answerable) from the VoterRollup
+    cube: one GROUP BY over at most a few thousand cube cells, however
+    large the Voter table is.
+    """
+    cells = (
+        rollup_queryset(filters).order_by()
+        .values('birth_year', 'party', 'elections')
+        .annotate(total=Sum('count'))
+    )
+    groups = []
+    for cell in cells:
+        row = {'birth_year': cell['birth_year'], 'party': cell['party'], 'total': cell['total']}
+        for name, bit in ELECTION_BITS.items():
+            row['n_' + name] = cell['total'] if cell['elections'] & bit else 0
+        groups.append(row)
+    return stats_from_groups(groups)
+
+
+def get_voter_stats(filters):
+    """
+    VoterStats for a VoterFilters, from the backend named by the
+    VOTER_STATS_BACKEND setting:
+    - 'auto' (default): the memory-mapped snapshot (see snapshot.py) when
+      it is current, else the VoterRollup cube
+    - 'rollup': the VoterRollup cube
+    - 'engine': the in-memory NumPy engine (see engine.py; needs numpy)
+    - 'sql': always aggregate the Voter table
+    Filters the cube has no dimension for (searches) always aggregate
+    the Voter table. The snapshot, cube and engine all reflect the latest
+    import (edits saved one Voter at a time are not counted until the
+    next one).
+    """
+    backend = getattr(settings, 'VOTER_STATS_BACKEND', 'auto')
+    if filters.cube_answerable:
+        if backend == 'auto':
+            from .snapshot import get_snapshot_engine
+            engine = get_snapshot_engine()
+            if engine is not None:
+                return engine.stats(filters)
+            return rollup_voter_stats(filters)
+        if backend == 'engine':
+            from .engine import get_engine
+            return get_engine().stats(filters)
+        if backend == 'rollup':
+            return rollup_voter_stats(filters)
+    return compute_voter_stats(filters.apply(Voter.objects.all()))
@@ -0,0 +1,54 @@
+# File: storage.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Where the voter importer keeps its on-disk index files
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+# seconds before a file that was missing or stale for the current data
+# version is looked for again (it is written after the import commits,
+# possibly by another process)
+MISSING_RETRY_SECONDS = 30
+
+
+def data_dir():
+    """
+    Directory for files derived from the Voter table (bitmap index,
+    snapshots, ...): the VOTER_ANALYTICS_DATA_DIR setting, by default
+    voter_data/ next to manage.py. Created on first use.
+    """
+    path = Path(getattr(settings, 'VOTER_ANALYTICS_DATA_DIR', settings.BASE_DIR / 'voter_data'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _read_umask():
+    # os.umask can only be read by setting it: done once, at import
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+# mode open() gives a new file; mkstemp's files are 0o600 instead
+FILE_MODE = 0o666 & ~_read_umask()
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write data to path via a temp file + rename, so readers never see a
+    partial file. mkstemp creates the file private to this user; it gets
+    FILE_MODE, the mode open() would have given it, so workers
+    running as another user can read it.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
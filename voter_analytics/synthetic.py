@@ -0,0 +1,102 @@
+# File: synthetic.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Generate fake Newton-style voter CSV files for benchmarks
+import csv
+import random
+from datetime import date, timedelta
+
+HEADER = [
+    'Voter ID Number',
+    'Last Name',
+    'First Name',
+    'Residential Address - Street Number',
+    'Residential Address - Street Name',
+    'Residential Address - Apartment Number',
+    'Residential Address - Zip Code',
+    'Date of Birth',
+    'Date of Registration',
+    'Party Affiliation',
+    'Precinct Number',
+    'v20state',
+    'v21town',
+    'v21primary',
+    'v22general',
+    'v23town',
+    'voter_score',
+]
+
+LAST_NAMES = [
+    'SMITH', 'JOHNSON', 'WILLIAMS', 'BROWN', 'JONES', 'GARCIA', 'MILLER', 'DAVIS',
+    'RODRIGUEZ', 'MARTINEZ', 'HERNANDEZ', 'LOPEZ', 'GONZALEZ', 'WILSON', 'ANDERSON',
+    'THOMAS', 'TAYLOR', 'MOORE', 'JACKSON', 'MARTIN', 'LEE', 'PEREZ', 'THOMPSON',
+    'WHITE', 'HARRIS', 'SANCHEZ', 'CLARK', 'RAMIREZ', 'LEWIS', 'ROBINSON', 'WALKER',
+    'YOUNG', 'ALLEN', 'KING', 'WRIGHT', 'SCOTT', 'TORRES', 'NGUYEN', 'HILL', 'FLORES',
+    'GREEN', 'ADAMS', 'NELSON', 'BAKER', 'HALL', 'RIVERA', 'CAMPBELL', 'MITCHELL',
+    'CARTER', 'ROBERTS', 'CHEN', 'WANG', 'LIU', 'ZHANG', 'COHEN', 'MURPHY', 'SULLIVAN',
+    "O'BRIEN", 'KELLY', 'MCCARTHY', 'FITZGERALD', 'PATEL', 'SHAH', 'KIM', 'PARK',
+]
+
+FIRST_NAMES = [
+    'JAMES', 'MARY', 'ROBERT', 'PATRICIA', 'JOHN', 'JENNIFER', 'MICHAEL', 'LINDA',
+    'DAVID', 'ELIZABETH', 'WILLIAM', 'BARBARA', 'RICHARD', 'SUSAN', 'JOSEPH', 'JESSICA',
+    'THOMAS', 'SARAH', 'CHRISTOPHER', 'KAREN', 'CHARLES', 'LISA', 'DANIEL', 'NANCY',
+    'MATTHEW', 'BETTY', 'ANTHONY', 'MARGARET', 'MARK', 'SANDRA', 'DONALD', 'ASHLEY',
+    'STEVEN', 'EMILY', 'ANDREW', 'DONNA', 'PAUL', 'MICHELLE', 'JOSHUA', 'CAROL',
+    'KEVIN', 'AMANDA', 'BRIAN', 'MELISSA', 'GEORGE', 'DEBORAH', 'WEI', 'YAN', 'PRIYA',
+]
+
+STREETS = [
+    'WALNUT ST', 'COMMONWEALTH AVE', 'BEACON ST', 'WASHINGTON ST', 'CENTRE ST',
+    'HAMMOND POND PKWY', 'LEXINGTON ST', 'AUBURN ST', 'CHESTNUT ST', 'BOYLSTON ST',
+    'HOMER ST', 'LINDEN ST', 'WARD ST', 'CHAPEL ST', 'PARK ST', 'ELM ST', 'OAK AVE',
+    'CRAFTS ST', 'WATERTOWN ST', 'CHERRY ST', 'DUDLEY RD', 'GROVE ST', 'LAKE AVE',
+]
+
+# Newton zip codes, stored without the leading zero like the real export
+ZIPCODES = [2458, 2459, 2460, 2461, 2462, 2464, 2465, 2466, 2467, 2468]
+
+# (party code, weight); codes are padded to two characters like the export
+PARTIES = [('U ', 55), ('D ', 33), ('R ', 8), ('L ', 1), ('J ', 1), ('G ', 1), ('Q ', 1)]
+
+# (column, base turnout probability)
+ELECTIONS = [('v20state', 0.85), ('v21town', 0.30), ('v21primary', 0.20),
+             ('v22general', 0.65), ('v23town', 0.35)]
+
+
+def iter_voter_records(rows, seed=0):
+    ''' yield rows fake voter records (lists of strings, no header) '''
+    rng = random.Random(seed)
+    party_codes = [p for p, _ in PARTIES]
+    party_weights = [w for _, w in PARTIES]
+    epoch = date(1930, 1, 1)
+    dob_span = (date(2005, 12, 31) - epoch).days
+
+    for n in range(rows):
+        dob = epoch + timedelta(days=rng.randrange(dob_span))
+        eligible = date(dob.year + 18, dob.month, 1)
+        registered = eligible + timedelta(days=rng.randrange(max(1, (date(2023, 10, 1) - eligible).days)))
+        # an engaged voter turns out more often in every election
+        engagement = rng.random()
+        votes = [rng.random() < min(1.0, p * (0.4 + engagement * 1.2)) for _, p in ELECTIONS]
+        apartment = str(rng.randrange(1, 40)) if rng.random() < 0.25 else ''
+
+        yield [
+            f'{10 + n % 90:02d}{chr(65 + n % 26)}{chr(65 + n // 26 % 26)}{n:08d}',
+            rng.choice(LAST_NAMES),
+            rng.choice(FIRST_NAMES),
+            str(rng.randrange(1, 400)),
+            rng.choice(STREETS),
+            apartment,
+            str(rng.choice(ZIPCODES)),
+            dob.isoformat(),
+            registered.isoformat(),
+            rng.choices(party_codes, party_weights)[0],
+            str(rng.randrange(1, 9)),
+        ] + ['TRUE' if v else 'FALSE' for v in votes] + [str(sum(votes))]
+
+
+def write_voter_csv(f, rows, seed=0):
+    ''' write a header plus rows fake voter records to the text file f '''
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(HEADER)
+    writer.writerows(iter_voter_records(rows, seed=seed))
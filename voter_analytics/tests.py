@@ -1,3 +1,679 @@
-from django.test import TestCase
+# File: tests.py
+# Author: Run Liu (lr0826@bu.edu), 10/17/2026
+# Description: Tests for the voter_analytics application
+import csv
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.staticfiles import finders
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.db.models import Count, F, Q, Sum
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import bitmaps, cohorts, counts, export, search, snapshot
+from .charts import ChartCache
+from .cohorts import compare_cohorts, comparison_from_cells
+from .counts import AT_LEAST, ESTIMATE, CountResult
+from .engine import VoterEngine
+from .export import EXPORT_FIELDS
+from .filters import ELECTION_FIELDS, VoterFilters
+from .finders import PLOTLY_JS, plotly_package_data
+from .importer import ImportStats, iter_voter_rows, load_voters, sync_voters
+from .models import AreaRollup, Voter, VoterImport, VoterRollup
+from .options import get_filter_options
+from .pagination import KEYSET_ORDERING, CountedPaginator, keyset_paginate
+from .search import fuzzy_name_ids, search_available
+from .stats import compute_voter_stats, rollup_voter_stats
+from .storage import MISSING_RETRY_SECONDS
+from .synthetic import HEADER, iter_voter_records, write_voter_csv
+from .views import VoterListView
+
+
+class VoterCsvTestCase(TestCase):
+    ''' base class: writes voter CSV files into a temporary data directory '''
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmpdir = tmp.name
+        settings = override_settings(VOTER_ANALYTICS_DATA_DIR=self.tmpdir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write_csv(self, records, name='voters.csv'):
+        ''' write HEADER plus records (lists of strings) and return the path '''
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(HEADER)
+            writer.writerows(records)
+        return path
+
+    @staticmethod
+    def table():
+        ''' the Voter table as {voter_id: (last_name, first_name, voter_score)} '''
+        return {voter_id: rest for voter_id, *rest in
+                Voter.objects.values_list('voter_id', 'last_name', 'first_name', 'voter_score')}
+
+
+class ImporterTests(VoterCsvTestCase):
+    ''' full loads and incremental syncs '''
+
+    def test_sync_counts(self):
+        records = list(iter_voter_records(20, seed=1))
+        load_voters(self.write_csv(records))
+        self.assertEqual(Voter.objects.count(), 20)
+
+        changed = records[0][:]
+        changed[1] = 'CHANGED'
+        malformed = records[2][:3]                      # too few columns
+        new = list(iter_voter_records(25, seed=1))[-2:]  # two voters not loaded yet
+        # records[1] is dropped from the file, records[3] repeated
+        sync_file = [changed, malformed] + records[3:] + [records[3]] + new
+        stats = sync_voters(self.write_csv(sync_file, 'sync.csv'))
+
+        self.assertEqual(stats.inserted, 2)
+        self.assertEqual(stats.updated, 1)
+        self.assertEqual(stats.unchanged, 17)
+        self.assertEqual(stats.deleted, 2)   # records[1], and records[2] whose row was malformed
+        self.assertEqual(stats.rejected, 2)  # the malformed row and the repeat
+        self.assertEqual(Voter.objects.count(), 20)
+        self.assertEqual(self.table()[records[0][0]][0], 'CHANGED')
+
+        # nothing to do the second time round
+        again = sync_voters(self.write_csv(sync_file, 'sync.csv'))
+        self.assertFalse(again.changed)
+        self.assertEqual(again.unchanged, 20)
+
+    def test_load_and_sync_reject_the_same_rows(self):
+        records = list(iter_voter_records(10, seed=2))
+        repeat = records[4][:]
+        repeat[1] = 'SECOND'
+        blank = records[5][:]
+        blank[0] = ''
+        path = self.write_csv(records + [repeat, blank])
+
+        loaded = load_voters(path)
+        loaded_table = self.table()
+        Voter.objects.all().delete()
+        synced = sync_voters(path)
+
+        self.assertEqual(loaded.rejected, 2)
+        self.assertEqual(synced.rejected, 2)
+        self.assertEqual(loaded.inserted, synced.inserted)
+        self.assertEqual(self.table(), loaded_table)
+        # the first occurrence wins
+        self.assertEqual(loaded_table[records[4][0]][0], records[4][1])
+
+    def test_parallel_parse_matches_serial(self):
+        path = os.path.join(self.tmpdir, 'voters.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            write_voter_csv(f, 500, seed=3)
+            f.write('short,row\n')
+
+        serial, parallel = ImportStats(), ImportStats()
+        serial_rows = list(iter_voter_rows(path, serial))
+        parallel_rows = list(iter_voter_rows(path, parallel, workers=2))
+        self.assertEqual(len(serial_rows), 500)
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertEqual((serial.rejected, parallel.rejected), (1, 1))
+
+
+class LoadedVotersTestCase(VoterCsvTestCase):
+    ''' base class: loads VOTERS synthetic voters before each test '''
+    VOTERS = 300
+
+    def setUp(self):
+        super().setUp()
+        path = os.path.join(self.tmpdir, 'voters.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            write_voter_csv(f, self.VOTERS, seed=4)
+        load_voters(path)
+
+    def sync_changes(self):
+        ''' sync a file with a few changed, dropped and new voters; returns its records '''
+        records = list(iter_voter_records(self.VOTERS + 1, seed=4))
+        records[0][9] = 'R ' if records[0][9].strip() != 'R' else 'D '   # party
+        records[2][11] = 'FALSE' if records[2][11] == 'TRUE' else 'TRUE'  # v20state
+        records[3][16] = str(int(records[3][16]) % 5 + 1)                 # voter_score
+        records[4][10] = str(int(records[4][10]) % 9 + 1)                 # precinct
+        # records[1] dropped, the last record new
+        records = records[:1] + records[2:]
+        sync_voters(self.write_csv(records, 'sync.csv'))
+        return records
+
+
+class ExportTests(LoadedVotersTestCase):
+    ''' the streamed CSV / NDJSON download '''
+
+    def download(self, **params):
+        response = self.client.get(reverse('voter_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_and_ndjson_match_the_list(self):
+        params = {'party': 'D', 'v20state': 'on'}
+        view = VoterListView()
+        view.request = RequestFactory().get(reverse('voters'), params)
+        expected = list(view.get_queryset().values_list('id', flat=True))
+        self.assertTrue(expected)
+        source = {record[0]: record for record in iter_voter_records(self.VOTERS, seed=4)}
+
+        with mock.patch.object(export, 'BUFFER_SIZE', 256):   # several chunks
+            rows = list(csv.DictReader(self.download(**params).splitlines()))
+            objects = [json.loads(line) for line in self.download(format='ndjson', **params).splitlines()]
+        self.assertEqual(list(rows[0]), EXPORT_FIELDS)
+        self.assertEqual([int(row['id']) for row in rows], expected)
+        self.assertEqual([obj['id'] for obj in objects], expected)
+        for row, obj in zip(rows, objects):
+            record = source[row['voter_id']]
+            self.assertEqual((row['date_of_birth'], row['date_of_registration']), (record[7], record[8]))
+            self.assertEqual({name: '' if value is None else str(value) for name, value in obj.items()}, row)
+
+    def test_unknown_format_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('voter_export'), {'format': 'xml'}).status_code, 404)
+
+
+class FilterOptionsTests(LoadedVotersTestCase):
+    ''' the dropdown options are cached until the next import '''
+
+    def test_options_follow_imports(self):
+        options = get_filter_options()
+        self.assertEqual(options['party_options'], sorted(set(Voter.objects.values_list('party', flat=True))))
+        with self.assertNumQueries(1):   # the data version only
+            self.assertEqual(get_filter_options(), options)
+
+        # a voter saved outside an import is not seen until the next one
+        record = next(iter_voter_records(1, seed=9))
+        record[0] = 'NEW-VOTER'
+        Voter.objects.filter(pk=Voter.objects.first().pk).update(party='X')
+        self.assertNotIn('X', get_filter_options()['party_options'])
+        loaded = list(iter_voter_records(self.VOTERS, seed=4))   # the file setUp loaded
+        sync_voters(self.write_csv(loaded + [record], 'sync.csv'))
+        self.assertIn('X', get_filter_options()['party_options'])
+
+
+class DataVersionTests(LoadedVotersTestCase):
+    ''' a request looks the data version up once '''
+
+    def test_one_version_query_per_request(self):
+        table = VoterImport._meta.db_table
+        for name, params in [('voters', {'street': 'C', 'v20state': '1'}), ('graphs', {'q': 'SMI'}),
+                             ('compare', {}), ('voter_stats_api', {'party': 'D'})]:
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 200)
+            lookups = [q for q in queries if f'FROM "{table}"' in q['sql'] and 'ORDER BY' in q['sql']]
+            self.assertEqual(len(lookups), 1, [q['sql'] for q in lookups])
+
+
+class PaginationTests(LoadedVotersTestCase):
+    ''' keyset pages and count-aware offset pages '''
+
+    def test_keyset_round_trip_matches_offset_order(self):
+        qs = Voter.objects.filter(party='D')
+        expected = list(qs.order_by(*KEYSET_ORDERING).values_list('pk', flat=True))
+
+        pages = [keyset_paginate(qs, 7)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(qs, 7, after=pages[-1].next_cursor))
+        self.assertFalse(pages[0].has_previous)
+        self.assertEqual([v.pk for page in pages for v in page], expected)
+
+        # and back again from the last page
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(keyset_paginate(qs, 7, before=back[-1].previous_cursor))
+        self.assertEqual([[v.pk for v in page] for page in back[::-1]],
+                         [[v.pk for v in page] for page in pages])
+
+    def test_counted_paginator(self):
+        qs = Voter.objects.order_by(*KEYSET_ORDERING)
+        total = qs.count()
+        last = (total + 99) // 100
+
+        exact = CountedPaginator(qs, 100, lambda: CountResult(total))
+        self.assertEqual(exact.num_pages, last)
+        self.assertFalse(exact.page(last).has_next())
+        with self.assertRaises(EmptyPage):
+            exact.page(last + 1)
+
+        for kind in (AT_LEAST, ESTIMATE):
+            # a total that is too low or too high must not change the pages
+            for value in (100, total * 3):
+                paginator = CountedPaginator(qs, 100, lambda: CountResult(value, kind))
+                page = paginator.page(last)
+                self.assertEqual(list(page), list(exact.page(last)))
+                self.assertFalse(page.has_next())
+                self.assertTrue(paginator.page(1).has_next())
+                with self.assertRaises(EmptyPage):
+                    paginator.page(last + 1)
+
+
+class VoterListViewTests(LoadedVotersTestCase):
+    ''' the voter list page '''
+    VOTERS = 600
+
+    def test_last_page_with_an_inexact_count(self):
+        params = {'street': 'C'}   # a search: not answered from the cube
+        qs = VoterFilters(street='C').apply(Voter.objects.all()).order_by(*KEYSET_ORDERING)
+        tail = list(qs)[-100:]
+        self.assertGreater(qs.count(), 100)
+
+        with mock.patch.object(counts, 'BOUNDED_COUNT_LIMIT', 10), \
+                mock.patch.object(VoterListView, 'count_budget_ms', 0):
+            response = self.client.get(reverse('voters'), dict(params, page='last'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].count.exact)
+        self.assertTrue(response.context['keyset_paging'])
+        self.assertEqual(list(response.context['voters']), tail)
+        self.assertFalse(response.context['page_obj'].has_next)
+
+        # an exact count keeps the numbered last page
+        response = self.client.get(reverse('voters'), dict(params, page='last'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].number, (qs.count() + 99) // 100)
+
+
+class AreaDashboardTests(LoadedVotersTestCase):
+    ''' the precinct / zipcode dashboard and its AreaRollup table '''
+
+    def expected(self, level):
+        ''' the dashboard's numbers for a level, aggregated from the Voter table '''
+        field = AreaRollup.LEVEL_FIELDS[level]
+        groups = Voter.objects.values(field).annotate(
+            n=Count('pk'), score=Sum('voter_score'),
+            **{name: Count('pk', filter=Q(**{name: True})) for name in ELECTION_FIELDS})
+        return {str(row[field]): (row['n'], row['score'] / row['n'],
+                                  [row[name] / row['n'] for name in ELECTION_FIELDS]) for row in groups}
+
+    def shown(self, level):
+        response = self.client.get(reverse('precincts'), {'level': level})
+        self.assertEqual(response.status_code, 200)
+        return {a.area: (a.voters, a.avg_score, [share for _, _, share in a.turnout])
+                for a in response.context['areas']}
+
+    def test_dashboard_matches_the_voter_table(self):
+        self.sync_changes()
+        for level in AreaRollup.LEVEL_FIELDS:
+            with self.subTest(level=level):
+                self.assertEqual(self.shown(level), self.expected(level))
+
+        adjusted = set(AreaRollup.objects.values_list(
+            'level', 'area', 'party', 'voters', 'score_total', *ELECTION_FIELDS))
+        AreaRollup.rebuild()
+        self.assertEqual(adjusted, set(AreaRollup.objects.values_list(
+            'level', 'area', 'party', 'voters', 'score_total', *ELECTION_FIELDS)))
+
+
+class CompareTests(LoadedVotersTestCase):
+    ''' the compare page and its JSON API '''
+
+    def test_page_and_api_share_the_defaults(self):
+        expected = compare_cohorts(VoterFilters(party='D'), VoterFilters(party='U')).as_dict()
+        self.assertEqual(self.client.get(reverse('compare_api')).json(), expected)
+        self.assertEqual(self.client.get(reverse('compare')).context['comparison'].as_dict(), expected)
+
+        chosen = self.client.get(reverse('compare_api'), {'a_party': 'R', 'b_v20state': '1'}).json()
+        self.assertEqual(chosen, compare_cohorts(VoterFilters(party='R'), VoterFilters(elections=('v20state',))).as_dict())
+
+    def test_backends_agree(self):
+        engine = VoterEngine.from_database(VoterImport.current_version())
+        pairs = [
+            (VoterFilters(party='D'), VoterFilters(party='U')),
+            (VoterFilters(), VoterFilters(elections=('v21town', 'v23town'))),
+            (VoterFilters(min_dob_year=1950, max_dob_year=1970), VoterFilters(voter_score=2, party='R')),
+        ]
+        for a, b in pairs:
+            with self.subTest(a=a, b=b):
+                expected = comparison_from_cells(cohorts.sql_cells(a, b)).as_dict()
+                self.assertGreater(min(expected['totals']), 0)
+                self.assertEqual(comparison_from_cells(cohorts.rollup_cells(a, b)).as_dict(), expected)
+                self.assertEqual(comparison_from_cells(cohorts.engine_cells(engine, a, b)).as_dict(), expected)
+
+
+class GraphsPageTests(TestCase):
+    ''' the client-rendered graphs page '''
+
+    def test_plotly_is_a_static_file(self):
+        for render in ('client', 'server'):
+            with self.subTest(render=render):
+                response = self.client.get(reverse('graphs'), {'render': render})
+                self.assertContains(response, static(PLOTLY_JS))
+                self.assertNotContains(response, 'cdn.plot.ly')
+        found = finders.find(PLOTLY_JS)
+        self.assertEqual(os.path.dirname(found), plotly_package_data())
+
+
+class GraphsApiTests(LoadedVotersTestCase):
+    ''' conditional requests to api/graphs '''
+
+    def test_unchanged_series_are_not_modified(self):
+        url = reverse('graphs_api')
+        response = self.client.get(url, {'party': 'D'})
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.client.get(url, {'party': 'D'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'party': 'D'}, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        # other filters, or a new import, are a different representation
+        self.assertEqual(self.client.get(url, {'party': 'R'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        VoterImport.objects.create(mode='full', path='x.csv')
+        self.assertEqual(self.client.get(url, {'party': 'D'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ChartCacheTests(SimpleTestCase):
+    ''' the in-process LRU of rendered chart fragments '''
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ChartCache(max_entries=2, max_bytes=100)
+        for key in 'abc':
+            cache.get_or_render(key, lambda: {'graph': 'x' * 10})
+            cache.get_or_render('a', lambda: self.fail('a was evicted'))
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['evictions'], 1)   # b, the least recently used
+        cache.get_or_render('c', lambda: self.fail('c was evicted'))
+
+        # the byte cap evicts too, and a value over it is not kept at all
+        cache.get_or_render('d', lambda: {'graph': 'x' * 95})
+        self.assertEqual(cache.stats()['bytes'], 95)   # a and c both had to go
+        self.assertEqual(cache.get_or_render('e', lambda: {'graph': 'x' * 101}), {'graph': 'x' * 101})
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_concurrent_misses_render_once(self):
+        cache = ChartCache()
+        release = threading.Event()
+        calls = []
+
+        def render():
+            calls.append(1)
+            release.wait(5)
+            return {'graph': 'rendered'}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_render('k', render)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while cache.stats()['waits'] < len(threads) - 1:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'graph': 'rendered'}] * len(threads))
+
+
+class StatsTests(LoadedVotersTestCase):
+    ''' every stats backend agrees with aggregating the Voter table '''
+
+    FILTERS = [
+        VoterFilters(),
+        VoterFilters(party='D'),
+        VoterFilters(min_dob_year=1960, max_dob_year=1980, voter_score=3),
+        VoterFilters(party='U', elections=('v20state', 'v22general')),
+    ]
+
+    def expected(self, filters):
+        stats = compute_voter_stats(filters.apply(Voter.objects.all())).as_dict()
+        self.assertGreater(stats['total'], 0)
+        return stats
+
+    def test_rollup_matches_sql(self):
+        for filters in self.FILTERS:
+            with self.subTest(filters=filters):
+                self.assertEqual(rollup_voter_stats(filters).as_dict(), self.expected(filters))
+
+    def test_sync_adjusts_the_rollup(self):
+        records = self.sync_changes()
+        for filters in self.FILTERS:
+            with self.subTest(filters=filters):
+                self.assertEqual(rollup_voter_stats(filters).as_dict(), self.expected(filters))
+        adjusted = set(VoterRollup.objects.values_list('party', 'birth_year', 'voter_score', 'elections', 'count'))
+        VoterRollup.rebuild()
+        self.assertEqual(adjusted, set(VoterRollup.objects.values_list(
+            'party', 'birth_year', 'voter_score', 'elections', 'count')))
+
+        # a change the cube does not count leaves it alone
+        records[0][2] = 'RENAMED'
+        with CaptureQueriesContext(connection) as queries:
+            sync_voters(self.write_csv(records, 'rename.csv'))
+        self.assertFalse([q for q in queries if 'voterrollup' in q['sql']])
+
+    def test_engine_matches_sql(self):
+        engine = VoterEngine.from_database(VoterImport.current_version())
+        for filters in self.FILTERS:
+            with self.subTest(filters=filters):
+                expected = self.expected(filters)
+                self.assertEqual(engine.stats(filters).as_dict(), expected)
+                self.assertEqual(engine.count(filters), expected['total'])
+
+
+class BitmapTests(LoadedVotersTestCase):
+    ''' the election bitmap index '''
+
+    def setUp(self):
+        super().setUp()
+        for name in ('_bitmaps', '_bitmaps_missing'):
+            patcher = mock.patch.object(bitmaps, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_bits_follow_rows_not_pks(self):
+        path = os.path.join(self.tmpdir, 'voters.csv')
+        for _ in range(3):
+            load_voters(path)   # every full load moves the pks on by VOTERS
+        index = bitmaps.ElectionBitmaps.build(VoterImport.current_version())
+        self.assertEqual(index.voters.bit_length(), self.VOTERS)
+        self.assertEqual(index.ids(index.voters), sorted(Voter.objects.values_list('pk', flat=True)))
+
+        loaded = bitmaps.ElectionBitmaps.from_bytes(index.to_bytes())
+        self.assertEqual(list(loaded.pks), list(index.pks))
+        both = ['v20state', 'v22general']
+        self.assertEqual(loaded.ids(loaded.voted_all(both)), index.ids(index.voted_all(both)))
+
+    def test_sync_patches_the_index(self):
+        bitmaps.rebuild_bitmaps(VoterImport.latest())
+        with mock.patch.object(bitmaps.ElectionBitmaps, 'build', wraps=bitmaps.ElectionBitmaps.build) as build, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.sync_changes()
+        self.assertEqual(build.call_count, 0)
+        index = bitmaps.get_bitmaps()
+        expected = bitmaps.ElectionBitmaps.build(VoterImport.current_version())
+        self.assertEqual(index.to_bytes(), expected.to_bytes())
+
+    def test_prefilter_matches_the_orm(self):
+        self.assertIsNone(bitmaps.election_prefilter(VoterFilters(elections=('v20state',))))  # no index yet
+        bitmaps.rebuild_bitmaps(VoterImport.latest())
+
+        self.assertIsNone(bitmaps.election_prefilter(VoterFilters()))
+        for elections in [('v20state',), ('v21town', 'v23town'), tuple(bitmaps.ELECTION_FIELDS)]:
+            with self.subTest(elections=elections):
+                expected = sorted(Voter.objects.filter(**{name: True for name in elections})
+                                  .values_list('pk', flat=True))
+                self.assertTrue(expected)
+                self.assertEqual(bitmaps.election_prefilter(VoterFilters(elections=elections)), expected)
+                with mock.patch.object(bitmaps, 'MAX_PREFILTER_IDS', len(expected) - 1):
+                    self.assertIsNone(bitmaps.election_prefilter(VoterFilters(elections=elections)))
+
+
+class SnapshotTests(LoadedVotersTestCase):
+    ''' the memory-mapped snapshot answers like the database '''
+
+    def setUp(self):
+        super().setUp()
+        for name in ('_snapshot', '_snapshot_missing'):
+            patcher = mock.patch.object(snapshot, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assertMatchesDatabase(self, engine):
+        self.assertEqual(engine.version, VoterImport.current_version())
+        for filters in StatsTests.FILTERS:
+            with self.subTest(filters=filters):
+                qs = filters.apply(Voter.objects.all())
+                self.assertEqual(engine.stats(filters).as_dict(), compute_voter_stats(qs).as_dict())
+                self.assertEqual(list(engine.ids_for(filters)), list(qs.order_by('pk').values_list('pk', flat=True)))
+        for level in AreaRollup.LEVEL_FIELDS:
+            with self.subTest(level=level):
+                fields = ['area', 'party', 'voters', 'score_total', *ELECTION_FIELDS]
+                self.assertEqual(sorted(tuple(row[name] for name in fields) for row in engine.area_rows(level)),
+                                 sorted(AreaRollup.objects.filter(level=level).values_list(*fields)))
+
+    def test_snapshot_matches_the_database(self):
+        snapshot.write_snapshot(VoterImport.latest())
+        self.assertMatchesDatabase(snapshot.get_snapshot_engine())
+
+        # an incremental sync patches the snapshot instead of reading the table
+        with mock.patch.object(VoterEngine, 'from_database', wraps=VoterEngine.from_database) as from_database, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.sync_changes()
+        self.assertEqual(from_database.call_count, 0)
+        self.assertMatchesDatabase(snapshot.get_snapshot_engine())
+
+
+class SearchTests(LoadedVotersTestCase):
+    ''' fuzzy name search through the FTS5 index '''
+
+    def setUp(self):
+        super().setUp()
+        if not search_available():
+            self.skipTest('no FTS5 search table in this database')
+
+    def test_fuzzy_finds_misspelled_names(self):
+        smiths = set(Voter.objects.filter(last_name='SMITH').values_list('pk', flat=True))
+        self.assertTrue(smiths)
+        found = set(fuzzy_name_ids(['SMYTH']))
+        self.assertLessEqual(smiths, found)
+        self.assertFalse(Voter.objects.filter(pk__in=found, last_name='GARCIA').exists())
+
+    def test_fuzzy_needs_every_word(self):
+        voter = Voter.objects.filter(last_name='JOHNSON').first()
+        found = fuzzy_name_ids(['JONSON', voter.first_name])
+        self.assertIn(voter.pk, found)
+        self.assertEqual(
+            set(found),
+            set(Voter.objects.filter(last_name='JOHNSON', first_name=voter.first_name).values_list('pk', flat=True)),
+        )
+
+    @staticmethod
+    def index_rows():
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, name, street FROM {search.TABLE} ORDER BY rowid')
+            return cursor.fetchall()
+
+    def test_sync_patches_only_the_touched_rows(self):
+        records = list(iter_voter_records(self.VOTERS + 1, seed=4))
+        renamed = records[0][:]
+        renamed[1] = 'ZZYZX'
+        # records[1] dropped, the last record new
+        path = self.write_csv([renamed] + records[2:], 'sync.csv')
+        with CaptureQueriesContext(connection) as queries:
+            sync_voters(path)
+        self.assertFalse([q for q in queries if q['sql'] == f'DELETE FROM {search.TABLE}'])
+
+        patched = self.index_rows()
+        search.rebuild_search_index()
+        self.assertEqual(patched, self.index_rows())
+        self.assertEqual(list(VoterFilters(q='ZZYZX').apply(Voter.objects.all()).values_list('voter_id', flat=True)),
+                         [records[0][0]])
+
+    def test_fuzzy_candidates_are_filtered_first(self):
+        # with room for only a handful of candidates, the party filter
+        # must be applied before the cut, not after it
+        names = (Voter.objects.values('last_name')
+                 .annotate(d=Count('pk', filter=Q(party='D')), n=Count('pk'))
+                 .filter(d__gt=0, n__gt=F('d')).order_by('-d'))
+        name = names[0]['last_name']
+        expected = set(Voter.objects.filter(last_name=name, party='D').values_list('pk', flat=True))
+        filters = VoterFilters(q=name, fuzzy=True, party='D')
+        with mock.patch.object(search, 'FUZZY_CANDIDATES', len(expected)):
+            self.assertEqual(set(fuzzy_name_ids([name], within=Q(party='D'))), expected)
+            self.assertEqual(set(filters.apply(Voter.objects.all()).values_list('pk', flat=True)), expected)
+
+
+class SearchAvailableTests(TestCase):
+    ''' search_available() remembers both answers '''
+
+    def test_missing_table_is_remembered_per_version(self):
+        with mock.patch.object(search, '_available', False), \
+                mock.patch.object(search, '_unavailable_version', None), \
+                mock.patch.object(search, '_table_exists', return_value=False) as exists:
+            self.assertFalse(search_available())
+            self.assertFalse(search_available())
+            self.assertEqual(exists.call_count, 1)
+            VoterImport.objects.create(mode='full', path='x.csv')
+            self.assertFalse(search_available())
+            self.assertEqual(exists.call_count, 2)
+
+
+class DerivedFileTests(LoadedVotersTestCase):
+    ''' derived index files are not looked for on every request while missing '''
+
+    def setUp(self):
+        super().setUp()
+        for module, name in [(bitmaps, '_bitmaps'), (bitmaps, '_bitmaps_missing'),
+                             (snapshot, '_snapshot'), (snapshot, '_snapshot_missing')]:
+            patcher = mock.patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_missing_bitmaps_are_remembered(self):
+        with mock.patch.object(bitmaps, 'data_dir', wraps=bitmaps.data_dir) as looked:
+            self.assertIsNone(bitmaps.get_bitmaps())
+            self.assertIsNone(bitmaps.get_bitmaps())
+            self.assertEqual(looked.call_count, 1)
+
+            # written by this process: found straight away
+            bitmaps.rebuild_bitmaps(VoterImport.latest())
+            index = bitmaps.get_bitmaps()
+            self.assertEqual(index.count(index.voters), self.VOTERS)
+
+            # a new import whose file is not written yet
+            VoterImport.objects.create(mode='full', path='x.csv')
+            looked.reset_mock()
+            self.assertIsNone(bitmaps.get_bitmaps())
+            self.assertIsNone(bitmaps.get_bitmaps())
+            self.assertEqual(looked.call_count, 1)
+
+            # until another process may have written it
+            later = time.monotonic() + MISSING_RETRY_SECONDS + 1
+            with mock.patch('time.monotonic', return_value=later):
+                self.assertIsNone(bitmaps.get_bitmaps())
+            self.assertEqual(looked.call_count, 2)
+
+    def test_missing_snapshot_is_remembered(self):
+        with mock.patch.object(snapshot, 'current_snapshot_dir', wraps=snapshot.current_snapshot_dir) as looked:
+            self.assertIsNone(snapshot.get_snapshot_engine())
+            self.assertIsNone(snapshot.get_snapshot_engine())
+            self.assertEqual(looked.call_count, 1)
+
+            snapshot.write_snapshot(VoterImport.latest())
+            engine = snapshot.get_snapshot_engine()
+            self.assertEqual(engine.count(VoterFilters()), self.VOTERS)
+
+            VoterImport.objects.create(mode='full', path='x.csv')
+            looked.reset_mock()
+            self.assertIsNone(snapshot.get_snapshot_engine())
+            self.assertIsNone(snapshot.get_snapshot_engine())
+            self.assertEqual(looked.call_count, 1)
+
+    def test_written_files_are_readable_by_other_users(self):
+        plain = os.path.join(self.tmpdir, 'plain')
+        open(plain, 'wb').close()
+        mode = stat.S_IMODE(os.stat(plain).st_mode)
+
+        snapshot.write_snapshot(VoterImport.latest())
+        bitmaps.rebuild_bitmaps(VoterImport.latest())
+        for path in (os.path.join(self.tmpdir, snapshot.SNAPSHOT_DIR, snapshot.CURRENT),
+                     os.path.join(self.tmpdir, bitmaps.FILENAME)):
+            with self.subTest(path):
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), mode)
@@ -5,7 +5,20 @@ urlpatterns = [
     # list page (home page of the app)
     path('', views.VoterListView.as_view(), name='voters'),
 
+    # the whole filtered list as CSV / NDJSON (?format=)
+    path('export', views.VoterExportView.as_view(), name='voter_export'),
+
     # detail page for one voter
     path('voter/<int:pk>/', views.VoterDetailView.as_view(), name='voter'),
     path('graphs', views.GraphListView.as_view(), name='graphs'),
+    # turnout by precinct / zipcode
+    path('precincts', views.AreaDashboardView.as_view(), name='precincts'),
+    # two filter sets side by side
+    path('compare', views.CohortCompareView.as_view(), name='compare'),
+    # JSON chart series for the same filters as the graphs page
+    path('api/stats', views.voter_stats_api, name='voter_stats_api'),
+    path('api/compare', views.compare_api, name='compare_api'),
+    path('api/chart_cache', views.chart_cache_stats_api, name='chart_cache_stats_api'),
+    # compact series for client-rendered graphs (graphs?render=client)
+    path('api/graphs', views.graphs_api, name='graphs_api'),
 ]
@@ -8,20 +8,89 @@ from django.db.models.query import QuerySet
 from django.shortcuts import render
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from .models import *
-from django.db.models.functions import ExtractYear, Trim
-from django.db.models.functions import TruncYear
-from django.db.models import Count
-# import plotly library for graphing
-import plotly
-import plotly.graph_objs as go
-from plotly.offline import plot
-
-
+from .filters import ELECTIONS, VoterFilters
+from .areas import area_summaries
+from .cohorts import PREFIXES, cohorts_from_querydict, compare_cohorts
+from .options import get_filter_options
+from .pagination import CountedPaginator, keyset_paginate
+from .counts import count_voters
+from .stats import get_voter_stats
+from .bitmaps import election_prefilter
+from .charts import chart_cache, render_graphs
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FIELDS, EXPORT_FORMATS
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.utils.decorators import method_decorator
+import functools
+import hashlib
+
+
+def one_data_version(view):
+    ''' run view with VoterImport.current_version() looked up at most once '''
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with VoterImport.pinned_version():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+@method_decorator(one_data_version, name='dispatch')
 class VoterListView(ListView):
     model = Voter
     template_name = 'voter_analytics/voter_list.html'
     context_object_name = 'voters'
     paginate_by = 100  # requirement: show 100 at a time
+    paginator_class = CountedPaginator
+    # time the page total may take before it is shown as "10,000+" or an
+    # estimate (None: always count exactly); see counts.count_voters
+    count_budget_ms = 50
+    # ?paging=keyset switches to cursor (seek) pagination, which stays
+    # fast on deep pages; ?count=1 adds the total in that mode
+    # ?page=last with a bounded or estimated total is answered with a
+    # keyset page seeking back from the end of the list (set by paginate_queryset)
+    last_page_by_keyset = False
+
+    def is_keyset_mode(self):
+        ''' True if this request pages with after/before cursors '''
+        params = self.request.GET
+        return (self.last_page_by_keyset or params.get('paging') == 'keyset'
+                or 'after' in params or 'before' in params)
+
+    def count_voters(self, queryset):
+        ''' the page total for queryset, within count_budget_ms '''
+        return count_voters(self.filters, queryset, budget_ms=self.count_budget_ms)
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        ''' offset paging with the total from count_voters instead of COUNT(*) '''
+        return self.paginator_class(
+            queryset, per_page, lambda: self.count_voters(queryset),
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page, **kwargs,
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        ''' use keyset pagination when asked, else ListView's offset paging '''
+        params = self.request.GET
+        total = None
+        if params.get('page') == 'last' and not self.is_keyset_mode():
+            # an inexact total does not say which page number is the last
+            # one: seek back from the end of the list instead
+            total = self.count_voters(queryset)
+            self.last_page_by_keyset = not total.exact
+        if not self.is_keyset_mode():
+            return super().paginate_queryset(queryset, page_size)
+        page = keyset_paginate(
+            queryset, page_size,
+            after=params.get('after'),
+            before=params.get('before'),
+            last=self.last_page_by_keyset,
+        )
+        if total is None and params.get('count'):
+            total = self.count_voters(queryset)
+        page.count = total
+        return (None, page, page.object_list, page.has_next or page.has_previous)
+
     def get_queryset(self):
         """
         Build a queryset of Voter objects, optionally filtered by:
@@ -30,99 +99,34 @@ class VoterListView(ListView):
         - max_dob_year
         - voter_score
         - voted in specific elections
+        (see VoterFilters; every filter uses an indexed column)
         """
-        qs = Voter.objects.all()
-
-        # pull filter inputs from GET params
-        party = self.request.GET.get('party', '').strip()
-        min_dob_year = self.request.GET.get('min_dob_year', '').strip()
-        max_dob_year = self.request.GET.get('max_dob_year', '').strip()
-        voter_score = self.request.GET.get('voter_score', '').strip()
-
-        # checkboxes for past elections
-        voted_v20state = self.request.GET.get('v20state', '')
-        voted_v21town = self.request.GET.get('v21town', '')
-        voted_v21primary = self.request.GET.get('v21primary', '')
-        voted_v22general = self.request.GET.get('v22general', '')
-        voted_v23town = self.request.GET.get('v23town', '')
-
-        
-        if party != '':
-            qs = qs.filter(party_affiliation__iexact=party)
-
-        # date_of_birth is a DateTimeField.
-        # We only care about YEAR filtering. We interpret:
-        #  - min_dob_year = born >= Jan 1 of that year
-        #  - max_dob_year = born <= Dec 31 of that year
-        #
-        # super important: rows where date_of_birth is NULL shouldn't kill the filter logic.
-        if min_dob_year != '':
-            # born on or after Jan 1 <year> 00:00
-            qs = qs.filter(date_of_birth__year__gte=int(min_dob_year))
-
-        if max_dob_year != '':
-            # born on or before Dec 31 <year> 23:59, so just <= that year
-            qs = qs.filter(date_of_birth__year__lte=int(max_dob_year))
-
-        # voter score
-        if voter_score != '':
-            qs = qs.filter(voter_score=int(voter_score))
-
-        # elections checkboxes
-        # If a box is checked, the GET param exists. If not checked, it's missing.
-        if voted_v20state:
-            qs = qs.filter(v20state=True)
-        if voted_v21town:
-            qs = qs.filter(v21town=True)
-        if voted_v21primary:
-            qs = qs.filter(v21primary=True)
-        if voted_v22general:
-            qs = qs.filter(v22general=True)
-        if voted_v23town:
-            qs = qs.filter(v23town=True)
-
-        # default sort (optional): maybe show most reliable (high score) first
-        qs = qs.order_by('-voter_score', 'last_name', 'first_name')
+        filters = self.filters = VoterFilters.from_querydict(self.request.GET)
+        qs = filters.apply(Voter.objects.all())
+
+        # selective election combinations: narrow to the matching ids
+        # from the bitmap index first
+        ids = election_prefilter(filters)
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+
+        # default sort: show most reliable (high score) first; matches
+        # the voter_score_name_idx index
+        qs = qs.order_by('-voter_score', 'last_name', 'first_name', 'id')
 
         return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
-        # Party dropdown options
-        party_values = (
-            Voter.objects
-            .exclude(party_affiliation__isnull=True)
-            .exclude(party_affiliation__exact='')
-            .values_list('party_affiliation', flat=True)
-            .distinct()
-        )
-        normalized_party_values = sorted({p.strip() for p in party_values})
-
-        # Birth year dropdown options
-        # Step 1: get distinct datetimes truncated to year from date_of_birth
-        dob_year_datetimes = (
-            Voter.objects
-            .exclude(date_of_birth__isnull=True)
-            .datetimes('date_of_birth', 'year')  # returns datetimes like 1947-01-01 00:00, 1995-01-01 00:00, ...
-        )
-        # Step 2: pull just the .year from those datetimes
-        dob_year_options = sorted({dt.year for dt in dob_year_datetimes})
-
-        # Voter score options
-        score_values = (
-            Voter.objects
-            .exclude(voter_score__isnull=True)
-            .values_list('voter_score', flat=True)
-            .distinct()
-        )
-        score_options = sorted(score_values)
-
         request = self.request
         ctx['filter_party'] = request.GET.get('party', '').strip()
         ctx['filter_min_dob_year'] = request.GET.get('min_dob_year', '').strip()
         ctx['filter_max_dob_year'] = request.GET.get('max_dob_year', '').strip()
         ctx['filter_voter_score'] = request.GET.get('voter_score', '').strip()
+        ctx['filter_q'] = request.GET.get('q', '').strip()
+        ctx['filter_street'] = request.GET.get('street', '').strip()
+        ctx['filter_fuzzy'] = 'checked' if request.GET.get('fuzzy', '') else ''
 
         ctx['filter_v20state'] = 'checked' if request.GET.get('v20state', '') else ''
         ctx['filter_v21town'] = 'checked' if request.GET.get('v21town', '') else ''
@@ -130,29 +134,49 @@ class VoterListView(ListView):
         ctx['filter_v22general'] = 'checked' if request.GET.get('v22general', '') else ''
         ctx['filter_v23town'] = 'checked' if request.GET.get('v23town', '') else ''
 
-        ctx['party_options'] = normalized_party_values
-        ctx['dob_year_options'] = dob_year_options
-        ctx['score_options'] = score_options
-        # -------- build querystring WITHOUT page=
+        # Party / birth year / voter score dropdown options
+        ctx.update(get_filter_options())
+        # -------- build querystring WITHOUT page= (or keyset cursors)
         # so pagination links don't duplicate ?page
         params = request.GET.copy()
-        if 'page' in params:
-            del params['page']
-        # urlencode() makes "party=D&min_dob_year=1970&..."
-        ctx['querystring_without_page'] = params.urlencode()
-        params = request.GET.copy()
-        if 'page' in params:
-            del params['page']
+        for key in ('page', 'after', 'before'):
+            if key in params:
+                del params[key]
+        if self.is_keyset_mode():
+            params['paging'] = 'keyset'
         # urlencode() makes "party=D&min_dob_year=1970&..."
         ctx['querystring_without_page'] = params.urlencode()
+        ctx['keyset_paging'] = self.is_keyset_mode()
         return ctx
 
 
+class VoterExportView(VoterListView):
+    """
+    The whole filtered voter list (same filters and order as the list
+    page) as a download: ?format=csv (default) or ?format=ndjson.
+    Rows are streamed from a chunked database iterator, so memory stays
+    flat however many voters match and bytes go out as soon as the first
+    chunk arrives.
+    """
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            raise Http404(f'unknown export format {fmt!r}')
+        encode, content_type, extension = EXPORT_FORMATS[fmt]
+
+        rows = self.get_queryset().values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(encode(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="voters.{extension}"'
+        return response
+
+
 class VoterDetailView(DetailView):
     ''' detail view page for one specific voter '''
     model = Voter
     template_name = 'voter_analytics/voter_detail.html'
     context_object_name = 'voter'
+@method_decorator(one_data_version, name='dispatch')
 class GraphListView(ListView):
     model = Voter
     template_name = 'voter_analytics/graphs.html'
@@ -160,70 +184,16 @@ class GraphListView(ListView):
     paginate_by = None #no pagination needed
     ''' List View to display multiple graphs for a set of voters '''
     def get_queryset(self):
-        ''' filtering out the query set, similar to task 2 '''
-        qs = Voter.objects.all()
-
-        rq = self.request
-        party = rq.GET.get('party', '').strip()
-        min_dob_year = rq.GET.get('min_dob_year', '').strip()
-        max_dob_year = rq.GET.get('max_dob_year', '').strip()
-        voter_score = rq.GET.get('voter_score', '').strip()
-
-        if party != '':
-            qs = qs.filter(party_affiliation__iexact=party)
-
-        if min_dob_year != '':
-            qs = qs.filter(date_of_birth__year__gte=int(min_dob_year))
-        if max_dob_year != '':
-            qs = qs.filter(date_of_birth__year__lte=int(max_dob_year))
-
-        if voter_score != '':
-            qs = qs.filter(voter_score=int(voter_score))
-
-        if rq.GET.get('v20state', ''):
-            qs = qs.filter(v20state=True)
-        if rq.GET.get('v21town', ''):
-            qs = qs.filter(v21town=True)
-        if rq.GET.get('v21primary', ''):
-            qs = qs.filter(v21primary=True)
-        if rq.GET.get('v22general', ''):
-            qs = qs.filter(v22general=True)
-        if rq.GET.get('v23town', ''):
-            qs = qs.filter(v23town=True)
-
+        ''' filtering out the query set, same filters as the voter list '''
         # no particular ordering needed for graphs
-        return qs
+        return VoterFilters.from_querydict(self.request.GET).apply(Voter.objects.all())
+
     def get_context_data(self, **kwargs):
         ''' override the get_context_data method to create the graphs using plotly '''
         ctx = super().get_context_data(**kwargs)
-        qs = ctx['voters']  # filtered queryset from get_queryset()
-
-        
-        party_values = (
-            Voter.objects
-            .exclude(party_affiliation__isnull=True)
-            .exclude(party_affiliation__exact='')
-            .values_list('party_affiliation', flat=True)
-            .distinct()
-        )
-        ctx['party_options'] = sorted({p.strip() for p in party_values})
-
-        dob_year_datetimes = (
-            Voter.objects
-            .exclude(date_of_birth__isnull=True)
-            .datetimes('date_of_birth', 'year')
-        )
-        ctx['dob_year_options'] = sorted({dt.year for dt in dob_year_datetimes})
 
-        score_values = (
-            Voter.objects
-            .exclude(voter_score__isnull=True)
-            .values_list('voter_score', flat=True)
-            .distinct()
-        )
-        ctx['score_options'] = sorted(score_values)
+        ctx.update(get_filter_options())
 
-        
         rq = self.request
         ctx['filter_party'] = rq.GET.get('party', '').strip()
         ctx['filter_min_dob_year'] = rq.GET.get('min_dob_year', '').strip()
@@ -235,71 +205,139 @@ class GraphListView(ListView):
         ctx['filter_v22general'] = 'checked' if rq.GET.get('v22general', '') else ''
         ctx['filter_v23town'] = 'checked' if rq.GET.get('v23town', '') else ''
 
-        # ------- Chart 1: Birth year histogram ------
-        by_year = (
-            qs.exclude(date_of_birth__isnull=True)
-            .values('date_of_birth__year')                 
-            .annotate(count=Count('id'))
-            .order_by('date_of_birth__year')
-        )
+        # ?render=client: the page fetches api/graphs and draws the
+        # charts in the browser, so there is nothing to render here
+        if rq.GET.get('render') == 'client':
+            params = rq.GET.copy()
+            params.pop('render', None)
+            ctx['client_render'] = True
+            ctx['graphs_querystring'] = params.urlencode()
+            return ctx
+
+        # rendered charts are cached per (data version, filters); a miss
+        # computes every chart series (from the rollup cube when possible)
+        filters = VoterFilters.from_querydict(self.request.GET)
+        key = (VoterImport.current_version(), filters)
+        ctx.update(chart_cache.get_or_render(key, lambda: render_graphs(get_voter_stats(filters))))
 
-        years  = [row['date_of_birth__year'] for row in by_year if row['date_of_birth__year'] is not None]
-        counts = [row['count'] for row in by_year if row['date_of_birth__year'] is not None]
+        return ctx
 
-        # If you want years as strings (categorical axis):
-        years = list(map(str, years))
 
-        fig_births = go.Figure(data=[go.Bar(x=years, y=counts)])
-        fig_births.update_layout(
-            title="Voters Distributed by Birth Year",
-            xaxis_title="Birth Year",
-            yaxis_title="Count",
-            margin=dict(l=30, r=10, t=40, b=30),
-        )
-        # Make sure Plotly JS loads once on the page
-        ctx['graph_births'] = plot(fig_births, output_type='div', include_plotlyjs='cdn')
+@method_decorator(one_data_version, name='dispatch')
+class AreaDashboardView(TemplateView):
+    ''' turnout dashboard: one row per precinct (or ?level=zipcode) from the AreaRollup table '''
+    template_name = 'voter_analytics/precincts.html'
+    levels = [(AreaRollup.PRECINCT, 'Precinct'), (AreaRollup.ZIPCODE, 'Zipcode')]
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        labels = dict(self.levels)
+        level = self.request.GET.get('level', AreaRollup.PRECINCT)
+        if level not in labels:
+            level = AreaRollup.PRECINCT
+        ctx['level'] = level
+        ctx['level_label'] = labels[level]
+        ctx['levels'] = self.levels
+        ctx['elections'] = ELECTIONS
+        ctx['areas'] = area_summaries(level)
+        return ctx
 
 
-        # ------- Chart 2: Party distribution (pie) -------
-        party_rows = (
-            qs.annotate(party_norm=Trim('party_affiliation'))
-              .values('party_norm')
-              .annotate(count=Count('id'))
-              .order_by('party_norm')
-        )
-        party_labels = []
-        party_counts = []
-        for row in party_rows:
-            label = row['party_norm'] if row['party_norm'] not in (None, '') else '(none)'
-            party_labels.append(label)
-            party_counts.append(row['count'])
-
-        fig_party = go.Figure(data=[go.Pie(labels=party_labels, values=party_counts, hole=0)])
-        fig_party.update_layout(
-            title="Voters by Party Affiliation",
-            margin=dict(l=30, r=10, t=40, b=30),
-        )
-        ctx['graph_party'] = plot(fig_party, output_type='div', include_plotlyjs=False)
-
-        # ------- Chart 3: Participation counts (bar) -------
-        labels = ["2020 State", "2021 Town", "2021 Primary", "2022 General", "2023 Town"]
-        values = [
-            qs.filter(v20state=True).count(),
-            qs.filter(v21town=True).count(),
-            qs.filter(v21primary=True).count(),
-            qs.filter(v22general=True).count(),
-            qs.filter(v23town=True).count(),
+@method_decorator(one_data_version, name='dispatch')
+class CohortCompareView(TemplateView):
+    """
+    Two filter sets side by side (GET parameters prefixed a_ and b_):
+    turnout per election, voter score shares and birth decade shares of
+    each cohort, and the difference. Both cohorts are computed in one
+    pass (see cohorts.compare_cohorts).
+    """
+    template_name = 'voter_analytics/compare.html'
+    prefixes = PREFIXES
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        a, b = cohorts_from_querydict(self.request.GET)
+        ctx.update(get_filter_options())
+        ctx['comparison'] = cached_comparison(a, b)
+        ctx['cohorts'] = [
+            {
+                'prefix': prefix,
+                'label': label,
+                'filters': filters,
+                'elections': [(name, label, name in filters.elections) for name, label in ELECTIONS],
+            }
+            for prefix, label, filters in zip(self.prefixes, 'AB', (a, b))
         ]
+        return ctx
 
-        fig_elections = go.Figure(data=[go.Bar(x=labels, y=values)])
-        fig_elections.update_layout(
-            title="Participation by Election",
-            xaxis_title="Election",
-            yaxis_title="Voter Count",
-            margin=dict(l=30, r=10, t=40, b=30),
-        )
-        ctx['graph_elections'] = plot(fig_elections, output_type='div', include_plotlyjs=False)
 
-        return ctx   
-        
\ No newline at end of file
+def cached_comparison(a, b):
+    ''' compare_cohorts(a, b), cached per (data version, both filter sets) '''
+    key = f'voter_analytics:compare:{VoterImport.current_version()}:{a.cache_key}:{b.cache_key}'
+    comparison = cache.get(key)
+    if comparison is None:
+        comparison = compare_cohorts(a, b)
+        cache.set(key, comparison, timeout=None)
+    return comparison
+
+
+@one_data_version
+def compare_api(request):
+    ''' JSON version of the compare page for the same a_ / b_ GET filters '''
+    a, b = cohorts_from_querydict(request.GET)
+    return JsonResponse(cached_comparison(a, b).as_dict())
+
+
+@one_data_version
+def voter_stats_api(request):
+    ''' JSON version of the graphs page's series for the same GET filters '''
+    filters = VoterFilters.from_querydict(request.GET)
+    return JsonResponse(get_voter_stats(filters).as_dict())
+
+
+def chart_cache_stats_api(request):
+    ''' hit / miss / size counters of this worker's rendered-chart cache '''
+    return JsonResponse(chart_cache.stats())
+
+
+def _latest_import(request):
+    ''' VoterImport.latest(), looked up once per request '''
+    if not hasattr(request, '_latest_voter_import'):
+        request._latest_voter_import = VoterImport.latest()
+    return request._latest_voter_import
+
+
+def _graphs_etag(request):
+    ''' ETag for api/graphs: changes with the data version and the filters '''
+    voter_import = _latest_import(request)
+    version = voter_import.pk if voter_import else 0
+    filters = VoterFilters.from_querydict(request.GET)
+    return hashlib.md5(f'{version}:{filters.cache_key}'.encode('utf-8')).hexdigest()
+
+
+def _graphs_last_modified(request):
+    ''' Last-Modified for api/graphs: when the latest import finished '''
+    voter_import = _latest_import(request)
+    return voter_import.finished_at if voter_import else None
+
+
+@one_data_version
+@cache_control(no_cache=True)
+@condition(etag_func=_graphs_etag, last_modified_func=_graphs_last_modified)
+def graphs_api(request):
+    """
+    Compact chart series (years, counts, party labels, turnout) for the
+    graphs page's GET filters, drawn in the browser by ?render=client.
+    Conditional requests get a 304 until the next import; otherwise the
+    series come from one aggregation cached per (data version, filters).
+    """
+    voter_import = _latest_import(request)
+    version = voter_import.pk if voter_import else 0
+    filters = VoterFilters.from_querydict(request.GET)
+
+    key = f'voter_analytics:graph_series:{version}:{filters.cache_key}'
+    series = cache.get(key)
+    if series is None:
+        series = get_voter_stats(filters).as_series()
+        cache.set(key, series, timeout=None)
+    return JsonResponse(series)